@@ -3,6 +3,7 @@ import ctypes
 import sys
 import socket
 import tempfile
+import math
 import threading  # 确保导入threading模块
 
 # Add utils to path for resource management
@@ -45,16 +46,23 @@ except ImportError:
 import flet as ft
 import keyboard
 from modules.screenshot_engine import ScreenshotEngine
-from config import APP_NAME, APP_VERSION, DEFAULT_SETTINGS, HOTKEYS, SUPPORTED_FORMATS, save_hotkeys, load_settings, save_settings, set_language, get_current_language
+from config import APP_NAME, APP_VERSION, DEFAULT_SETTINGS, HOTKEYS, LIBRARY_FILE, SUPPORTED_FORMATS, save_hotkeys, load_settings, save_settings, set_language, get_current_language
 from modules.copy_legacy import ClipboardManager
 from modules.save_legacy import SaveManager
+from modules import capture_backends
+from modules.png_encoder import save_scratch_png
+from modules.screenshot_library import ScreenshotLibrary
+from modules.content_store import pixel_digest
+from modules.window_capture_legacy import WindowCapture
 import pystray
 from PIL import Image, ImageDraw
 import queue
 from ui.pages import capture_page, settings_page, about_page, home_page
 from core.hotkeys import register as register_hotkeys, re_register as re_register_hotkeys
 from core.tray import TrayManager
-from core.log_sys import get_logger, LogOperation, auto_cleanup_logs, CleanupStrategy
+from core.capture_scheduler import CaptureScheduler, CaptureSettings, CaptureJob, REJECTED
+from core.capture_schedules import ScheduleManager
+from core.log_sys import get_logger, mark_stage, LogOperation, auto_cleanup_logs, CleanupStrategy
 from assets.modules.I18N import I18nManager, get_i18n, t, set_locale as i18n_set_locale
 from ui.screenshot_editor import create_enhanced_editor
 from PySide6.QtWidgets import QApplication
@@ -166,8 +174,26 @@ class ZSnaprApp:
         self._start_file_check_thread()
         
         self.engine = ScreenshotEngine()
+        # All capture requests (buttons, hotkeys, tray) go through one bounded scheduler
+        self.capture_scheduler = CaptureScheduler(
+            self._run_capture_job,
+            max_workers=DEFAULT_SETTINGS.get("capture_job_workers", 2),
+            cancel_hooks={"region": self.engine.cancel_region_selection},
+        )
+        # Delayed and recurring captures wait on the timer wheel, not in a job thread
+        self.capture_timers = ScheduleManager(self._on_schedule_fired, on_countdown=self._on_schedule_countdown)
+        self.capture_timers.start()
         self.clipboard_manager = ClipboardManager()
-        self.save_manager = SaveManager(DEFAULT_SETTINGS["save_directory"])
+        self.save_manager = SaveManager(DEFAULT_SETTINGS["save_directory"], pipeline=self.engine.save_pipeline)
+        # Index of saved captures; saving works without it
+        self.library = None
+        if DEFAULT_SETTINGS.get("library", True):
+            try:
+                self.library = ScreenshotLibrary(LIBRARY_FILE)
+            except Exception as e:
+                self.logger.error(f"Screenshot library unavailable: {e}")
+        # Burst and scrolling captures are saved by the engine itself
+        self.engine.library = self.library
         
         self.page = None
         self.status_text = None
@@ -178,8 +204,10 @@ class ZSnaprApp:
         # UI components
         self.save_dir_field = None
         self.format_dropdown = None
+        self.encoder_preset_dropdown = None
         self.delay_field = None
         self.auto_save_checkbox = None
+        self.dedupe_checkbox = None
         self.tabs = None
         self.tray_manager = TrayManager(self)
         self.is_compact = False
@@ -596,63 +624,137 @@ class ZSnaprApp:
             self.status_text.color = color
             self.page.update()
     
-    def _capture_fullscreen(self, e=None):
-        """Capture full screen"""
-        self._update_status("Capturing full screen...", ft.Colors.BLUE)
+    def _capture_settings_snapshot(self):
+        """Freeze the current capture settings for one job"""
+        def widget_value(name, default):
+            widget = getattr(self, name, None)
+            value = getattr(widget, 'value', None) if widget is not None else None
+            return default if value is None or value == "" else value
+        
+        return CaptureSettings(
+            save_directory=str(widget_value('save_dir_field', DEFAULT_SETTINGS["save_directory"])),
+            image_format=str(widget_value('format_dropdown', DEFAULT_SETTINGS["image_format"])),
+            encoder_preset=str(widget_value('encoder_preset_dropdown', self.engine.encoder_preset)),
+            delay_seconds=float(self.engine.delay_seconds or 0),
+            auto_save=bool(widget_value('auto_save_checkbox', False)),
+            dedupe_saves=bool(widget_value('dedupe_checkbox', DEFAULT_SETTINGS["dedupe_saves"])),
+            auto_copy_fullscreen=bool(widget_value('auto_copy_fullscreen_checkbox', False)),
+            auto_copy_window=bool(widget_value('auto_copy_window_checkbox', False)),
+        )
+    
+    def _submit_capture(self, kind, settings=None):
+        """Queue a capture job; returns the job (or the pending countdown) or None when it was rejected"""
+        settings = settings or self._capture_settings_snapshot()
+        if settings.delay_seconds > 0:
+            # Count down on the timer wheel; the job is queued once it runs out
+            schedule = self.capture_timers.delay(settings.delay_seconds, kind, countdown=True,
+                                                 payload=settings.with_changes(delay_seconds=0))
+            self._update_status(f"Capturing in {math.ceil(settings.delay_seconds)}s...", ft.Colors.BLUE)
+            return schedule
+        job, status = self.capture_scheduler.submit(kind, settings)
+        self.logger.debug(f"Capture request {kind}: {status} ({job})")
+        if status == REJECTED:
+            if kind == "region" and job is not None:
+                self._update_status("Region selection already open", ft.Colors.ORANGE)
+            else:
+                self._update_status("Too many captures queued", ft.Colors.ORANGE)
+            return None
+        return job
+    
+    def _cancel_captures(self, e=None):
+        """Cancel pending countdowns, queued and running captures, closing an open region overlay"""
+        count = self.capture_timers.cancel_all(persistent=False) + self.capture_scheduler.cancel_all()
+        if count:
+            self._update_status("Capture cancelled", ft.Colors.ORANGE)
+        return count
+    
+    def _cancel_schedules(self, e=None):
+        """Cancel every scheduled capture, recurring ones included"""
+        count = self.capture_timers.cancel_all()
+        if count:
+            self._update_status(f"Cancelled {count} scheduled capture(s)", ft.Colors.ORANGE)
+        return count
+    
+    def _on_schedule_countdown(self, schedule, seconds_left):
+        """Timer wheel: a countdown capture ticked"""
+        self._update_status(f"Capturing in {seconds_left}s...", ft.Colors.BLUE)
+    
+    def _on_schedule_fired(self, schedule, settings):
+        """Timer wheel: a delayed or recurring capture is due; only queues the job"""
+        if settings is None:
+            # Persisted schedules use the settings in effect when they fire
+            settings = self._capture_settings_snapshot().with_changes(delay_seconds=0)
+        self._submit_capture(schedule.capture, settings)
+    
+    def _run_capture_job(self, job):
+        """Scheduler runner: capture and process one job"""
+        settings = job.settings
+        mark_stage("job_started")
         
-        def capture():
+        if job.kind == "fullscreen":
             try:
-                screenshot = self.engine.capture_fullscreen()
-                self._process_screenshot(screenshot, "fullscreen")
+                screenshot = self.engine.grab_fullscreen()
+                mark_stage("grabbed")
+                self._process_screenshot(screenshot, "fullscreen", settings)
             except Exception as ex:
                 self._update_status(f"Error: {str(ex)}", ft.Colors.RED)
-        
-        threading.Thread(target=capture, daemon=True).start()
+        elif job.kind == "window":
+            try:
+                window_title = WindowCapture.get_window_title()
+                screenshot = self.engine.grab_window()
+                mark_stage("grabbed")
+                self._process_screenshot(screenshot, "window", settings, window_title=window_title)
+            except Exception as ex:
+                self._update_status(f"Error: {str(ex)}", ft.Colors.RED)
+        elif job.kind == "region":
+            self.logger.log_thread_info("Region capture job started")
+            try:
+                self.logger.debug("Calling engine.capture_region()")
+                result = self.engine.capture_region(on_progress=self._on_region_progress, apply_delay=False)
+                self.logger.debug(f"Engine returned: {type(result)} - {result is not None}")
+                
+                if result and not job.cancelled:
+                    self.logger.log_screenshot_event("REGION_CAPTURE_SUCCESS", f"Result type: {type(result)}")
+                    self._process_screenshot(result, "region", settings)
+                else:
+                    self.logger.log_screenshot_event("REGION_CAPTURE_CANCELLED")
+                    self._update_status("Region selection cancelled", ft.Colors.ORANGE)
+            except Exception as ex:
+                self.logger.log_screenshot_event("REGION_CAPTURE_ERROR", str(ex))
+                self.logger.exception("Region capture exception:")
+                self._update_status(f"Error: {str(ex)}", ft.Colors.RED)
+            finally:
+                self.logger.log_thread_info("Region capture job finished")
+        return None
+    
+    def _capture_fullscreen(self, e=None):
+        """Capture full screen"""
+        self._update_status("Capturing full screen...", ft.Colors.BLUE)
+        self._submit_capture("fullscreen")
     
     def _capture_region(self, e=None):
         """Capture selected region"""
         with LogOperation("Region Capture"):
             self.logger.log_screenshot_event("REGION_CAPTURE_START")
-            self._update_status("Select region on screen...", ft.Colors.BLUE)
-            
-            def capture():
-                self.logger.log_thread_info("Region capture thread started")
-                try:
-                    self.logger.debug("Calling engine.capture_region()")
-                    result = self.engine.capture_region()
-                    self.logger.debug(f"Engine returned: {type(result)} - {result is not None}")
-                    
-                    if result:
-                        self.logger.log_screenshot_event("REGION_CAPTURE_SUCCESS", f"Result type: {type(result)}")
-                        self._process_screenshot(result, "region")
-                    else:
-                        self.logger.log_screenshot_event("REGION_CAPTURE_CANCELLED")
-                        self._update_status("Region selection cancelled", ft.Colors.ORANGE)
-                except Exception as ex:
-                    self.logger.log_screenshot_event("REGION_CAPTURE_ERROR", str(ex))
-                    self.logger.exception("Region capture exception:")
-                    self._update_status(f"Error: {str(ex)}", ft.Colors.RED)
-                finally:
-                    self.logger.log_thread_info("Region capture thread finished")
-            
-            self.logger.debug("Starting region capture thread")
-            threading.Thread(target=capture, daemon=True).start()
+            job = self._submit_capture("region")
+            if isinstance(job, CaptureJob):
+                self._update_status("Select region on screen...", ft.Colors.BLUE)
+    
+    def _on_region_progress(self, event, payload):
+        """Handle progress events streamed by the region worker"""
+        self.logger.log_screenshot_event(f"REGION_{str(event).upper()}", payload if event == "selection_changed" else None)
+        if event == "overlay_shown":
+            self._update_status("Select region on screen... (Esc to cancel)", ft.Colors.BLUE)
     
     def _capture_window(self, e=None):
         """Capture active window"""
         self._update_status("Capturing active window...", ft.Colors.BLUE)
-        
-        def capture():
-            try:
-                screenshot = self.engine.capture_window()
-                self._process_screenshot(screenshot, "window")
-            except Exception as ex:
-                self._update_status(f"Error: {str(ex)}", ft.Colors.RED)
-        
-        threading.Thread(target=capture, daemon=True).start()
+        self._submit_capture("window")
     
-    def _process_screenshot(self, screenshot, capture_type):
-        """Process captured screenshot"""
+    def _process_screenshot(self, screenshot, capture_type, settings=None, window_title=None):
+        """Process captured screenshot using the job's settings snapshot"""
+        if settings is None:
+            settings = self._capture_settings_snapshot()
         if screenshot is None:
             self._update_status("Screenshot capture failed", ft.Colors.RED)
             return
@@ -680,6 +782,7 @@ class ZSnaprApp:
         if capture_type == "region" and action == "copy":
             try:
                 ok = self.clipboard_manager.copy_image_to_clipboard(screenshot)
+                mark_stage("clipboard")
                 if ok:
                     self._update_status("Region copied to clipboard", ft.Colors.GREEN)
                 else:
@@ -695,6 +798,10 @@ class ZSnaprApp:
                 filepath = self.save_manager.save_as_dialog(self.last_screenshot)
                 if filepath:
                     self.last_filepath = filepath
+                    if self.library is not None:
+                        width, height = self.last_screenshot.size
+                        self.library.record(filepath, capture_type, width, height,
+                                            content_hash=pixel_digest(self.last_screenshot))
                     self._update_status(f"Screenshot saved: {os.path.basename(filepath)}", ft.Colors.GREEN)
                 else:
                     self._update_status("Save cancelled", ft.Colors.ORANGE)
@@ -715,23 +822,14 @@ class ZSnaprApp:
             return
         
         # Check for auto-copy settings
-        should_auto_copy = False
-        try:
-            if (capture_type == "fullscreen" and hasattr(self, 'auto_copy_fullscreen_checkbox')):
-                checkbox = getattr(self, 'auto_copy_fullscreen_checkbox', None)
-                if checkbox and getattr(checkbox, 'value', False):
-                    should_auto_copy = True
-            elif (capture_type == "window" and hasattr(self, 'auto_copy_window_checkbox')):
-                checkbox = getattr(self, 'auto_copy_window_checkbox', None)
-                if checkbox and getattr(checkbox, 'value', False):
-                    should_auto_copy = True
-        except (AttributeError, TypeError):
-            should_auto_copy = False
+        should_auto_copy = ((capture_type == "fullscreen" and settings.auto_copy_fullscreen)
+                            or (capture_type == "window" and settings.auto_copy_window))
         
         # Auto-copy if enabled
         if should_auto_copy:
             try:
                 ok = self.clipboard_manager.copy_image_to_clipboard(screenshot)
+                mark_stage("clipboard")
                 if ok:
                     self._update_status(f"{capture_type.title()} screenshot copied to clipboard", ft.Colors.GREEN)
                 else:
@@ -739,25 +837,24 @@ class ZSnaprApp:
             except Exception as e:
                 self._update_status(f"Clipboard error: {str(e)}", ft.Colors.RED)
         
-        # Auto-save if enabled
-        if self.auto_save_checkbox and getattr(self.auto_save_checkbox, 'value', False):
+        # Auto-save if enabled; encoding and disk writes happen on the save pipeline
+        if settings.auto_save:
             try:
-                save_dir = getattr(self.save_dir_field, 'value', None) if self.save_dir_field else DEFAULT_SETTINGS["save_directory"]
-                img_format = getattr(self.format_dropdown, 'value', None) if self.format_dropdown else DEFAULT_SETTINGS["image_format"]
-                save_dir = save_dir or DEFAULT_SETTINGS["save_directory"]
-                img_format = img_format or DEFAULT_SETTINGS["image_format"]
-                # Ensure types are correct - force string conversion
-                save_dir = str(save_dir) if save_dir is not None else DEFAULT_SETTINGS["save_directory"]
-                img_format = str(img_format) if img_format is not None else DEFAULT_SETTINGS["image_format"]
-                filepath = self.save_manager.quick_save(screenshot, save_dir, img_format)
-                if filepath:
-                    self.last_filepath = filepath
-                    status_msg = f"Screenshot saved: {os.path.basename(filepath)}"
-                    if should_auto_copy:
-                        status_msg += " and copied to clipboard"
-                    self._update_status(status_msg, ft.Colors.GREEN)
+                save_dir = settings.save_directory
+                img_format = settings.image_format
+                width, height = screenshot.size
+                capture = {"capture_type": capture_type, "width": width, "height": height,
+                           "window_title": window_title, "image_format": img_format}
+                ticket = self.save_manager.queue_save(
+                    screenshot, save_dir, img_format,
+                    on_done=lambda ticket: self._on_save_done(ticket, should_auto_copy, capture),
+                    preset=settings.encoder_preset, dedupe=settings.dedupe_saves,
+                    hash_pixels=self.library is not None)
+                mark_stage("save_queued")
+                if ticket is None:
+                    self._update_status("Save queue full, screenshot not saved", ft.Colors.RED)
                 else:
-                    self._update_status("Failed to save screenshot", ft.Colors.RED)
+                    self._update_status(f"Saving {os.path.basename(ticket.path)}...", ft.Colors.BLUE)
             except Exception as e:
                 self._update_status(f"Save error: {str(e)}", ft.Colors.RED)
         elif not should_auto_copy:
@@ -766,6 +863,23 @@ class ZSnaprApp:
         if self.page:
             self.page.update()
     
+    def _on_save_done(self, ticket, copied=False, capture=None):
+        """Save pipeline callback: the file is on disk (or the save failed)"""
+        mark_stage("saved")
+        if ticket.ok:
+            self.last_filepath = ticket.path
+            if self.library is not None:
+                # capture: type, size, window title and format for the library record
+                self.library.record(ticket.path, content_hash=ticket.pixel_hash, **(capture or {}))
+            status_msg = f"Screenshot saved: {os.path.basename(ticket.path)}"
+            if ticket.dedupe is not None:
+                status_msg += f" (same as an earlier capture, {ticket.dedupe}, {ticket.bytes_saved / 1024:.0f} KB saved)"
+            if copied:
+                status_msg += " and copied to clipboard"
+            self._update_status(status_msg, ft.Colors.GREEN)
+        else:
+            self._update_status(f"Save error: {ticket.error}", ft.Colors.RED)
+    
     def _apply_settings(self, e):
         """Apply current settings"""
         try:
@@ -775,6 +889,9 @@ class ZSnaprApp:
                 self.save_manager.default_directory = self.save_dir_field.value
             if self.format_dropdown:
                 self.engine.set_image_format(self.format_dropdown.value)
+            if self.encoder_preset_dropdown:
+                self.engine.set_encoder_preset(self.encoder_preset_dropdown.value)
+                self.save_manager.encoder_preset = self.engine.encoder_preset
             if self.delay_field:
                 self.engine.set_delay(float(self.delay_field.value or 0))
             if self.auto_save_checkbox:
@@ -909,13 +1026,13 @@ class ZSnaprApp:
         try:
             self.logger.debug("Opening screenshot editor in separate process")
             
-            # Save screenshot to temporary file
+            # Hand the screenshot over in a quickly deflated temporary PNG; the editor deletes it once loaded
             import tempfile
             import subprocess
             
-            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_file:
+            with tempfile.NamedTemporaryFile(prefix="zsnapr_edit_", suffix=".png", delete=False) as temp_file:
                 temp_path = temp_file.name
-                screenshot.save(temp_path, 'PNG')
+                save_scratch_png(screenshot, temp_file)
             
             # Get correct paths for packaged environment
             python_exe = get_python_executable()
@@ -1140,6 +1257,30 @@ class ZSnaprApp:
             # Clean up tray resources
             if hasattr(self, 'tray_manager'):
                 self.tray_manager.cleanup()
+            
+            # Disarm timers, then drop queued captures before the engine goes away
+            if hasattr(self, 'capture_timers'):
+                self.capture_timers.shutdown()
+            if hasattr(self, 'capture_scheduler'):
+                self.capture_scheduler.shutdown()
+            
+            # Finish queued saves so no screenshot is lost on exit
+            if hasattr(self, 'engine'):
+                pending = self.engine.save_pipeline.pending()
+                if pending:
+                    self.logger.info(f"Writing {pending} queued screenshot(s) before exit")
+                if not self.engine.save_pipeline.flush(timeout=10.0):
+                    self.logger.warning("Timed out writing queued screenshots")
+            
+            # Commit the library records of those saves
+            if getattr(self, 'library', None) is not None:
+                self.library.close()
+            
+            # Stop warm region workers
+            if hasattr(self, 'engine'):
+                self.engine.shutdown()
+                # The start-up benchmark only picks a backend; settings are written here, on the main thread
+                capture_backends.save_backend_choice(self.engine.benchmarked_backend)
                 
             # Remove lock file
             lock_file = os.path.join(tempfile.gettempdir(), "zsnapr.lock")
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""Hotkey-to-pixels latency benchmark
+
+Drives the real region and fullscreen flows (hotkey handler -> capture
+scheduler -> engine -> region worker -> confirm -> clipboard/save) against
+a synthetic desktop on the offscreen Qt platform, and reports the time
+spent in every stage as p50/p95/p99 over many iterations.
+
+Stages are the marks recorded by core.log_sys.stages; each is the time
+since the previous mark. Exits with status 1 when a stage exceeds its
+budget in latency_budgets.json.
+
+    python benchmark_latency.py --iterations 50
+    python benchmark_latency.py --write-budgets   # store current p99 x headroom
+"""
+import os
+import sys
+import json
+import time
+import math
+import argparse
+import tempfile
+from types import SimpleNamespace
+
+# Headless before anything imports Qt or pystray; region workers inherit this
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("PYSTRAY_BACKEND", "dummy")
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+DEFAULT_BUDGETS = os.path.join(ROOT, "latency_budgets.json")
+FLOWS = ("region", "fullscreen")
+PERCENTILES = (50, 95, 99)
+MIN_BUDGET_MS = 5  # sub-millisecond stages would fail on scheduler noise alone
+
+
+class _HeadlessPage:
+    # The hotkey handlers only run with a page; nothing is drawn
+    def update(self):
+        pass
+
+
+def build_app(save_directory):
+    """A ZSnaprApp wired like __init__ does, minus the UI, tray and single-instance lock"""
+    from ZSnapr import ZSnaprApp
+    from config import DEFAULT_SETTINGS
+    from core.log_sys import get_logger
+    from core.capture_scheduler import CaptureScheduler
+    from core.capture_schedules import ScheduleManager
+    from modules.screenshot_engine import ScreenshotEngine
+    from modules.copy_legacy import ClipboardManager
+    from modules.save_legacy import SaveManager
+
+    app = ZSnaprApp.__new__(ZSnaprApp)
+    app.logger = get_logger()
+    app.engine = ScreenshotEngine(worker_pool_size=1)
+    app.capture_scheduler = CaptureScheduler(
+        app._run_capture_job,
+        max_workers=DEFAULT_SETTINGS.get("capture_job_workers", 2),
+        cancel_hooks={"region": app.engine.cancel_region_selection},
+    )
+    app.capture_timers = ScheduleManager(app._on_schedule_fired, path=os.path.join(save_directory, "schedules.json"))
+    app.clipboard_manager = ClipboardManager()
+    app.save_manager = SaveManager(save_directory, pipeline=app.engine.save_pipeline)
+    app.library = None
+    app.page = _HeadlessPage()
+    app.status_text = None
+    app.last_screenshot = None
+    app.last_filepath = None
+    # The settings snapshot reads these widgets; fullscreen copies and saves
+    app.save_dir_field = SimpleNamespace(value=save_directory)
+    app.format_dropdown = SimpleNamespace(value="PNG")
+    app.auto_save_checkbox = SimpleNamespace(value=True)
+    app.auto_copy_fullscreen_checkbox = SimpleNamespace(value=True)
+    app.auto_copy_window_checkbox = SimpleNamespace(value=False)
+    return app
+
+
+def _track_jobs(app):
+    # Hand every submitted job to the benchmark so it can wait for exactly that job
+    submitted = []
+    submit = app.capture_scheduler.submit
+
+    def submit_and_track(kind, settings, **params):
+        job, status = submit(kind, settings, **params)
+        submitted.append(job)
+        return job, status
+
+    app.capture_scheduler.submit = submit_and_track
+    return submitted
+
+
+def _wait_for_warm_worker(engine, timeout=30.0):
+    # Hotkey presses are seconds apart in real use; measure warm starts, not respawns
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if engine.worker_pool.get_stats().get("idle_ready", 0) > 0:
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def run_flow(app, flow, recorder, submitted, timeout=30.0):
+    handler = {"region": app._hotkey_region, "fullscreen": app._hotkey_fullscreen}[flow]
+    if flow == "region":
+        _wait_for_warm_worker(app.engine)
+    else:
+        # Fresh pixels every time, not a frame cached by the previous iteration
+        app.engine.frame_cache.invalidate()
+    submitted.clear()
+    recorder.begin(flow)
+    handler()
+    job = submitted[0] if submitted else None
+    # Done means the clipboard is set and the file is durable, not just queued
+    if job is None or not job.wait(timeout) or not app.engine.save_pipeline.flush(timeout):
+        recorder.end()
+        raise RuntimeError(f"{flow} capture did not finish within {timeout}s")
+    return recorder.end()
+
+
+def load_budgets(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def check_budgets(summary, budgets):
+    """List of breach messages; a budgeted stage that was never marked is a breach too"""
+    breaches = []
+    for flow, stages in budgets.items():
+        if flow.startswith("_") or flow not in summary:
+            continue
+        for stage, limits in stages.items():
+            measured = summary[flow].get(stage)
+            if measured is None:
+                breaches.append(f"{flow}/{stage}: stage was not recorded")
+                continue
+            for key, limit in limits.items():
+                value = measured.get(key)
+                if value is not None and value > limit:
+                    breaches.append(f"{flow}/{stage}: {key} {value:.1f} ms > budget {limit} ms")
+    return breaches
+
+
+def write_budgets(path, summary, headroom):
+    budgets = {"_comment": f"p95/p99 per stage in ms; generated at {headroom}x the measured value"}
+    for flow, stages in summary.items():
+        budgets[flow] = {
+            stage: {f"p{p}": max(MIN_BUDGET_MS, math.ceil(row[f"p{p}"] * headroom)) for p in (95, 99)}
+            for stage, row in stages.items()
+        }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(budgets, f, indent=2)
+        f.write("\n")
+
+
+def print_report(summary, budgets):
+    for flow, stages in summary.items():
+        print(f"\n{flow} ({next(iter(stages.values()))['n']} runs)")
+        print(f"  {'stage':<28}{'p50':>9}{'p95':>9}{'p99':>9}   budget")
+        for stage, row in stages.items():
+            limits = budgets.get(flow, {}).get(stage, {})
+            budget = ", ".join(f"{k}<{v}" for k, v in limits.items())
+            print(f"  {stage:<28}" + "".join(f"{row[f'p{p}']:>9.1f}" for p in PERCENTILES) + f"   {budget}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hotkey-to-pixels latency benchmark")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=2, help="untimed runs per flow")
+    parser.add_argument("--flows", default=",".join(FLOWS))
+    parser.add_argument("--monitors", default="1080p", help="synthetic monitors, e.g. 4k,1080p")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--budgets", default=DEFAULT_BUDGETS)
+    parser.add_argument("--write-budgets", action="store_true", help="store the measured p95/p99 as budgets")
+    parser.add_argument("--headroom", type=float, default=3.0)
+    parser.add_argument("--json", help="also write the summary to this file")
+    args = parser.parse_args()
+
+    from modules.synthetic_desktop import SyntheticDesktop, install_synthetic_environment
+    from core.log_sys import get_stage_recorder
+
+    flows = [flow.strip() for flow in args.flows.split(",") if flow.strip()]
+    unknown = [flow for flow in flows if flow not in FLOWS]
+    if unknown:
+        parser.error(f"unknown flow(s): {', '.join(unknown)}")
+
+    desktop = SyntheticDesktop(seed=args.seed, monitors=tuple(args.monitors.split(",")))
+    install_synthetic_environment(desktop)
+    save_directory = tempfile.mkdtemp(prefix="zsnapr-bench-")
+    app = build_app(save_directory)
+    # The worker completes the selection itself, as if the user dragged and pressed Enter
+    app.engine.selection_script = {"rect": [desktop.width // 8, desktop.height // 8,
+                                            desktop.width // 3, desktop.height // 3], "action": "copy"}
+    submitted = _track_jobs(app)
+    recorder = get_stage_recorder()
+    recorder.enabled = True
+
+    try:
+        for flow in flows:
+            for _ in range(args.warmup):
+                run_flow(app, flow, recorder, submitted)
+        recorder.reset()
+        for i in range(args.iterations):
+            # Interleave flows so both see the same machine conditions
+            for flow in flows:
+                run_flow(app, flow, recorder, submitted)
+            print(f"\r{i + 1}/{args.iterations}", end="", flush=True)
+        print()
+    finally:
+        recorder.enabled = False
+        app.capture_scheduler.shutdown()
+        app.engine.shutdown()
+
+    summary = recorder.summary(PERCENTILES)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    if args.write_budgets:
+        write_budgets(args.budgets, summary, args.headroom)
+        print(f"Budgets written to {args.budgets}")
+    budgets = load_budgets(args.budgets)
+    print_report(summary, budgets)
+
+    breaches = check_budgets(summary, budgets)
+    if breaches:
+        print("\nLatency budget exceeded:")
+        for breach in breaches:
+            print(f"  {breach}")
+        return 1
+    print("\nAll stages within budget" if budgets else "\nNo budgets stored, nothing checked")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""PNG encoder and encoder preset benchmark
+
+Encodes synthetic desktop frames with Pillow's encoder and with the
+multi-core encoder in modules/png_encoder.py at several compression
+levels and filters, and reports median encode time and output size.
+Every parallel output is decoded again and compared with the source.
+--presets instead saves through encode_image() for every format and
+config.ENCODER_PRESETS entry and prints a markdown table.
+
+    python benchmark_png.py --monitors 4k --levels 1,6,9
+    python benchmark_png.py --monitors 8k --workers 1   # single-thread baseline
+    python benchmark_png.py --presets --monitors 1440p
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import statistics
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def time_encode(encode, repeats):
+    """(median ms, size in bytes, last output) of encode(buffer)"""
+    times, data = [], None
+    for _ in range(repeats):
+        buffer = io.BytesIO()
+        started = time.perf_counter()
+        encode(buffer)
+        times.append((time.perf_counter() - started) * 1000)
+        data = buffer.getvalue()
+    return statistics.median(times), len(data), data
+
+
+def preset_table(image, repeats):
+    """Markdown table of encode time and size for every format x preset"""
+    from config import ENCODER_PRESETS, SUPPORTED_FORMATS
+    from modules.save_legacy import encode_image
+
+    raw_mb = image.width * image.height * len(image.getbands()) / 1e6
+    lines = ["| format | preset | ms | MB | ratio |", "|---|---|---:|---:|---:|"]
+    for fmt in SUPPORTED_FORMATS:
+        for preset in ENCODER_PRESETS:
+            ms, size, _ = time_encode(lambda f: encode_image(image, f, fmt["name"], preset), repeats)
+            lines.append(f"| {fmt['name']} | {preset} | {ms:.0f} | {size / 1e6:.3f} | {raw_mb * 1e6 / size:.0f}x |")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pillow vs multi-core PNG encoding")
+    parser.add_argument("--monitors", default="4k", help="one synthetic frame per monitor size, e.g. 1080p,4k,8k")
+    parser.add_argument("--levels", default="1,6,9")
+    parser.add_argument("--filters", default="sub,adaptive")
+    parser.add_argument("--workers", type=int, default=None, help="chunks deflated at once (default: all cores)")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=3)
+    parser.add_argument("--presets", action="store_true", help="table of every format x encoder preset")
+    args = parser.parse_args()
+
+    import numpy as np
+    from PIL import Image
+    from modules.synthetic_desktop import SyntheticDesktop
+    from modules.png_encoder import encode_png
+
+    levels = [int(level) for level in args.levels.split(",")]
+    filters = [name.strip() for name in args.filters.split(",") if name.strip()]
+    print(f"{os.cpu_count()} CPU(s), workers={args.workers or 'auto'}, median of {args.repeats}")
+
+    for size in args.monitors.split(","):
+        desktop = SyntheticDesktop(seed=args.seed, monitors=(size.strip(),))
+        pixels = np.ascontiguousarray(desktop.pixels)
+        image = Image.fromarray(pixels)
+        raw_mb = pixels.nbytes / 1e6
+        print(f"\n{size} {image.width}x{image.height} ({raw_mb:.1f} MB raw)")
+        if args.presets:
+            print(preset_table(image, args.repeats))
+            continue
+        print(f"  {'encoder':<24}{'level':>6}{'ms':>9}{'MB':>9}{'MB/s':>9}{'vs pillow':>11}")
+        for level in levels:
+            base_ms, base_size, _ = time_encode(lambda f: image.save(f, "PNG", compress_level=level), args.repeats)
+            print(f"  {'pillow':<24}{level:>6}{base_ms:>9.0f}{base_size / 1e6:>9.2f}{raw_mb / base_ms * 1000:>9.0f}")
+            for name in filters:
+                ms, out_size, data = time_encode(
+                    lambda f: encode_png(pixels, f, level=level, filter=name, workers=args.workers), args.repeats)
+                if not np.array_equal(np.asarray(Image.open(io.BytesIO(data))), pixels):
+                    print(f"  parallel/{name} level {level}: decoded pixels differ from the source")
+                    return 1
+                print(f"  {'parallel/' + name:<24}{level:>6}{ms:>9.0f}{out_size / 1e6:>9.2f}"
+                      f"{raw_mb / ms * 1000:>9.0f}{base_ms / ms:>10.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -122,9 +122,48 @@ SUPPORTED_FORMATS = [
     {"name": "PNG", "extension": ".png"},
     {"name": "JPEG", "extension": ".jpg"},
     {"name": "BMP", "extension": ".bmp"},
-    {"name": "TIFF", "extension": ".tiff"}
+    {"name": "TIFF", "extension": ".tiff"},
+    {"name": "WEBP", "extension": ".webp"},  # lossless
+    {"name": "WEBP_LOSSY", "extension": ".webp", "pil_format": "WEBP"},
+    {"name": "QOI", "extension": ".qoi"}  # modules/qoi.py, fast lossless
 ]
 
+# Encoder presets: save parameters per image format
+# PNG "encoder" is "parallel" (modules/png_encoder.py, multi-core) or "pillow";
+# PNG "palette": "auto" writes images with at most 256 colours as indexed PNG;
+# everything else is passed to Pillow's save(). BMP and QOI have nothing to tune.
+# Sub filtering beats adaptive on screen content in both speed and size, and
+# lossless WebP past quality 50 only costs time on it (quality 100 is ~30x
+# slower for no gain). Measured numbers: README.md, "Encoder presets"
+ENCODER_PRESETS = {
+    "fast": {
+        "PNG": {"encoder": "parallel", "level": 1, "filter": "sub", "palette": "auto"},
+        "JPEG": {"quality": 95},
+        "TIFF": {"compression": "raw"},
+        "WEBP": {"lossless": True, "method": 0, "quality": 0},
+        "WEBP_LOSSY": {"quality": 85, "method": 0},
+    },
+    "balanced": {
+        "PNG": {"encoder": "parallel", "level": 6, "filter": "sub", "palette": "auto"},
+        "JPEG": {"quality": 92, "optimize": True, "subsampling": 0},  # 4:4:4 keeps text edges clean
+        "TIFF": {"compression": "tiff_lzw"},
+        "WEBP": {"lossless": True, "method": 2, "quality": 30},
+        "WEBP_LOSSY": {"quality": 85, "method": 4},
+    },
+    "smallest": {
+        "PNG": {"encoder": "parallel", "level": 9, "filter": "sub", "palette": "auto"},
+        "JPEG": {"quality": 85, "optimize": True, "progressive": True},
+        "TIFF": {"compression": "tiff_adobe_deflate"},
+        "WEBP": {"lossless": True, "method": 6, "quality": 50},
+        "WEBP_LOSSY": {"quality": 80, "method": 6},
+    },
+}
+
+def get_encoder_options(format_name, preset=None):
+    # Save parameters for format_name under preset (the configured one by default)
+    presets = ENCODER_PRESETS.get(preset or DEFAULT_SETTINGS.get("encoder_preset"), ENCODER_PRESETS["balanced"])
+    return dict(presets.get(format_name, {}))
+
 # Default settings
 DEFAULT_SETTINGS = {
     "save_directory": DEFAULT_SAVE_DIR,
@@ -134,6 +173,16 @@ DEFAULT_SETTINGS = {
     "delay_seconds": 0,
     "auto_copy_fullscreen": False,
     "auto_copy_window": False,
+    "region_worker_pool_size": 1,  # pre-initialized region selector processes, 0 disables
+    "capture_backend": "auto",  # auto benchmarks once; or pyautogui, imagegrab, qt, x11shm
+    "burst_ring_slots": 8,  # reusable frame buffers for burst capture
+    "capture_job_workers": 2,  # concurrent capture jobs from UI, hotkeys and tray
+    "frame_cache_ms": 50,  # grabs this close together share one frame, 0 disables
+    "save_workers": 1,  # background encode/write threads
+    "save_queue_size": 4,  # saves in flight before new captures wait for the disk
+    "encoder_preset": "balanced",  # fast, balanced, smallest (see ENCODER_PRESETS)
+    "dedupe_saves": False,  # identical captures become links to one stored file (modules/content_store.py)
+    "library": True,  # record saved captures in the SQLite library (modules/screenshot_library.py)
     "language": "auto"  # auto, en, zh-cn
 }
 
@@ -147,6 +196,7 @@ HOTKEYS = {
 CONFIG_DIR = get_resource_path("assets/config")
 HOTKEYS_FILE = os.path.join(CONFIG_DIR, "hotkeys.json")
 SETTINGS_FILE = os.path.join(CONFIG_DIR, "settings.json")
+LIBRARY_FILE = os.path.join(CONFIG_DIR, "library.sqlite3")
 
 def load_hotkeys():
     # Load hotkeys from file and merge into HOTKEYS
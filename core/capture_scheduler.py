@@ -0,0 +1,221 @@
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+
+from core.log_sys import get_logger
+
+# Central scheduler for capture requests from the UI, hotkeys and tray
+#
+# Jobs run on a bounded pool. Requests are coalesced per kind: a region
+# request while a region overlay is pending or open is rejected, and a
+# fullscreen/window request that is already queued (not yet running)
+# absorbs duplicates. Every job carries a frozen settings snapshot taken at
+# submit time, so later UI changes never leak into a running capture.
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACCEPTED = "accepted"
+MERGED = "merged"
+REJECTED = "rejected"
+
+
+@dataclass(frozen=True)
+class CaptureSettings:
+    # Immutable per-job view of the capture settings
+    save_directory: str
+    image_format: str = "PNG"
+    encoder_preset: str = "balanced"
+    dedupe_saves: bool = False
+    delay_seconds: float = 0.0
+    auto_save: bool = True
+    auto_copy_fullscreen: bool = False
+    auto_copy_window: bool = False
+
+    def with_changes(self, **changes):
+        return replace(self, **changes)
+
+
+class CaptureJob:
+    """One capture request and its outcome"""
+
+    def __init__(self, job_id, kind, settings, params=None):
+        self.id = job_id
+        self.kind = kind
+        self.settings = settings
+        self.params = dict(params or {})
+        self.state = PENDING
+        self.result = None
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.done_event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    @property
+    def finished(self):
+        return self.done_event.is_set()
+
+    def add_done_callback(self, callback):
+        """Call callback(job) once finished (right away if already finished)"""
+        with self._lock:
+            if not self.finished:
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def wait(self, timeout=None):
+        return self.done_event.wait(timeout)
+
+    def _finish(self, state, result=None, error=None):
+        with self._lock:
+            if self.finished:
+                return
+            self.state = state
+            self.result = result
+            self.error = error
+            self.done_event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                get_logger().error(f"Capture job callback failed: {e}")
+
+    def __repr__(self):
+        return f"CaptureJob(id={self.id}, kind={self.kind}, state={self.state})"
+
+
+class CaptureScheduler:
+    """Bounded, coalescing executor for capture jobs
+
+    runner(job) performs the capture and returns its result; it should
+    check job.cancel_event at its own wait points. cancel_hooks maps a kind
+    to a callable that interrupts a running job of that kind (for example
+    closing the region overlay).
+    """
+
+    EXCLUSIVE_KINDS = ("region",)
+
+    def __init__(self, runner, max_workers=2, max_pending=8, cancel_hooks=None):
+        self.logger = get_logger()
+        self.runner = runner
+        self.max_pending = max_pending
+        self.cancel_hooks = dict(cancel_hooks or {})
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="zsnapr-job")
+        self._ids = itertools.count(1)
+        self._jobs = []  # pending and running jobs
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {"submitted": 0, "merged": 0, "rejected": 0, "cancelled": 0, "done": 0, "failed": 0}
+
+    def submit(self, kind, settings, **params):
+        """Queue a capture; returns (job, status) with status accepted, merged or rejected"""
+        with self._lock:
+            if self._closed:
+                return None, REJECTED
+            for job in self._jobs:
+                if job.kind != kind or job.cancelled:
+                    continue
+                if kind in self.EXCLUSIVE_KINDS:
+                    # Only one overlay at a time
+                    self.stats["rejected"] += 1
+                    self.logger.debug(f"Rejected {kind} request, {job} is still open")
+                    return job, REJECTED
+                if job.state == PENDING and job.params == params:
+                    self.stats["merged"] += 1
+                    self.logger.debug(f"Merged {kind} request into {job}")
+                    return job, MERGED
+            pending = sum(1 for job in self._jobs if job.state == PENDING)
+            if pending >= self.max_pending:
+                self.stats["rejected"] += 1
+                self.logger.warning(f"Rejected {kind} request, {pending} jobs already queued")
+                return None, REJECTED
+            job = CaptureJob(next(self._ids), kind, settings, params)
+            self._jobs.append(job)
+            self.stats["submitted"] += 1
+        self._executor.submit(self._run, job)
+        return job, ACCEPTED
+
+    def _run(self, job):
+        with self._lock:
+            if job.cancelled:
+                self._retire(job)
+                job._finish(CANCELLED)
+                return
+            job.state = RUNNING
+        try:
+            result = self.runner(job)
+        except Exception as e:
+            self.logger.error(f"{job} failed: {e}")
+            self.logger.exception("Capture job exception:")
+            with self._lock:
+                self.stats["failed"] += 1
+                self._retire(job)
+            job._finish(FAILED, error=e)
+            return
+        with self._lock:
+            self._retire(job)
+            if job.cancelled:
+                self.stats["cancelled"] += 1
+            else:
+                self.stats["done"] += 1
+        job._finish(CANCELLED if job.cancelled else DONE, result=result)
+
+    def _retire(self, job):
+        # Caller holds the lock
+        if job in self._jobs:
+            self._jobs.remove(job)
+
+    def cancel(self, job):
+        """Cancel a pending job or interrupt a running one"""
+        with self._lock:
+            if job.finished or job.cancelled:
+                return False
+            job.cancel_event.set()
+            running = job.state == RUNNING
+            if not running:
+                self.stats["cancelled"] += 1
+                self._retire(job)
+        if running:
+            hook = self.cancel_hooks.get(job.kind)
+            if hook is not None:
+                try:
+                    hook()
+                except Exception as e:
+                    self.logger.error(f"Cancel hook for {job.kind} failed: {e}")
+        else:
+            job._finish(CANCELLED)
+        return True
+
+    def cancel_all(self, kind=None):
+        """Cancel every open job, or only those of one kind; returns the count"""
+        with self._lock:
+            jobs = [job for job in self._jobs if kind is None or job.kind == kind]
+        return sum(1 for job in jobs if self.cancel(job))
+
+    def active_jobs(self):
+        with self._lock:
+            return list(self._jobs)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["pending"] = sum(1 for job in self._jobs if job.state == PENDING)
+            stats["running"] = sum(1 for job in self._jobs if job.state == RUNNING)
+        return stats
+
+    def shutdown(self, cancel=True, wait=False):
+        with self._lock:
+            self._closed = True
+        if cancel:
+            self.cancel_all()
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,305 @@
+import os
+import json
+import math
+import uuid
+import threading
+from dataclasses import dataclass, asdict, replace, fields
+from datetime import datetime, timedelta
+
+from core.log_sys import get_logger
+from core.timer_wheel import get_timer_wheel
+
+# Delayed, countdown and recurring captures
+#
+# Schedules are plain records armed on the shared timer wheel; nothing
+# waits in a thread. When one fires the manager hands it to on_fire (the
+# app submits a capture job) and re-arms recurring ones. Persistent
+# schedules are kept in assets/config/schedules.json and re-armed on start;
+# one-shots missed while the app was closed still fire if they are less
+# than missed_grace seconds late.
+
+ONCE = "once"
+COUNTDOWN = "countdown"
+INTERVAL = "interval"
+CRON = "cron"
+
+CRON_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+    "@yearly": "0 0 1 1 *",
+}
+
+
+class CronExpression:
+    """Five-field cron (minute hour day-of-month month day-of-week), local time
+
+    Fields take *, numbers, ranges a-b, lists and /steps; day-of-week 0 and 7
+    are Sunday. As in cron, when both day fields are restricted a day
+    matching either one counts.
+    """
+
+    _BOUNDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, text):
+        self.text = text.strip()
+        parts = CRON_ALIASES.get(self.text, self.text).split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {text!r}")
+        fields_ = [self._parse(part, low, high) for part, (low, high) in zip(parts, self._BOUNDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = fields_
+        self.weekdays = tuple(sorted({day % 7 for day in weekdays}))
+        self.any_day = parts[2] == "*"
+        self.any_weekday = parts[4] == "*"
+
+    @staticmethod
+    def _parse(part, low, high):
+        # Sorted tuple of the matching values, so scans find the earliest first
+        values = set()
+        for item in part.split(","):
+            base, _, step = item.partition("/")
+            step = int(step) if step else 1
+            if base == "*":
+                start, end = low, high
+            elif "-" in base:
+                start, end = (int(v) for v in base.split("-", 1))
+            else:
+                start = int(base)
+                end = high if step > 1 else start
+            if not (low <= start <= end <= high) or step < 1:
+                raise ValueError(f"Cron field {item!r} outside {low}-{high}")
+            values.update(range(start, end + 1, step))
+        return tuple(sorted(values))
+
+    def _day_matches(self, moment):
+        in_month = moment.day in self.days
+        in_week = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_month and in_week
+        return in_month or in_week
+
+    def next_after(self, moment):
+        """First matching minute strictly after moment (naive local datetime)"""
+        t = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Jump whole months, days and hours; bounded to a few years of search
+        for _ in range(50000):
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                later = next((m for m in self.minutes if m > t.minute), None)
+                t = t.replace(minute=later) if later is not None else t.replace(minute=0) + timedelta(hours=1)
+            else:
+                return t
+        raise ValueError(f"Cron expression {self.text!r} never matches")
+
+
+@dataclass(frozen=True)
+class Schedule:
+    # One scheduled capture; `at` is the next (or only) run in epoch seconds
+    id: str
+    kind: str
+    capture: str = "fullscreen"  # fullscreen, window or region
+    at: float = 0.0
+    interval: float = 0.0  # interval schedules, seconds
+    cron: str = ""  # cron schedules
+    persist: bool = True
+    label: str = ""
+
+    def with_changes(self, **changes):
+        return replace(self, **changes)
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+def _schedules_file():
+    from config import CONFIG_DIR
+    return os.path.join(CONFIG_DIR, "schedules.json")
+
+
+class ScheduleManager:
+    """Arms schedules on the timer wheel and persists the durable ones
+
+    on_fire(schedule, payload) runs on the wheel thread and must not block;
+    payload is whatever was passed to add() (in memory only, not persisted).
+    on_countdown(schedule, seconds_left) is called once a second for
+    countdown schedules.
+    """
+
+    def __init__(self, on_fire, on_countdown=None, wheel=None, path=None, missed_grace=60):
+        self.logger = get_logger()
+        self.on_fire = on_fire
+        self.on_countdown = on_countdown
+        self.wheel = wheel or get_timer_wheel()
+        self.path = path or _schedules_file()
+        self.missed_grace = missed_grace
+        self._schedules = {}
+        self._payloads = {}
+        self._timers = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+
+    def start(self):
+        """Re-arm persisted schedules; returns how many were restored"""
+        now = self.wheel.clock()
+        restored = 0
+        for schedule in self._load():
+            if schedule.kind in (ONCE, COUNTDOWN):
+                if schedule.at < now - self.missed_grace:
+                    self.logger.info(f"Dropping missed schedule {schedule.id} ({schedule.label or schedule.capture})")
+                    continue
+            else:
+                schedule = schedule.with_changes(at=self._next_run(schedule, now))
+            self._arm(schedule, None, save=False)
+            restored += 1
+        self._save()
+        return restored
+
+    # Convenience constructors
+    def delay(self, seconds, capture="fullscreen", countdown=False, persist=False, payload=None, label=""):
+        kind = COUNTDOWN if countdown else ONCE
+        return self.add(kind, capture, at=self.wheel.clock() + seconds, persist=persist, payload=payload, label=label)
+
+    def at(self, when, capture="fullscreen", persist=True, payload=None, label=""):
+        if isinstance(when, datetime):
+            when = when.timestamp()
+        return self.add(ONCE, capture, at=when, persist=persist, payload=payload, label=label)
+
+    def every(self, seconds, capture="fullscreen", persist=True, payload=None, label=""):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        return self.add(INTERVAL, capture, at=self.wheel.clock() + seconds, interval=seconds,
+                        persist=persist, payload=payload, label=label)
+
+    def cron(self, expression, capture="fullscreen", persist=True, payload=None, label=""):
+        cron = CronExpression(expression)
+        return self.add(CRON, capture, at=cron.next_after(datetime.now()).timestamp(), cron=cron.text,
+                        persist=persist, payload=payload, label=label)
+
+    def add(self, kind, capture, at, interval=0.0, cron="", persist=True, payload=None, label=""):
+        schedule = Schedule(uuid.uuid4().hex[:12], kind, capture, float(at), float(interval), cron, persist, label)
+        self._arm(schedule, payload)
+        self.logger.debug(f"Scheduled {kind} {capture} capture {schedule.id} at {datetime.fromtimestamp(at)}")
+        return schedule
+
+    def cancel(self, schedule_id):
+        """Disarm and forget one schedule; returns False when it is unknown"""
+        with self._lock:
+            schedule = self._schedules.pop(schedule_id, None)
+            timer = self._timers.pop(schedule_id, None)
+            self._payloads.pop(schedule_id, None)
+        if schedule is None:
+            return False
+        if timer is not None:
+            timer.cancel()
+        if schedule.persist:
+            self._save()
+        return True
+
+    def cancel_all(self, persistent=True):
+        """Cancel every schedule, or only the transient ones (UI delays); returns the count"""
+        with self._lock:
+            ids = [s.id for s in self._schedules.values() if persistent or not s.persist]
+        return sum(1 for schedule_id in ids if self.cancel(schedule_id))
+
+    def schedules(self):
+        """Armed schedules, soonest first"""
+        with self._lock:
+            return sorted(self._schedules.values(), key=lambda s: s.at)
+
+    def shutdown(self):
+        with self._lock:
+            timers = list(self._timers.values())
+            self._timers.clear()
+        for timer in timers:
+            timer.cancel()
+
+    def _next_run(self, schedule, now):
+        if schedule.kind == INTERVAL:
+            # Stay on the original grid; runs missed while suspended or closed are skipped
+            behind = max(0.0, now - schedule.at)
+            return schedule.at + math.floor(behind / schedule.interval + 1) * schedule.interval
+        if schedule.kind == CRON:
+            return CronExpression(schedule.cron).next_after(datetime.fromtimestamp(now)).timestamp()
+        return schedule.at
+
+    def _arm(self, schedule, payload, save=True):
+        with self._lock:
+            self._schedules[schedule.id] = schedule
+            self._payloads[schedule.id] = payload
+            self._timers[schedule.id] = self._arm_timer(schedule)
+        if save and schedule.persist:
+            self._save()
+
+    def _arm_timer(self, schedule):
+        # Caller holds the lock. Countdowns wake on each whole second left, the rest only when due
+        if schedule.kind == COUNTDOWN:
+            left = schedule.at - self.wheel.clock()
+            if left > 1:
+                return self.wheel.call_at(schedule.at - math.ceil(left - 1), self._on_tick, schedule.id)
+        return self.wheel.call_at(schedule.at, self._on_due, schedule.id)
+
+    def _on_tick(self, schedule_id):
+        with self._lock:
+            schedule = self._schedules.get(schedule_id)
+            if schedule is None:
+                return
+            self._timers[schedule_id] = self._arm_timer(schedule)
+        if self.on_countdown is not None:
+            self.on_countdown(schedule, max(1, round(schedule.at - self.wheel.clock())))
+
+    def _on_due(self, schedule_id):
+        with self._lock:
+            schedule = self._schedules.get(schedule_id)
+            if schedule is None:
+                # Cancelled after the wheel had already collected it
+                return
+            payload = self._payloads.get(schedule_id)
+            if schedule.kind in (INTERVAL, CRON):
+                schedule = schedule.with_changes(at=self._next_run(schedule, self.wheel.clock()))
+                self._schedules[schedule_id] = schedule
+                self._timers[schedule_id] = self._arm_timer(schedule)
+            else:
+                del self._schedules[schedule_id]
+                self._payloads.pop(schedule_id, None)
+                self._timers.pop(schedule_id, None)
+        if schedule.persist:
+            self._save()
+        try:
+            self.on_fire(schedule, payload)
+        except Exception as e:
+            self.logger.error(f"Scheduled capture {schedule_id} failed to start: {e}")
+
+    def _load(self):
+        try:
+            if not os.path.exists(self.path):
+                return []
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return [Schedule.from_dict(item) for item in data.get("schedules", [])]
+        except Exception as e:
+            self.logger.error(f"Failed to load schedules: {e}")
+            return []
+
+    def _save(self):
+        with self._lock:
+            data = {"schedules": [s.to_dict() for s in self._schedules.values() if s.persist]}
+        try:
+            with self._save_lock:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                temp_path = self.path + ".tmp"
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                os.replace(temp_path, self.path)
+        except Exception as e:
+            self.logger.error(f"Failed to save schedules: {e}")
@@ -1,5 +1,7 @@
 # Log system for ZSnapr
 from .logger import Logger, get_logger, LogOperation
+from .stages import StageRecorder, get_stage_recorder, mark_stage
 from .auto_clean import auto_cleanup_logs, CleanupStrategy, SmartLogCleaner, cleanup_ultra_aggressive
 
-__all__ = ['Logger', 'get_logger', 'LogOperation', 'auto_cleanup_logs', 'CleanupStrategy', 'SmartLogCleaner', 'cleanup_ultra_aggressive']
\ No newline at end of file
+__all__ = ['Logger', 'get_logger', 'LogOperation', 'auto_cleanup_logs', 'CleanupStrategy', 'SmartLogCleaner', 'cleanup_ultra_aggressive',
+           'StageRecorder', 'get_stage_recorder', 'mark_stage']
\ No newline at end of file
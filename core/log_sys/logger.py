@@ -7,6 +7,8 @@ import threading
 import traceback
 import atexit
 
+from .stages import mark_stage
+
 class Logger:
     _instance = None
     _lock = threading.Lock()
@@ -134,10 +136,12 @@ class Logger:
     
     def log_hotkey_event(self, hotkey, action):
         # Log hotkey events
+        mark_stage("hotkey")
         self.info(f"HOTKEY: {hotkey} -> {action}")
     
     def log_screenshot_event(self, event_type, details=None):
         # Log screenshot events
+        mark_stage(event_type)
         details_str = f" - {details}" if details else ""
         self.info(f"SCREENSHOT: {event_type}{details_str}")
     
@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import defaultdict
+
+# Stage latency recorder
+#
+# A flow (one hotkey press through to clipboard/save) is a trace of named
+# marks; each stage's duration is the time from the previous mark to its
+# own. Marks come from the existing log calls (log_hotkey_event,
+# log_screenshot_event, LogOperation) plus a few explicit mark() calls on
+# the capture path. Recording is off unless a benchmark enables it, so a
+# mark in normal use is one attribute check.
+
+
+class StageRecorder:
+    """Collects per-stage durations over many runs of named flows"""
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._flow = None
+        self._marks = []
+        self._samples = defaultdict(lambda: defaultdict(list))
+
+    def begin(self, flow):
+        """Start a trace; marks from any thread land in it until end()"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._flow = flow
+            self._marks = [("start", time.perf_counter())]
+
+    def mark(self, name):
+        if not self.enabled or self._flow is None:
+            return
+        now = time.perf_counter()
+        name = str(name).lower()
+        with self._lock:
+            # The first occurrence ends the stage; repeats (selection_changed) are ignored
+            if self._flow is not None and all(existing != name for existing, _ in self._marks):
+                self._marks.append((name, now))
+
+    def end(self):
+        """Close the trace; returns {stage: ms} in mark order, with "total"""
+        if not self.enabled:
+            return {}
+        with self._lock:
+            flow, marks = self._flow, self._marks
+            self._flow, self._marks = None, []
+        if flow is None:
+            return {}
+        marks.append(("end", time.perf_counter()))
+        stages = {}
+        for (_, previous), (name, at) in zip(marks, marks[1:]):
+            stages[name] = (at - previous) * 1000
+        stages["total"] = (marks[-1][1] - marks[0][1]) * 1000
+        with self._lock:
+            for name, ms in stages.items():
+                self._samples[flow][name].append(ms)
+        return stages
+
+    def samples(self, flow):
+        with self._lock:
+            return {name: list(values) for name, values in self._samples.get(flow, {}).items()}
+
+    def summary(self, percentiles=(50, 95, 99)):
+        """{flow: {stage: {"n", "mean", "p50", ...}}} in milliseconds"""
+        import numpy as np
+        with self._lock:
+            flows = {flow: {name: list(values) for name, values in stages.items()}
+                     for flow, stages in self._samples.items()}
+        result = {}
+        for flow, stages in flows.items():
+            result[flow] = {}
+            for name, values in stages.items():
+                row = {"n": len(values), "mean": float(np.mean(values))}
+                for p in percentiles:
+                    row[f"p{p}"] = float(np.percentile(values, p))
+                result[flow][name] = row
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._flow, self._marks = None, []
+            self._samples.clear()
+
+
+_recorder = StageRecorder()
+
+
+def get_stage_recorder():
+    return _recorder
+
+
+def mark_stage(name):
+    # Shorthand for the capture path
+    _recorder.mark(name)
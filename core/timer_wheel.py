@@ -0,0 +1,157 @@
+import threading
+import time
+
+from core.log_sys import get_logger
+
+# Hashed timer wheel for delayed and recurring captures
+#
+# Timers hash into one of `slots` buckets by their due tick; adding and
+# cancelling are O(1). A single daemon thread drives the wheel and sleeps
+# on a condition until the next occupied bucket, or indefinitely when no
+# timer is armed, so waiting captures never hold a thread of their own.
+# Ticks are wall-clock based because schedules are (cron, "at 09:00").
+# Callbacks run on the wheel thread and must return quickly; hand real work
+# to a pool.
+
+DEFAULT_TICK_MS = 50
+DEFAULT_SLOTS = 512
+
+
+class Timer:
+    """Handle for one armed callback"""
+
+    __slots__ = ("when", "due_tick", "callback", "args", "cancelled", "_wheel")
+
+    def __init__(self, wheel, when, due_tick, callback, args):
+        self._wheel = wheel
+        self.when = when
+        self.due_tick = due_tick
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """Disarm; returns False when the timer already fired or was cancelled"""
+        return self._wheel.cancel(self)
+
+    def remaining(self):
+        return max(0.0, self.when - self._wheel.clock())
+
+
+class TimerWheel:
+    """O(1) timers driven by one sleeping thread"""
+
+    def __init__(self, tick_ms=DEFAULT_TICK_MS, slots=DEFAULT_SLOTS, clock=time.time):
+        self.logger = get_logger()
+        self.tick = tick_ms / 1000
+        self.clock = clock
+        self._slots = [set() for _ in range(slots)]
+        self._count = 0
+        self._last_tick = int(clock() // self.tick)
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def __len__(self):
+        return self._count
+
+    def call_at(self, when, callback, *args):
+        """Run callback(*args) on the wheel thread once the clock passes `when` (epoch seconds)"""
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("Timer wheel is stopped")
+            # Ceil, so a timer never fires before its time; past times fire on the next tick
+            due_tick = max(-int(-when // self.tick), self._last_tick + 1)
+            timer = Timer(self, when, due_tick, callback, args)
+            self._slots[due_tick % len(self._slots)].add(timer)
+            self._count += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="zsnapr-timers", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return timer
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(self.clock() + max(0.0, delay), callback, *args)
+
+    def cancel(self, timer):
+        with self._cond:
+            if timer.cancelled:
+                return False
+            bucket = self._slots[timer.due_tick % len(self._slots)]
+            if timer not in bucket:
+                return False
+            timer.cancelled = True
+            bucket.discard(timer)
+            self._count -= 1
+            # No notify: waking early for an emptied bucket is harmless
+            return True
+
+    def stop(self):
+        """Drop every timer and end the wheel thread"""
+        with self._cond:
+            self._stopped = True
+            for bucket in self._slots:
+                for timer in bucket:
+                    timer.cancelled = True
+                bucket.clear()
+            self._count = 0
+            self._cond.notify()
+
+    def _collect(self, now_tick):
+        # Caller holds the lock. Visit every bucket passed since the last turn, at most one revolution
+        due = []
+        slots = len(self._slots)
+        for tick in range(max(self._last_tick + 1, now_tick - slots + 1), now_tick + 1):
+            bucket = self._slots[tick % slots]
+            if not bucket:
+                continue
+            ready = [timer for timer in bucket if timer.due_tick <= now_tick]
+            for timer in ready:
+                bucket.discard(timer)
+            due.extend(ready)
+        # A clock stepped backwards restarts the turn from the new time
+        self._last_tick = now_tick
+        self._count -= len(due)
+        return due
+
+    def _next_wait(self):
+        # Caller holds the lock. Seconds until the next occupied bucket comes round, None when idle
+        if self._count == 0:
+            return None
+        slots = len(self._slots)
+        for distance in range(1, slots + 1):
+            if self._slots[(self._last_tick + distance) % slots]:
+                break
+        return max(0.0, (self._last_tick + distance) * self.tick - self.clock())
+
+    def _run(self):
+        with self._cond:
+            while not self._stopped:
+                due = self._collect(int(self.clock() // self.tick))
+                if due:
+                    self._cond.release()
+                    try:
+                        for timer in sorted(due, key=lambda t: t.when):
+                            try:
+                                timer.callback(*timer.args)
+                            except Exception as e:
+                                self.logger.error(f"Timer callback failed: {e}")
+                                self.logger.exception("Timer callback exception:")
+                    finally:
+                        self._cond.acquire()
+                    continue
+                self._cond.wait(self._next_wait())
+
+
+_default_wheel = None
+_default_lock = threading.Lock()
+
+
+def get_timer_wheel():
+    """Process-wide wheel shared by the engine and the schedule manager"""
+    global _default_wheel
+    with _default_lock:
+        if _default_wheel is None or _default_wheel._stopped:
+            _default_wheel = TimerWheel()
+        return _default_wheel
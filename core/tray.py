@@ -81,12 +81,16 @@ class TrayManager:
             def on_capture(icon, item):
                 self.action_queue.put("capture_region")
             
+            def on_cancel_schedules(icon, item):
+                self.action_queue.put("cancel_schedules")
+            
             def on_click(icon):
                 self.action_queue.put("capture_region")
 
             image = self._create_tray_image()
             menu = pystray.Menu(
                 pystray.MenuItem("Capture Region", on_capture, default=True),
+                pystray.MenuItem("Cancel Scheduled Captures", on_cancel_schedules),
                 pystray.MenuItem("Restore Window", on_restore),
                 pystray.MenuItem("Exit", on_exit)
             )
@@ -187,8 +191,15 @@ class TrayManager:
         try:
             if action == "capture_region":
                 if hasattr(self.app, '_capture_region'):
-                    # Use threading to avoid blocking
-                    threading.Thread(target=self.app._capture_region, daemon=True).start()
+                    # Queues a job on the app's capture scheduler, returns immediately
+                    self.app._capture_region()
+                    
+            elif action == "cancel_schedules":
+                # Pending countdowns, running captures and recurring schedules
+                if hasattr(self.app, '_cancel_captures'):
+                    self.app._cancel_captures()
+                if hasattr(self.app, '_cancel_schedules'):
+                    self.app._cancel_schedules()
                     
             elif action == "restore":
                 self.restore_from_tray()
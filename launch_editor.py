@@ -15,11 +15,21 @@ utils_path = os.path.join(current_dir, "utils")
 if utils_path not in sys.path:
     sys.path.insert(0, utils_path)
 
+def load_pixmap(image_path):
+    """QPixmap from an image file; the app's hand-off files are removed once loaded"""
+    from PySide6.QtGui import QPixmap
+    pixmap = QPixmap(image_path)
+    if os.path.basename(image_path).startswith("zsnapr_edit_"):
+        try:
+            os.remove(image_path)
+        except OSError:
+            pass
+    return pixmap
+
 def main():
     try:
         # Import Qt and editor
         from PySide6.QtWidgets import QApplication
-        from PySide6.QtGui import QPixmap
         from ui.screenshot_editor import create_enhanced_editor
         
         # Get image path from command line arguments
@@ -37,7 +47,7 @@ def main():
         app = QApplication(sys.argv)
         
         # Load image into QPixmap
-        pixmap = QPixmap(image_path)
+        pixmap = load_pixmap(image_path)
         if pixmap.isNull():
             print(f"Error: Failed to load image: {image_path}")
             sys.exit(1)
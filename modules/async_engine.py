@@ -0,0 +1,126 @@
+import os
+import asyncio
+import inspect
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from core.log_sys import get_logger
+
+# asyncio front end for ScreenshotEngine
+#
+# Grabs and region selections run on a small capture pool, saving/encoding
+# on a separate pool, so many captures and saves overlap without a thread
+# per call. Delays are awaited with asyncio.sleep instead of blocking a
+# thread. Timeouts and cancellation stop waiting immediately; a region
+# selection is cancelled in its worker process (or never dispatched when
+# the worker was still starting), other grabs are short and are left to
+# finish in the background.
+
+
+class AsyncScreenshotEngine:
+    """Awaitable capture and save API on top of a ScreenshotEngine"""
+
+    def __init__(self, engine=None, capture_workers=4, encode_workers=None):
+        self.logger = get_logger()
+        self._owns_engine = engine is None
+        if engine is None:
+            from modules.screenshot_engine import ScreenshotEngine
+            engine = ScreenshotEngine()
+        self.engine = engine
+        self._capture_executor = ThreadPoolExecutor(max_workers=capture_workers,
+                                                    thread_name_prefix="zsnapr-capture")
+        self._encode_executor = ThreadPoolExecutor(max_workers=encode_workers or min(4, os.cpu_count() or 1),
+                                                   thread_name_prefix="zsnapr-encode")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def _run(self, executor, func, *args, timeout=None, **kwargs):
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+        if timeout is None:
+            return await future
+        return await asyncio.wait_for(future, timeout)
+
+    async def _delay(self, delay):
+        seconds = self.engine.delay_seconds if delay is None else delay
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+    async def capture_fullscreen(self, delay=None, timeout=None):
+        """Full screen screenshot; delay defaults to the engine's setting"""
+        await self._delay(delay)
+        return await self._run(self._capture_executor, self.engine.grab_fullscreen, timeout=timeout)
+
+    async def capture_window(self, delay=None, timeout=None):
+        """Active window screenshot"""
+        await self._delay(delay)
+        return await self._run(self._capture_executor, self.engine.grab_window, timeout=timeout)
+
+    async def capture_region(self, x=None, y=None, width=None, height=None, on_progress=None,
+                             selection_script=None, delay=None, timeout=120):
+        """Region screenshot; returns (image, action) or None like the sync API
+
+        on_progress may be a plain function or a coroutine function; either
+        way it runs on the event loop. Cancelling the task, or hitting the
+        timeout, closes this call's selection overlay, or keeps it from
+        opening when the worker is still being prepared.
+        """
+        await self._delay(delay)
+        loop = asyncio.get_running_loop()
+
+        def forward_progress(event, payload):
+            # Called on the capture thread; hop back onto the loop
+            if inspect.iscoroutinefunction(on_progress):
+                asyncio.run_coroutine_threadsafe(on_progress(event, payload), loop)
+            else:
+                loop.call_soon_threadsafe(on_progress, event, payload)
+
+        progress = forward_progress if on_progress is not None else None
+
+        interactive = x is None or y is None or width is None or height is None
+        # Per call, so cancelling one capture never closes another one's overlay
+        cancel = threading.Event()
+        try:
+            return await self._run(self._capture_executor, self.engine.capture_region,
+                                   x, y, width, height, on_progress=progress,
+                                   selection_script=selection_script, apply_delay=False,
+                                   cancel_event=cancel, timeout=timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            if interactive:
+                self.logger.debug("Async region capture cancelled, closing overlay")
+            cancel.set()
+            raise
+
+    async def save_screenshot(self, screenshot, filename=None, timeout=None):
+        """Encode and write on the encode pool; returns the file path"""
+        return await self._run(self._encode_executor, self.engine.save_screenshot,
+                               screenshot, filename, timeout=timeout)
+
+    async def capture_and_save(self, mode="fullscreen", filename=None, timeout=None, **kwargs):
+        """Capture with mode fullscreen, window or region and save the result"""
+        if mode == "fullscreen":
+            screenshot = await self.capture_fullscreen(timeout=timeout, **kwargs)
+        elif mode == "window":
+            screenshot = await self.capture_window(timeout=timeout, **kwargs)
+        elif mode == "region":
+            result = await self.capture_region(timeout=timeout or 120, **kwargs)
+            if result is None:
+                return None
+            screenshot = result[0]
+        else:
+            raise ValueError(f"Unknown capture mode: {mode}")
+        if screenshot is None:
+            return None
+        return await self.save_screenshot(screenshot, filename, timeout=timeout)
+
+    async def aclose(self):
+        """Stop the executors (and the engine when this object created it)"""
+        self._capture_executor.shutdown(wait=False, cancel_futures=True)
+        self._encode_executor.shutdown(wait=False, cancel_futures=True)
+        if self._owns_engine:
+            await asyncio.get_running_loop().run_in_executor(None, self.engine.shutdown)
@@ -0,0 +1,150 @@
+import time
+import queue
+import threading
+import numpy as np
+from PIL import Image
+
+from core.log_sys import get_logger
+
+# Burst capture into a ring of reusable frame buffers
+#
+# The capture thread grabs straight into a free slot of a preallocated
+# array and hands the slot index to a saver thread, which encodes it and
+# gives the slot back. When every slot is still waiting to be encoded the
+# frame is dropped rather than stalling the cadence.
+
+
+class FrameRing:
+    """Preallocated slots of HxWx3 uint8 frames"""
+
+    def __init__(self, slots, width, height):
+        self.width = width
+        self.height = height
+        self.frames = np.empty((slots, height, width, 3), dtype=np.uint8)
+        self._free = queue.Queue()
+        for index in range(slots):
+            self._free.put(index)
+
+    @property
+    def slots(self):
+        return self.frames.shape[0]
+
+    def fits(self, slots, width, height):
+        return self.slots >= slots and (self.width, self.height) == (width, height)
+
+    def acquire(self):
+        """Index of a free slot, or None when all slots are in use"""
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            return None
+
+    def release(self, index):
+        self._free.put(index)
+
+    def wait_idle(self, timeout=None):
+        """Wait until every slot has been released"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while self._free.qsize() < self.slots:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+
+def _jitter_stats(lateness_ms):
+    if not lateness_ms:
+        return {"mean_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+    values = np.abs(np.asarray(lateness_ms, dtype=np.float64))
+    return {
+        "mean_ms": round(float(values.mean()), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+class BurstCapture:
+    """Grab N frames at a fixed cadence and save them asynchronously"""
+
+    def __init__(self, backend, ring, save_frame=None):
+        self.logger = get_logger()
+        self.backend = backend
+        self.ring = ring
+        # save_frame(image, index) -> filepath; None keeps frames unsaved
+        self.save_frame = save_frame
+
+    def _saver(self, jobs, results):
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            index, slot = job
+            try:
+                if self.save_frame is not None:
+                    # fromarray wraps the slot; the encoder reads it before we release it
+                    image = Image.fromarray(self.ring.frames[slot], "RGB")
+                    results[index] = self.save_frame(image, index)
+            except Exception as e:
+                self.logger.error(f"Burst frame {index} save failed: {e}")
+            finally:
+                self.ring.release(slot)
+
+    def run(self, count, interval_ms, region=None, wait=True):
+        """Capture count frames interval_ms apart; returns burst statistics"""
+        interval = max(0.0, interval_ms / 1000.0)
+        jobs = queue.Queue()
+        results = {}
+        saver = threading.Thread(target=self._saver, args=(jobs, results), daemon=True)
+        saver.start()
+
+        captured = 0
+        dropped = []
+        lateness_ms = []
+        grab_ms = []
+        started = time.perf_counter()
+        for index in range(count):
+            target = started + index * interval
+            delay = target - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            now = time.perf_counter()
+            if interval and now - target >= interval:
+                # Already at the next tick; capturing now would smear the cadence
+                dropped.append({"index": index, "reason": "late"})
+                continue
+            slot = self.ring.acquire()
+            if slot is None:
+                dropped.append({"index": index, "reason": "ring_full"})
+                continue
+            lateness_ms.append((now - target) * 1000)
+            try:
+                self.backend.grab_into(self.ring.frames[slot], region)
+            except Exception as e:
+                self.ring.release(slot)
+                self.logger.error(f"Burst frame {index} grab failed: {e}")
+                dropped.append({"index": index, "reason": "grab_failed"})
+                continue
+            grab_ms.append((time.perf_counter() - now) * 1000)
+            captured += 1
+            jobs.put((index, slot))
+        capture_ms = (time.perf_counter() - started) * 1000
+
+        jobs.put(None)
+        if wait:
+            saver.join()
+
+        stats = {
+            "requested": count,
+            "captured": captured,
+            "dropped": len(dropped),
+            "dropped_frames": dropped,
+            "interval_ms": interval_ms,
+            "capture_ms": round(capture_ms, 3),
+            "achieved_fps": round(captured / (capture_ms / 1000), 2) if capture_ms > 0 else 0.0,
+            "jitter": _jitter_stats(lateness_ms),
+            "grab_ms_avg": round(float(np.mean(grab_ms)), 3) if grab_ms else 0.0,
+            "files": [results[i] for i in sorted(results)] if wait else [],
+        }
+        self.logger.debug(f"Burst finished: {captured}/{count} frames, {len(dropped)} dropped, "
+                          f"jitter p95={stats['jitter']['p95_ms']}ms")
+        return stats
@@ -0,0 +1,527 @@
+import os
+import sys
+import time
+import threading
+import ctypes
+import ctypes.util
+import numpy as np
+from PIL import Image
+
+from core.log_sys import get_logger
+
+# Screen grabbing backends
+#
+# Every backend implements grab(region=None) where region is (x, y, width,
+# height) in desktop pixels. Backends grab the region natively instead of
+# capturing the full screen and cropping it.
+
+AUTO_BACKEND = "auto"
+
+_backend_classes = {}
+_instances = {}
+_default_backend = None
+_registry_lock = threading.Lock()
+
+
+def register_backend(cls):
+    """Class decorator adding a backend to the registry"""
+    _backend_classes[cls.name] = cls
+    return cls
+
+
+class CaptureBackend:
+    """Base class for screen grabbing implementations"""
+
+    name = "base"
+    # Lower runs first in benchmarks and wins ties
+    priority = 100
+    # Whether the start-up benchmark (a background thread) may pick this backend
+    benchmarked = True
+
+    def is_available(self):
+        """Whether this backend can grab on the current machine"""
+        return False
+
+    def grab(self, region=None):
+        """Grab the screen or a region of it as a PIL image"""
+        raise NotImplementedError
+
+    def grab_into(self, out, region=None):
+        """Grab into a preallocated HxWx3 uint8 RGB array instead of a new image
+
+        Backends that can write pixels straight into the array override this.
+        """
+        image = self.grab(region)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        np.copyto(out, np.asarray(image))
+        return out
+
+    def screen_size(self):
+        """Size of the grabbable screen as (width, height)"""
+        return self.grab().size
+
+    def close(self):
+        """Release native resources"""
+        pass
+
+
+@register_backend
+class PyAutoGuiBackend(CaptureBackend):
+    name = "pyautogui"
+    priority = 50
+
+    def __init__(self):
+        self._pyautogui = None
+
+    def is_available(self):
+        try:
+            import pyautogui
+            self._pyautogui = pyautogui
+            return True
+        except Exception:
+            return False
+
+    def grab(self, region=None):
+        if region is None:
+            return self._pyautogui.screenshot()
+        return self._pyautogui.screenshot(region=tuple(int(v) for v in region))
+
+    def screen_size(self):
+        return tuple(self._pyautogui.size())
+
+
+@register_backend
+class ImageGrabBackend(CaptureBackend):
+    name = "imagegrab"
+    priority = 40
+
+    def __init__(self):
+        self._image_grab = None
+
+    def is_available(self):
+        try:
+            from PIL import ImageGrab
+            self._image_grab = ImageGrab
+        except Exception:
+            return False
+        if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+            return False
+        return True
+
+    def grab(self, region=None):
+        if region is None:
+            return self._image_grab.grab()
+        x, y, w, h = (int(v) for v in region)
+        # bbox is in virtual desktop coordinates; other monitors need all_screens on Windows
+        return self._image_grab.grab(bbox=(x, y, x + w, y + h), all_screens=(sys.platform == "win32"))
+
+
+@register_backend
+class QtScreenBackend(CaptureBackend):
+    name = "qt"
+    priority = 30
+    # Only works on the Qt GUI thread, never the benchmark's; can still be set in settings
+    benchmarked = False
+
+    def __init__(self):
+        self._app = None
+
+    def is_available(self):
+        # QScreen grabs must run on the thread that owns the Qt application
+        try:
+            from PySide6.QtGui import QGuiApplication
+            from PySide6.QtCore import QThread
+        except Exception:
+            return False
+        app = QGuiApplication.instance()
+        if app is None or app.thread() is not QThread.currentThread():
+            return False
+        if QGuiApplication.primaryScreen() is None:
+            return False
+        self._app = app
+        return True
+
+    def grab(self, region=None):
+        from PySide6.QtGui import QGuiApplication, QImage
+        from PySide6.QtCore import QPoint
+        screen = QGuiApplication.primaryScreen()
+        if region is None:
+            geometry = screen.geometry()
+            region = (geometry.x(), geometry.y(), geometry.width(), geometry.height())
+        x, y, w, h = (int(v) for v in region)
+        # Grab from the screen holding the region; grabWindow(0) takes screen-local coordinates
+        screen = QGuiApplication.screenAt(QPoint(x, y)) or screen
+        geometry = screen.geometry()
+        pixmap = screen.grabWindow(0, x - geometry.x(), y - geometry.y(), w, h)
+        image = pixmap.toImage().convertToFormat(QImage.Format.Format_RGB888)
+        return Image.frombytes("RGB", (image.width(), image.height()), bytes(image.constBits()),
+                               "raw", "RGB", image.bytesPerLine(), 1)
+
+    def screen_size(self):
+        from PySide6.QtGui import QGuiApplication
+        geometry = QGuiApplication.primaryScreen().geometry()
+        return geometry.width(), geometry.height()
+
+
+class _XImage(ctypes.Structure):
+    # Leading fields of Xlib's XImage, enough to read the pixel buffer
+    _fields_ = [
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("xoffset", ctypes.c_int),
+        ("format", ctypes.c_int),
+        ("data", ctypes.c_void_p),
+        ("byte_order", ctypes.c_int),
+        ("bitmap_unit", ctypes.c_int),
+        ("bitmap_bit_order", ctypes.c_int),
+        ("bitmap_pad", ctypes.c_int),
+        ("depth", ctypes.c_int),
+        ("bytes_per_line", ctypes.c_int),
+        ("bits_per_pixel", ctypes.c_int),
+        ("red_mask", ctypes.c_ulong),
+        ("green_mask", ctypes.c_ulong),
+        ("blue_mask", ctypes.c_ulong),
+    ]
+
+
+class _XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ("shmseg", ctypes.c_ulong),
+        ("shmid", ctypes.c_int),
+        ("shmaddr", ctypes.c_void_p),
+        ("readOnly", ctypes.c_int),
+    ]
+
+
+_ZPIXMAP = 2
+_ALL_PLANES = 0xFFFFFFFF
+_IPC_PRIVATE = 0
+_IPC_CREAT = 0o1000
+_IPC_RMID = 0
+
+
+@register_backend
+class X11ShmBackend(CaptureBackend):
+    """MIT-SHM grabs on X11; the server writes pixels straight into our segment"""
+
+    name = "x11shm"
+    priority = 10
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._display = None
+        self._root = None
+        self._segments = {}
+
+    def is_available(self):
+        if not sys.platform.startswith("linux") or not os.environ.get("DISPLAY"):
+            return False
+        try:
+            self._load()
+            return self._display is not None
+        except Exception:
+            return False
+
+    def _load(self):
+        if self._display is not None:
+            return
+        x11 = ctypes.CDLL(ctypes.util.find_library("X11") or "libX11.so.6")
+        xext = ctypes.CDLL(ctypes.util.find_library("Xext") or "libXext.so.6")
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XDefaultScreen.argtypes = [ctypes.c_void_p]
+        x11.XDefaultRootWindow.restype = ctypes.c_ulong
+        x11.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        x11.XDefaultVisual.restype = ctypes.c_void_p
+        x11.XDefaultVisual.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDefaultDepth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDisplayWidth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDisplayHeight.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XFree.argtypes = [ctypes.c_void_p]
+        x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+
+        xext.XShmQueryExtension.argtypes = [ctypes.c_void_p]
+        xext.XShmCreateImage.restype = ctypes.POINTER(_XImage)
+        xext.XShmCreateImage.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int,
+                                         ctypes.c_char_p, ctypes.POINTER(_XShmSegmentInfo),
+                                         ctypes.c_uint, ctypes.c_uint]
+        xext.XShmAttach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        xext.XShmDetach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        xext.XShmGetImage.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(_XImage),
+                                      ctypes.c_int, ctypes.c_int, ctypes.c_ulong]
+
+        libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+        libc.shmat.restype = ctypes.c_void_p
+        libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+        libc.shmdt.argtypes = [ctypes.c_void_p]
+        libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+
+        display = x11.XOpenDisplay(None)
+        if not display:
+            return
+        if not xext.XShmQueryExtension(display):
+            x11.XCloseDisplay(display)
+            return
+        screen = x11.XDefaultScreen(display)
+        if x11.XDefaultDepth(display, screen) not in (24, 32):
+            x11.XCloseDisplay(display)
+            return
+
+        self._x11, self._xext, self._libc = x11, xext, libc
+        self._screen = screen
+        self._visual = x11.XDefaultVisual(display, screen)
+        self._depth = x11.XDefaultDepth(display, screen)
+        self._root = x11.XDefaultRootWindow(display)
+        self._display = display
+
+    def _segment(self, width, height):
+        # One shared XImage per region size, reused across grabs
+        key = (width, height)
+        segment = self._segments.get(key)
+        if segment is not None:
+            return segment
+
+        info = _XShmSegmentInfo()
+        ximage = self._xext.XShmCreateImage(self._display, self._visual, self._depth, _ZPIXMAP,
+                                            None, ctypes.byref(info), width, height)
+        if not ximage:
+            raise RuntimeError("XShmCreateImage failed")
+        size = ximage.contents.bytes_per_line * height
+        info.shmid = self._libc.shmget(_IPC_PRIVATE, size, _IPC_CREAT | 0o600)
+        if info.shmid < 0:
+            self._x11.XFree(ximage)
+            raise OSError(ctypes.get_errno(), "shmget failed")
+        address = self._libc.shmat(info.shmid, None, 0)
+        if address in (None, ctypes.c_void_p(-1).value):
+            self._libc.shmctl(info.shmid, _IPC_RMID, None)
+            self._x11.XFree(ximage)
+            raise OSError(ctypes.get_errno(), "shmat failed")
+        info.shmaddr = address
+        info.readOnly = 0
+        ximage.contents.data = address
+        self._xext.XShmAttach(self._display, ctypes.byref(info))
+        self._x11.XSync(self._display, 0)
+        # Marked for removal now; it disappears once both sides detach
+        self._libc.shmctl(info.shmid, _IPC_RMID, None)
+
+        # Keep the cache small, regions rarely repeat beyond the full screen
+        if len(self._segments) >= 4:
+            self._release(self._segments.pop(next(iter(self._segments))))
+        segment = (ximage, info)
+        self._segments[key] = segment
+        return segment
+
+    def _release(self, segment):
+        ximage, info = segment
+        try:
+            self._xext.XShmDetach(self._display, ctypes.byref(info))
+            self._x11.XSync(self._display, 0)
+            ximage.contents.data = None
+            self._x11.XFree(ximage)
+            self._libc.shmdt(info.shmaddr)
+        except Exception:
+            pass
+
+    def screen_size(self):
+        return (self._x11.XDisplayWidth(self._display, self._screen),
+                self._x11.XDisplayHeight(self._display, self._screen))
+
+    def _get_image(self, region):
+        # Caller holds the lock; the returned XImage is overwritten by the next grab
+        screen_w, screen_h = self.screen_size()
+        if region is None:
+            region = (0, 0, screen_w, screen_h)
+        x, y, w, h = (int(v) for v in region)
+        # XShmGetImage fails hard on areas outside the root window
+        if w <= 0 or h <= 0 or x < 0 or y < 0 or x + w > screen_w or y + h > screen_h:
+            raise ValueError(f"Region {region} is outside the screen {screen_w}x{screen_h}")
+        ximage, _ = self._segment(w, h)
+        if not self._xext.XShmGetImage(self._display, self._root, ximage, x, y, _ALL_PLANES):
+            raise RuntimeError("XShmGetImage failed")
+        return ximage.contents, w, h
+
+    def grab(self, region=None):
+        with self._lock:
+            ximage, w, h = self._get_image(region)
+            stride = ximage.bytes_per_line
+            data = ctypes.string_at(ximage.data, stride * h)
+            return Image.frombuffer("RGB", (w, h), data, "raw", "BGRX", stride, 1)
+
+    def grab_into(self, out, region=None):
+        with self._lock:
+            ximage, w, h = self._get_image(region)
+            stride = ximage.bytes_per_line
+            raw = (ctypes.c_uint8 * (stride * h)).from_address(ximage.data)
+            bgrx = np.frombuffer(raw, dtype=np.uint8).reshape(h, stride)[:, :w * 4].reshape(h, w, 4)
+            # BGRX -> RGB straight from the shared segment
+            out[...] = bgrx[..., 2::-1]
+            return out
+
+    def close(self):
+        with self._lock:
+            for segment in self._segments.values():
+                self._release(segment)
+            self._segments.clear()
+            if self._display is not None:
+                self._x11.XCloseDisplay(self._display)
+                self._display = None
+
+
+def get_backend(name):
+    """Get a working backend instance by name, or None"""
+    with _registry_lock:
+        backend = _instances.get(name)
+        if backend is not None:
+            return backend
+        cls = _backend_classes.get(name)
+        if cls is None:
+            return None
+        backend = cls()
+        try:
+            if not backend.is_available():
+                return None
+        except Exception:
+            return None
+        _instances[name] = backend
+        return backend
+
+
+def available_backends():
+    """Names of backends that work on this machine, best candidates first"""
+    names = sorted(_backend_classes, key=lambda n: _backend_classes[n].priority)
+    return [name for name in names if get_backend(name) is not None]
+
+
+def benchmark_backends(rounds=3, region=None):
+    """Time each working backend; returns {name: {"full_ms", "region_ms"}}
+
+    Backends that raise during the benchmark are left out of the result,
+    and so are the ones not meant to be benchmarked (see CaptureBackend).
+    """
+    logger = get_logger()
+    results = {}
+    for name in available_backends():
+        if not _backend_classes[name].benchmarked:
+            continue
+        backend = get_backend(name)
+        try:
+            # Warm-up grab opens displays, allocates segments, loads DLLs
+            full = backend.grab()
+            width, height = full.size
+            probe = region or (width // 4, height // 4, max(1, width // 2), max(1, height // 2))
+
+            started = time.perf_counter()
+            for _ in range(rounds):
+                backend.grab()
+            full_ms = (time.perf_counter() - started) * 1000 / rounds
+
+            backend.grab(probe)
+            started = time.perf_counter()
+            for _ in range(rounds):
+                image = backend.grab(probe)
+            region_ms = (time.perf_counter() - started) * 1000 / rounds
+            if image.size != (probe[2], probe[3]):
+                raise RuntimeError(f"region grab returned {image.size}")
+
+            results[name] = {"full_ms": round(full_ms, 2), "region_ms": round(region_ms, 2)}
+            logger.debug(f"Capture backend {name}: full={full_ms:.1f}ms region={region_ms:.1f}ms")
+        except Exception as e:
+            logger.warning(f"Capture backend {name} failed benchmark: {e}")
+    return results
+
+
+def select_fastest_backend(rounds=3):
+    """Benchmark the working backends and make the fastest one the default
+
+    Returns (name or None, results). The choice only holds for this
+    process; save_backend_choice() caches it in settings.
+    """
+    global _default_backend
+    results = benchmark_backends(rounds=rounds)
+    if not results:
+        return None, results
+    best = min(results, key=lambda n: results[n]["full_ms"] + results[n]["region_ms"])
+    _default_backend = get_backend(best)
+    get_logger().info(f"Selected capture backend: {best}")
+    return best, results
+
+
+def save_backend_choice(name):
+    """Cache a benchmarked backend in settings so later starts skip the benchmark
+
+    Rewrites settings.json without a lock: call it from the main thread only.
+    """
+    if not name or os.environ.get("ZSNAPR_SYNTHETIC_DESKTOP"):
+        return
+    try:
+        from config import load_settings, save_settings
+        settings = load_settings()
+        settings["capture_backend"] = name
+        save_settings(settings)
+    except Exception as e:
+        get_logger().error(f"Failed to cache capture backend choice: {e}")
+
+
+def set_default_backend(backend):
+    """Use backend for all grabs in this process"""
+    global _default_backend
+    with _registry_lock:
+        _instances[backend.name] = backend
+    _default_backend = backend
+
+
+def get_default_backend():
+    """Backend used for all grabs in this process
+
+    Uses the choice cached in settings when it still works here; otherwise
+    falls back to the first working backend without benchmarking.
+    """
+    global _default_backend
+    if _default_backend is not None:
+        return _default_backend
+    if os.environ.get("ZSNAPR_SYNTHETIC_DESKTOP"):
+        # Headless runs: the synthetic desktop replaces the real screen
+        from modules import synthetic_desktop
+        backend = get_backend(synthetic_desktop.SyntheticBackend.name)
+        if backend is not None:
+            _default_backend = backend
+            return backend
+    preferred = None
+    try:
+        from config import load_settings, DEFAULT_SETTINGS
+        preferred = load_settings().get("capture_backend") or DEFAULT_SETTINGS.get("capture_backend")
+    except Exception:
+        pass
+    backend = None
+    if preferred and preferred != AUTO_BACKEND:
+        backend = get_backend(preferred)
+    if backend is None:
+        # pyautogui is the historical behaviour, keep it as the safe default
+        backend = get_backend("pyautogui")
+    if backend is None:
+        names = available_backends()
+        backend = get_backend(names[0]) if names else None
+    _default_backend = backend
+    return backend
+
+
+def has_cached_choice():
+    """Whether settings already name a backend picked by a benchmark"""
+    try:
+        from config import load_settings
+        name = load_settings().get("capture_backend")
+    except Exception:
+        return False
+    return bool(name) and name != AUTO_BACKEND
+
+
+def grab(region=None):
+    """Grab the screen, or region (x, y, width, height), with the default backend"""
+    backend = get_default_backend()
+    if backend is None:
+        raise RuntimeError("No screen capture backend available")
+    return backend.grab(region)
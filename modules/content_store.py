@@ -0,0 +1,174 @@
+import os
+import shutil
+import hashlib
+import threading
+
+import numpy as np
+
+from core.log_sys import get_logger
+
+# Content-addressed screenshot store
+#
+# Saved screenshots are keyed by a BLAKE2b digest of their raw pixels, mode
+# and size, combined with the format and encoder settings. The first file
+# saved for a key is adopted into <save directory>/.zsnapr-store as a
+# hardlink, so it costs no extra space.
+# A later capture with the same key is not encoded again: its file becomes
+# a hardlink to the stored copy, a symlink where hardlinks are not possible,
+# or a plain copy as the last resort.
+#
+# Hardlinks share one inode, so a stored copy is only reused while its size
+# and mtime still match what was recorded when it was adopted; a file edited
+# in place is dropped from the store instead of spreading the edit.
+
+STORE_DIRNAME = ".zsnapr-store"
+INDEX_FILENAME = "index.log"  # one "key size mtime_ns filename" line per adopted file
+HARDLINK = "hardlink"
+SYMLINK = "symlink"
+COPY = "copy"
+DIGEST_SIZE = 20
+
+
+def pixel_digest(image):
+    """Hex BLAKE2b digest of an image's raw pixels, mode and size (PIL image or array)"""
+    if isinstance(image, np.ndarray):
+        header, data = f"{image.dtype}{image.shape}", memoryview(np.ascontiguousarray(image)).cast("B")
+    else:
+        header, data = f"{image.mode}{image.size}", image.tobytes()
+    digest = hashlib.blake2b(f"{header}|".encode(), digest_size=DIGEST_SIZE)
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class ContentStore:
+    """Deduplicating store for one save directory"""
+
+    def __init__(self, directory):
+        self.logger = get_logger()
+        self.root = os.path.join(directory, STORE_DIRNAME)
+        self._lock = threading.Lock()
+        self._index = None  # key -> (size, mtime_ns, filename), loaded on first use
+        self.stats = {"hits": 0, "misses": 0, "bytes_saved": 0, HARDLINK: 0, SYMLINK: 0, COPY: 0}
+
+    @staticmethod
+    def key(pixel_hash, variant=""):
+        """Store key of an image from its pixel_digest() and variant (format, encoder settings)"""
+        return hashlib.blake2b(f"{pixel_hash}|{variant}".encode(), digest_size=DIGEST_SIZE).hexdigest()
+
+    def _load_index(self):
+        # Caller holds the lock; later lines win, so re-adopted keys replace older ones
+        if self._index is not None:
+            return self._index
+        self._index = {}
+        try:
+            with open(os.path.join(self.root, INDEX_FILENAME), "r", encoding="utf-8") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 4:
+                        self._index[parts[0]] = (int(parts[1]), int(parts[2]), parts[3])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Content store index unreadable, starting over: {e}")
+        return self._index
+
+    def _blob_path(self, filename):
+        return os.path.join(self.root, filename[:2], filename)
+
+    def _stored(self, key):
+        # Path of the intact stored copy of key, or None; stale entries are dropped
+        entry = self._load_index().get(key)
+        if entry is None:
+            return None
+        size, mtime_ns, filename = entry
+        path = self._blob_path(filename)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            del self._index[key]
+            return None
+        if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+            self.logger.debug(f"Stored copy {filename} was modified, not reusing it")
+            del self._index[key]
+            self._unlink(path)
+            return None
+        return path
+
+    def materialize(self, key, path):
+        """Create path as a reference to the stored copy of key
+
+        Returns (method, bytes saved), or None when nothing is stored for key
+        and the image has to be encoded.
+        """
+        with self._lock:
+            source = self._stored(key)
+            if source is None:
+                self.stats["misses"] += 1
+                return None
+        size = os.path.getsize(source)
+        for method in (HARDLINK, SYMLINK, COPY):
+            try:
+                if method == HARDLINK:
+                    os.link(source, path)
+                elif method == SYMLINK:
+                    os.symlink(os.path.abspath(source), path)
+                else:
+                    shutil.copyfile(source, path)
+            except (OSError, NotImplementedError):
+                continue
+            saved = 0 if method == COPY else size
+            with self._lock:
+                self.stats["hits"] += 1
+                self.stats[method] += 1
+                self.stats["bytes_saved"] += saved
+            return method, saved
+        return None
+
+    def adopt(self, key, path):
+        """Record the freshly saved file at path as the stored copy of key"""
+        filename = key + os.path.splitext(path)[1].lower()
+        blob = self._blob_path(filename)
+        with self._lock:
+            if self._stored(key) is not None:
+                return
+            try:
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                self._unlink(blob)
+                try:
+                    os.link(path, blob)
+                except OSError:
+                    # No hardlinks here (FAT, some network shares): keep a real copy for symlinks
+                    shutil.copyfile(path, blob)
+                stat = os.stat(blob)
+                with open(os.path.join(self.root, INDEX_FILENAME), "a", encoding="utf-8") as f:
+                    f.write(f"{key} {stat.st_size} {stat.st_mtime_ns} {filename}\n")
+                self._index[key] = (stat.st_size, stat.st_mtime_ns, filename)
+            except OSError as e:
+                self.logger.warning(f"Could not add {os.path.basename(path)} to the content store: {e}")
+
+    def disk_savings(self):
+        """Bytes the hardlinked duplicates in the store would take up as separate files"""
+        with self._lock:
+            entries = list(self._load_index().values())
+        saved = 0
+        for size, _, filename in entries:
+            try:
+                stat = os.stat(self._blob_path(filename))
+            except OSError:
+                continue
+            # One link is the store's own, one is the first visible file
+            saved += max(0, stat.st_nlink - 2) * stat.st_size
+        return saved
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["stored"] = len(self._load_index())
+        return stats
+
+    @staticmethod
+    def _unlink(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -1,10 +1,16 @@
 import io
 from PIL import Image
-import win32clipboard
+try:
+    import win32clipboard
+except ImportError:
+    win32clipboard = None
 
 class ClipboardManager:
     """Clipboard operations for screenshots"""
     
+    # win32clipboard or a compatible shim (see synthetic_desktop.FakeClipboard)
+    clipboard = win32clipboard
+    
     @staticmethod
     def copy_image_to_clipboard(image):
         """Copy PIL Image to Windows clipboard"""
@@ -16,10 +22,14 @@ class ClipboardManager:
             output.close()
             
             # Copy to clipboard
-            win32clipboard.OpenClipboard()
-            win32clipboard.EmptyClipboard()
-            win32clipboard.SetClipboardData(win32clipboard.CF_DIB, data)
-            win32clipboard.CloseClipboard()
+            clipboard = ClipboardManager.clipboard
+            if clipboard is None:
+                print("Clipboard copy error: no clipboard available")
+                return False
+            clipboard.OpenClipboard()
+            clipboard.EmptyClipboard()
+            clipboard.SetClipboardData(clipboard.CF_DIB, data)
+            clipboard.CloseClipboard()
             
             return True
         except Exception as e:
@@ -30,10 +40,14 @@ class ClipboardManager:
     def copy_file_to_clipboard(filepath):
         """Copy file path to clipboard"""
         try:
-            win32clipboard.OpenClipboard()
-            win32clipboard.EmptyClipboard()
-            win32clipboard.SetClipboardText(filepath)
-            win32clipboard.CloseClipboard()
+            clipboard = ClipboardManager.clipboard
+            if clipboard is None:
+                print("File path copy error: no clipboard available")
+                return False
+            clipboard.OpenClipboard()
+            clipboard.EmptyClipboard()
+            clipboard.SetClipboardText(filepath)
+            clipboard.CloseClipboard()
             return True
         except Exception as e:
             print(f"File path copy error: {e}")
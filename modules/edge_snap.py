@@ -0,0 +1,151 @@
+import threading
+import time
+
+import numpy as np
+
+from core.log_sys import get_logger
+
+# Edge snapping for the region overlay
+#
+# Straight UI borders are found once per overlay: a column boundary is a
+# vertical edge inside a horizontal band of rows when the luma step across
+# it is strong on most rows of the band (text and photos rarely line up
+# that way), and likewise for horizontal edges inside vertical bands. Bands
+# overlap, starting every quarter band. For every band the nearest edge within the snap radius is
+# precomputed for every coordinate, so snapping during a drag is two array
+# reads.
+
+DEFAULT_BAND = 32
+DEFAULT_RADIUS = 8
+DEFAULT_THRESHOLD = 24
+DEFAULT_COVERAGE = 0.75
+BAND_STEPS = 4  # bands start every band / BAND_STEPS lines
+
+
+def _nearest_within(strong, radius):
+    """For each row of a (bands, n) mask, the nearest True index per position, or -1"""
+    bands, n = strong.shape
+    positions = np.arange(n, dtype=np.int32)
+    marked = np.where(strong, positions, -1)
+    before = np.maximum.accumulate(marked, axis=1)
+    marked = np.where(strong, positions, n)
+    after = np.minimum.accumulate(marked[:, ::-1], axis=1)[:, ::-1]
+    left = np.where(before >= 0, positions - before, n)
+    right = np.where(after < n, after - positions, n)
+    nearest = np.where(left <= right, before, after)
+    nearest[np.minimum(left, right) > radius] = -1
+    return nearest.astype(np.int32)
+
+
+def _strong_edges(steps, band, coverage):
+    # steps: (lines, boundaries) bool. Bands of `band` lines start every quarter band, so
+    # some band ends right at any line and another starts there; keep boundaries most
+    # lines of a band agree on
+    lines, boundaries = steps.shape
+    stride = max(1, band // BAND_STEPS)
+    chunks = -(-lines // stride)
+    padded = np.zeros((chunks * stride, boundaries), dtype=np.uint8)
+    padded[:lines] = steps
+    cumulative = np.zeros((chunks + 1, boundaries), dtype=np.uint32)
+    np.cumsum(padded.reshape(chunks, stride, boundaries).sum(axis=1, dtype=np.uint32), axis=0,
+              out=cumulative[1:])
+    sizes = np.minimum(np.arange(1, chunks + 1) * stride, lines) - np.arange(chunks + 1)[:-1] * stride
+    sizes = np.concatenate([[0], np.cumsum(sizes)])
+    span = min(BAND_STEPS, chunks)
+    counts = cumulative[span:] - cumulative[:-span]
+    rows = sizes[span:] - sizes[:-span]
+    return counts >= np.ceil(rows * coverage)[:, None]
+
+
+def gray_from_rgb(pixels):
+    """Approximate luma of an (h, w, 3 or 4) RGB/BGR(A) array; green weighs double either way"""
+    luma = pixels[..., 0].astype(np.uint16)
+    luma += pixels[..., 1]
+    luma += pixels[..., 1]
+    luma += pixels[..., 2]
+    return (luma >> 2).astype(np.uint8)
+
+
+class EdgeMap:
+    """Per-band nearest strong edge for every x and y of a grayscale frame"""
+
+    def __init__(self, gray, band=DEFAULT_BAND, radius=DEFAULT_RADIUS, threshold=DEFAULT_THRESHOLD,
+                 coverage=DEFAULT_COVERAGE):
+        height, width = gray.shape
+        self.width = width
+        self.height = height
+        self.band = band
+        self._stride = max(1, band // BAND_STEPS)
+        gray = gray.astype(np.int16)
+        # Boundary x sits between columns x - 1 and x; index 0 is the frame's own left edge
+        vertical = np.zeros((height, width + 1), dtype=bool)
+        vertical[:, 1:width] = np.abs(gray[:, 1:] - gray[:, :-1]) >= threshold
+        horizontal = np.zeros((width, height + 1), dtype=bool)
+        horizontal[:, 1:height] = (np.abs(gray[1:] - gray[:-1]) >= threshold).T
+        strong_x = _strong_edges(vertical, band, coverage)
+        strong_y = _strong_edges(horizontal, band, coverage)
+        # The frame border always counts as an edge
+        strong_x[:, [0, width]] = True
+        strong_y[:, [0, height]] = True
+        self._snap_x = _nearest_within(strong_x, radius)
+        self._snap_y = _nearest_within(strong_y, radius)
+
+    def _lookup(self, table, value, across):
+        # The band starting at the pointer and the one ending there, e.g. just outside a window corner
+        last = table.shape[0] - 1
+        below = min(across // self._stride, last)
+        above = min(max((across + 1) // self._stride - BAND_STEPS, 0), last)
+        best = None
+        for band in (below, above):
+            snapped = table[band, value]
+            if snapped >= 0 and (best is None or abs(snapped - value) < abs(best - value)):
+                best = int(snapped)
+        return best
+
+    def snap_x(self, x, y):
+        """Nearest vertical edge boundary to x around row y, or None"""
+        if not (0 <= x <= self.width and 0 <= y < self.height):
+            return None
+        return self._lookup(self._snap_x, x, y)
+
+    def snap_y(self, y, x):
+        """Nearest horizontal edge boundary to y around column x, or None"""
+        if not (0 <= y <= self.height and 0 <= x < self.width):
+            return None
+        return self._lookup(self._snap_y, y, x)
+
+
+class EdgeMapBuilder:
+    """Builds an EdgeMap on a daemon thread; .edge_map stays None until it is ready"""
+
+    def __init__(self, load_gray, **options):
+        # load_gray() runs on the worker thread too, so image conversion never blocks the caller
+        self.logger = get_logger()
+        self.load_gray = load_gray
+        self.options = options
+        self.edge_map = None
+        self.build_ms = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        started = time.perf_counter()
+        try:
+            gray = self.load_gray()
+            if gray is None:
+                return
+            edge_map = EdgeMap(gray, **self.options)
+        except Exception as e:
+            self.logger.error(f"Edge map build failed: {e}")
+            return
+        self.build_ms = (time.perf_counter() - started) * 1000
+        # A single attribute store publishes the finished map to the UI thread
+        self.edge_map = edge_map
+        self.logger.debug(f"Edge map ready: {gray.shape[1]}x{gray.shape[0]} in {self.build_ms:.1f} ms")
+
+    @property
+    def ready(self):
+        return self.edge_map is not None
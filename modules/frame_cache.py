@@ -0,0 +1,99 @@
+import time
+import threading
+
+from core.log_sys import get_logger
+
+# Short-lived reuse of grabbed frames
+#
+# A double-pressed hotkey, or the tray and a hotkey firing together, used to
+# grab the screen twice a few milliseconds apart. Frames are cached per
+# (backend, monitor) for a short freshness window; requests inside it get
+# the same frame, and region/window requests crop from it. Concurrent
+# requests for the same key wait for the grab already in flight instead of
+# starting their own. Cached frames are shared: callers must not draw on
+# them in place.
+
+
+class _Entry:
+    __slots__ = ("lock", "image", "bounds", "timestamp", "finished")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.image = None
+        self.bounds = None  # (x, y, width, height) on the virtual desktop
+        self.timestamp = 0.0  # grab started
+        self.finished = 0.0  # grab returned
+
+
+class FrameCache:
+    """Frames keyed by backend and monitor, reused within window_ms"""
+
+    def __init__(self, window_ms=50):
+        self.logger = get_logger()
+        self.window = max(0.0, window_ms) / 1000
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "crops": 0}
+
+    def _fresh(self, entry, requested):
+        # Taken within the window before the request, or still in flight when it arrived
+        if entry.image is None:
+            return False
+        return requested - entry.timestamp <= self.window or entry.finished >= requested
+
+    def get(self, backend, monitor, grab, origin=(0, 0)):
+        """Cached frame of monitor, or grab() it; origin is the frame's top-left on the desktop"""
+        if self.window <= 0:
+            return grab()
+        requested = time.perf_counter()
+        key = (backend.name, monitor)
+        with self._lock:
+            entry = self._entries.setdefault(key, _Entry())
+        with entry.lock:
+            if self._fresh(entry, requested):
+                self._count("hits")
+                return entry.image
+            self._count("misses")
+            # Freshness counts from when the pixels were taken, not when the grab returned
+            started = time.perf_counter()
+            image = grab()
+            if image is None:
+                return None
+            entry.image, entry.bounds = image, (origin[0], origin[1]) + tuple(image.size)
+            entry.timestamp, entry.finished = started, time.perf_counter()
+            return image
+
+    def crop(self, backend, region):
+        """Region cut from a fresh cached frame that contains it, or None"""
+        if self.window <= 0:
+            return None
+        x, y, width, height = region
+        requested = time.perf_counter()
+        with self._lock:
+            entries = [entry for key, entry in self._entries.items() if key[0] == backend.name]
+        for entry in entries:
+            # Snapshot the fields; a concurrent refresh replaces them together under entry.lock
+            with entry.lock:
+                if not self._fresh(entry, requested):
+                    continue
+                image, (left, top, frame_width, frame_height) = entry.image, entry.bounds
+            if left <= x and top <= y and x + width <= left + frame_width and y + height <= top + frame_height:
+                self._count("crops")
+                return image.crop((x - left, y - top, x - left + width, y - top + height))
+        return None
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["window_ms"] = self.window * 1000
+        return stats
@@ -0,0 +1,175 @@
+import os
+import sys
+import ctypes
+import ctypes.util
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+from PIL import Image
+
+from core.log_sys import get_logger
+
+# Monitor layout and per-monitor capture
+#
+# Monitors are described in virtual desktop coordinates; the top-left
+# monitor may sit at negative offsets. A stitched frame always has its
+# origin at the virtual desktop's top-left corner.
+
+
+@dataclass(frozen=True)
+class Monitor:
+    index: int
+    x: int
+    y: int
+    width: int
+    height: int
+    primary: bool = False
+    name: str = ""
+
+    @property
+    def region(self):
+        return (self.x, self.y, self.width, self.height)
+
+
+def virtual_bounds(monitors):
+    """(x, y, width, height) of the rectangle spanning all monitors"""
+    left = min(m.x for m in monitors)
+    top = min(m.y for m in monitors)
+    right = max(m.x + m.width for m in monitors)
+    bottom = max(m.y + m.height for m in monitors)
+    return left, top, right - left, bottom - top
+
+
+def _from_backend(backend):
+    # Synthetic desktops know their own layout
+    desktop = getattr(backend, "desktop", None)
+    if desktop is None:
+        return None
+    return [Monitor(i, x, y, w, h, primary=(i == 0), name=f"synthetic-{i}")
+            for i, (x, y, w, h) in enumerate(desktop.monitors)]
+
+
+def _from_win32():
+    try:
+        import win32api
+    except ImportError:
+        return None
+    monitors = []
+    for handle, _, rect in win32api.EnumDisplayMonitors():
+        info = win32api.GetMonitorInfo(handle)
+        left, top, right, bottom = info.get("Monitor", rect)
+        monitors.append(Monitor(len(monitors), left, top, right - left, bottom - top,
+                                primary=bool(info.get("Flags", 0) & 1), name=info.get("Device", "")))
+    return monitors
+
+
+class _XineramaScreenInfo(ctypes.Structure):
+    _fields_ = [
+        ("screen_number", ctypes.c_int),
+        ("x_org", ctypes.c_short),
+        ("y_org", ctypes.c_short),
+        ("width", ctypes.c_short),
+        ("height", ctypes.c_short),
+    ]
+
+
+def _from_xinerama():
+    if not sys.platform.startswith("linux") or not os.environ.get("DISPLAY"):
+        return None
+    try:
+        x11 = ctypes.CDLL(ctypes.util.find_library("X11") or "libX11.so.6")
+        xinerama = ctypes.CDLL(ctypes.util.find_library("Xinerama") or "libXinerama.so.1")
+    except OSError:
+        return None
+    x11.XOpenDisplay.restype = ctypes.c_void_p
+    x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+    x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+    x11.XFree.argtypes = [ctypes.c_void_p]
+    xinerama.XineramaIsActive.argtypes = [ctypes.c_void_p]
+    xinerama.XineramaQueryScreens.restype = ctypes.POINTER(_XineramaScreenInfo)
+    xinerama.XineramaQueryScreens.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_int)]
+
+    display = x11.XOpenDisplay(None)
+    if not display:
+        return None
+    try:
+        if not xinerama.XineramaIsActive(display):
+            return None
+        count = ctypes.c_int(0)
+        screens = xinerama.XineramaQueryScreens(display, ctypes.byref(count))
+        if not screens:
+            return None
+        try:
+            return [Monitor(i, screens[i].x_org, screens[i].y_org, screens[i].width, screens[i].height,
+                            primary=(i == 0), name=f"xinerama-{screens[i].screen_number}")
+                    for i in range(count.value)]
+        finally:
+            x11.XFree(screens)
+    finally:
+        x11.XCloseDisplay(display)
+
+
+def _from_qt():
+    try:
+        from PySide6.QtGui import QGuiApplication
+    except Exception:
+        return None
+    if QGuiApplication.instance() is None:
+        return None
+    primary = QGuiApplication.primaryScreen()
+    monitors = []
+    for screen in QGuiApplication.screens():
+        g = screen.geometry()
+        monitors.append(Monitor(len(monitors), g.x(), g.y(), g.width(), g.height(),
+                                primary=(screen is primary), name=screen.name()))
+    return monitors
+
+
+def enumerate_monitors(backend=None):
+    """Monitors of this machine, primary first
+
+    Tries the capture backend's own layout, Win32, Xinerama and Qt, then
+    falls back to a single monitor the size of the backend's screen.
+    """
+    logger = get_logger()
+    for source in (lambda: _from_backend(backend), _from_win32, _from_xinerama, _from_qt):
+        try:
+            monitors = source()
+        except Exception as e:
+            logger.debug(f"Monitor enumeration source failed: {e}")
+            monitors = None
+        if monitors:
+            break
+    else:
+        width, height = backend.screen_size()
+        monitors = [Monitor(0, 0, 0, width, height, primary=True, name="default")]
+    ordered = sorted(monitors, key=lambda m: (not m.primary, m.x, m.y))
+    return [Monitor(i, m.x, m.y, m.width, m.height, m.primary, m.name) for i, m in enumerate(ordered)]
+
+
+def capture_monitor(backend, monitor):
+    """Grab one monitor only"""
+    return backend.grab(monitor.region)
+
+
+def capture_virtual_desktop(backend, monitors, parallel=True):
+    """Grab every monitor (in parallel) and stitch them into one frame
+
+    Gaps between monitors of different sizes are left black.
+    """
+    left, top, width, height = virtual_bounds(monitors)
+    canvas = np.zeros((height, width, 3), dtype=np.uint8)
+
+    def grab(monitor):
+        ox, oy = monitor.x - left, monitor.y - top
+        backend.grab_into(canvas[oy:oy + monitor.height, ox:ox + monitor.width], monitor.region)
+
+    if parallel and len(monitors) > 1:
+        with ThreadPoolExecutor(max_workers=len(monitors), thread_name_prefix="zsnapr-monitor") as pool:
+            # list() re-raises the first grab error
+            list(pool.map(grab, monitors))
+    else:
+        for monitor in monitors:
+            grab(monitor)
+    return Image.fromarray(canvas, "RGB")
@@ -0,0 +1,450 @@
+import os
+import struct
+
+import numpy as np
+from PIL import Image
+
+# QOI ("Quite OK Image") codec, vectorized with numpy
+#
+# Offered as a save format. Files follow the QOI specification, so any QOI
+# reader opens them.
+#
+# QOI is a sequential format: every op depends on the previous pixel and on
+# a 64-entry table of recently seen colours. The encoder resolves that state
+# with whole-array operations: runs are pixels equal to their predecessor,
+# and a table hit is "the last non-run pixel with the same hash has the same
+# colour", found with one stable sort by hash. The decoder finds op
+# boundaries by walking byte blocks in lockstep, then resolves op colours in
+# chunks: the hash is linear mod 64, so every op's hash can be predicted
+# from the op stream alone, table lookups resolved with one sort, and the
+# prediction verified and refined. Refinement usually settles in a pass or
+# two, but lookups interleaved with alpha changes can need one pass per
+# lookup; a chunk that stops converging, or has not settled after
+# _MAX_PASSES, is decoded op by op instead, which is slower but bounded.
+
+MAGIC = b"qoif"
+HEADER_SIZE = 14
+END_MARKER = b"\x00" * 7 + b"\x01"
+EXTENSION = ".qoi"
+
+OP_INDEX = 0x00
+OP_DIFF = 0x40
+OP_LUMA = 0x80
+OP_RUN = 0xC0
+OP_RGB = 0xFE
+OP_RGBA = 0xFF
+MAX_RUN = 62
+
+# Op kinds the decoder works with
+_INDEX, _DIFF, _LUMA, _RGB, _RGBA = range(5)
+_DECODE_CHUNK = 1 << 20  # ops resolved together
+_MAX_PASSES = 8  # refinements per chunk before falling back to the sequential decoder
+_MAX_PIXELS = 400_000_000
+
+
+class QOIError(ValueError):
+    """Data is not a valid QOI image"""
+
+
+def _hash(rgba):
+    # (r * 3 + g * 5 + b * 7 + a * 11) % 64 per row of an (n, 4) uint8 array
+    weighted = rgba.astype(np.uint16) * np.array([3, 5, 7, 11], dtype=np.uint16)
+    return (weighted.sum(axis=1, dtype=np.uint16) % 64).astype(np.uint8)
+
+
+def _wrap(delta):
+    # Byte difference as a signed value in -128..127, like a C signed char
+    return ((delta + 128) & 0xFF) - 128
+
+
+def _pixels(image):
+    # (uint8 array h x w x 3|4, channels) for PIL images or arrays
+    if isinstance(image, np.ndarray):
+        pixels = image
+    else:
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+        pixels = np.asarray(image)
+    if pixels.dtype != np.uint8 or pixels.ndim != 3 or pixels.shape[2] not in (3, 4):
+        raise ValueError(f"QOI needs 8-bit RGB or RGBA pixels, got {pixels.dtype} {pixels.shape}")
+    return pixels, pixels.shape[2]
+
+
+def encode(image, colorspace=0):
+    """QOI bytes for a PIL image or an (h, w, 3|4) uint8 array"""
+    pixels, channels = _pixels(image)
+    height, width = pixels.shape[:2]
+    count = height * width
+    if channels == 4:
+        rgba = np.ascontiguousarray(pixels).reshape(count, 4)
+    else:
+        rgba = np.empty((count, 4), dtype=np.uint8)
+        rgba[:, :3] = pixels.reshape(count, 3)
+        rgba[:, 3] = 255
+    packed = rgba.view("<u4").ravel()
+
+    # Runs: pixels equal to the previous one (the first is compared with opaque black)
+    is_run = np.empty(count, dtype=bool)
+    if count:
+        is_run[0] = packed[0] == 0xFF000000
+        np.equal(packed[1:], packed[:-1], out=is_run[1:])
+    ops = np.flatnonzero(~is_run)
+    values = rgba[ops]
+    previous = rgba[ops - 1]
+    if len(ops) and ops[0] == 0:
+        previous[0] = (0, 0, 0, 255)
+
+    # Table hits: the last op with the same hash had the same colour (the table starts zeroed)
+    hashes = _hash(values)
+    order = np.argsort(hashes, kind="stable")
+    same_slot = np.full(len(ops), -1, dtype=np.int64)
+    continues = hashes[order[1:]] == hashes[order[:-1]]
+    same_slot[order[1:][continues]] = order[:-1][continues]
+    op_packed = packed[ops]
+    earlier = np.where(same_slot >= 0, op_packed[same_slot], 0)
+    hit = earlier == op_packed
+
+    delta = _wrap(values.astype(np.int16) - previous)
+    same_alpha = (delta[:, 3] == 0) & ~hit
+    dr, dg, db = delta[:, 0], delta[:, 1], delta[:, 2]
+    is_diff = same_alpha & (delta[:, :3] >= -2).all(axis=1) & (delta[:, :3] <= 1).all(axis=1)
+    dr_dg, db_dg = _wrap(dr - dg), _wrap(db - dg)
+    is_luma = (same_alpha & ~is_diff & (dg >= -32) & (dg <= 31)
+               & (dr_dg >= -8) & (dr_dg <= 7) & (db_dg >= -8) & (db_dg <= 7))
+    is_rgb = same_alpha & ~is_diff & ~is_luma
+    is_rgba = ~hit & (delta[:, 3] != 0)
+
+    op_size = np.ones(len(ops), dtype=np.int64)
+    op_size[is_luma] = 2
+    op_size[is_rgb] = 4
+    op_size[is_rgba] = 5
+
+    # Runs are written right before the next op; the trailing run goes at the end
+    run_lengths = np.diff(np.concatenate(([-1], ops, [count]))) - 1
+    run_ops = (run_lengths + MAX_RUN - 1) // MAX_RUN
+    sizes = run_ops.copy()
+    sizes[:-1] += op_size
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1])) + HEADER_SIZE
+    total = HEADER_SIZE + int(sizes.sum()) + len(END_MARKER)
+
+    out = np.zeros(total, dtype=np.uint8)
+    out[:HEADER_SIZE] = np.frombuffer(MAGIC + struct.pack(">IIBB", width, height, channels, colorspace), np.uint8)
+    out[total - len(END_MARKER):] = np.frombuffer(END_MARKER, np.uint8)
+
+    with_runs = run_ops > 0
+    if with_runs.any():
+        run_starts, run_counts, lengths = starts[with_runs], run_ops[with_runs], run_lengths[with_runs]
+        first = np.repeat(np.cumsum(run_counts) - run_counts, run_counts)
+        positions = np.repeat(run_starts, run_counts) + np.arange(int(run_counts.sum())) - first
+        out[positions] = OP_RUN | (MAX_RUN - 1)
+        # Only the last op of each run is shorter than MAX_RUN
+        out[run_starts + run_counts - 1] = OP_RUN | (lengths - MAX_RUN * (run_counts - 1) - 1)
+
+    at = starts[:-1] + run_ops[:-1]
+    out[at[hit]] = OP_INDEX | hashes[hit]
+    out[at[is_diff]] = (OP_DIFF | (dr[is_diff] + 2) << 4 | (dg[is_diff] + 2) << 2 | (db[is_diff] + 2)).astype(np.uint8)
+    luma_at = at[is_luma]
+    out[luma_at] = (OP_LUMA | (dg[is_luma] + 32)).astype(np.uint8)
+    out[luma_at + 1] = ((dr_dg[is_luma] + 8) << 4 | (db_dg[is_luma] + 8)).astype(np.uint8)
+    for mask, tag, width_bytes in ((is_rgb, OP_RGB, 3), (is_rgba, OP_RGBA, 4)):
+        tag_at = at[mask]
+        out[tag_at] = tag
+        for channel in range(width_bytes):
+            out[tag_at + 1 + channel] = values[mask, channel]
+    return out.tobytes()
+
+
+def read_header(data):
+    """(width, height, channels, colorspace) from the first 14 bytes"""
+    if len(data) < HEADER_SIZE or bytes(data[:4]) != MAGIC:
+        raise QOIError("not a QOI image")
+    width, height, channels, colorspace = struct.unpack(">IIBB", bytes(data[4:HEADER_SIZE]))
+    if channels not in (3, 4) or width * height > _MAX_PIXELS:
+        raise QOIError(f"unsupported QOI header: {width}x{height}, {channels} channels")
+    return width, height, channels, colorspace
+
+
+def _op_starts(body):
+    # Offsets of every op. An op's length follows from its first byte, so the
+    # chain of ops is walked per block from each of the 5 possible entry
+    # offsets at once, then the real entry of every block is picked in order.
+    size = len(body)
+    if size == 0:
+        return np.zeros(0, dtype=np.int64)
+    step = np.ones(size, dtype=np.int8)
+    step[(body & 0xC0) == OP_LUMA] = 2
+    step[body == OP_RGB] = 4
+    step[body == OP_RGBA] = 5
+    block = max(256, int(np.sqrt(size)))
+    blocks = -(-size // block)
+    block_start = np.repeat(np.arange(blocks, dtype=np.int64) * block, 5)
+    block_end = np.minimum(block_start + block, size)
+    position = block_start + np.tile(np.arange(5), blocks)
+    candidate = np.tile(np.arange(5, dtype=np.int8), blocks)
+    visited = np.zeros((5, size), dtype=bool)
+    active = np.flatnonzero(position < block_end)
+    while len(active):
+        at = position[active]
+        visited[candidate[active], at] = True
+        position[active] = at + step[at]
+        active = active[position[active] < block_end[active]]
+    exits = position.reshape(blocks, 5)
+
+    entries = np.empty(blocks, dtype=np.int64)
+    entry = 0
+    for index in range(blocks):
+        if entry > 4:
+            raise QOIError("corrupt op stream")
+        entries[index] = entry
+        entry = int(exits[index, entry]) - (index + 1) * block
+    if blocks * block + entry != size:
+        raise QOIError("truncated op stream")
+    chosen = np.repeat(entries, block)[:size]
+    return np.flatnonzero(visited[chosen, np.arange(size)])
+
+
+def _resolve_chunk(kind, slot, rgb, alpha, prev, table):
+    # Colours of one chunk of ops given the previous colour and the colour table
+    # before it. Each op copies the colour of a parent (the previous op, or for
+    # a lookup the last op whose colour hashed to its slot) and adds a delta,
+    # unless it sets the colour outright. Which op a lookup reads depends on the
+    # hashes before it, so hashes are predicted, colours derived from them, and
+    # the prediction checked against those colours; a consistent set is the one
+    # the sequential decoder produces. None when the refinement does not settle.
+    count = len(kind)
+    is_index = np.flatnonzero(kind == _INDEX)
+    is_rgba = kind == _RGBA
+    absolute = (kind == _RGB) | is_rgba
+    # Nodes past the ops: count is the previous colour, count + 1 + h is table entry h
+    virtual = np.vstack((prev, table)).astype(np.int32)
+    referent = np.full(count, count, dtype=np.int64)
+    delta = np.where(absolute[:, None], 0, rgb)
+    rgb_starts = absolute.copy()
+    rgb_starts[is_index] = True
+    rgb_starts[0] = True
+    alpha_starts = is_rgba.copy()
+    alpha_starts[is_index] = True
+    alpha_starts[0] = True
+
+    # The hash is linear and 64 divides 256, so hash(colour + d) is
+    # hash(colour) + 3 dr + 5 dg + 7 db (mod 64): ops after a lookup hash to
+    # its slot plus their summed deltas. Lookups are assumed to keep alpha.
+    segment, offset = _segments(rgb_starts, delta)
+    starts = np.flatnonzero(rgb_starts)
+    last_rgba = np.maximum.accumulate(np.where(is_rgba, np.arange(count), -1))
+    guessed_alpha = np.where(last_rgba >= 0, alpha[np.maximum(last_rgba, 0)], prev[3])
+    start_rgb = np.where(absolute[starts, None], rgb[starts], prev[:3])
+    start_hash = np.where(kind[starts] == _INDEX, slot[starts], _weigh(start_rgb) + 11 * guessed_alpha[starts])
+    hashes = (start_hash[segment] + _weigh(offset)) & 63
+
+    query = slot[is_index] * count + is_index
+    wrong = count
+    for _ in range(_MAX_PASSES):
+        # Each lookup reads the last op before it with its slot's hash, else the
+        # table. A lookup writes back the colour already in its slot, so only
+        # the other ops count as writers; that keeps the chains shallow.
+        writers = np.ones(count, dtype=bool)
+        writers[is_index] = hashes[is_index] != slot[is_index]
+        writer_ops = np.flatnonzero(writers)
+        keys = np.sort(hashes[writer_ops].astype(np.int64) * count + writer_ops)
+        found = np.searchsorted(keys, query) - 1
+        last = keys[np.maximum(found, 0)] if len(keys) else found
+        in_chunk = (found >= 0) & (last // count == slot[is_index])
+        referent[is_index] = np.where(in_chunk, last % count, count + 1 + slot[is_index])
+        values = np.empty((count, 4), dtype=np.uint8)
+        values[:, :3] = _resolve(rgb_starts, absolute, rgb, referent, virtual[:, :3], segment, offset) & 0xFF
+        # Without RGBA ops alpha only comes from the previous colour and table entries
+        sources = np.unique(np.concatenate(([count], referent[is_index][referent[is_index] > count])))
+        if not is_rgba.any() and (virtual[sources - count, 3] == prev[3]).all():
+            values[:, 3] = prev[3]
+        else:
+            values[:, 3] = _resolve(alpha_starts, is_rgba, alpha[:, None], referent, virtual[:, 3:])[:, 0]
+        actual = _hash(values)
+        mismatched = np.count_nonzero(actual != hashes)
+        if not mismatched:
+            return values
+        # Each pass should settle at least half of what is left; a slower
+        # trickle means a long chain of dependent lookups
+        if 2 * mismatched > wrong:
+            return None
+        wrong, hashes = mismatched, actual
+    return None
+
+
+def _decode_ops(kind, slot, rgb, alpha, prev, table):
+    # Colours of one chunk of ops, one op after another like the reference
+    # decoder: the fallback for chunks _resolve_chunk does not settle
+    entries = [tuple(entry) for entry in table.tolist()]
+    r, g, b, a = prev.tolist()
+    values = []
+    for op, index, (x, y, z), w in zip(kind.tolist(), slot.tolist(), rgb.tolist(), alpha.tolist()):
+        if op == _INDEX:
+            r, g, b, a = entries[index]
+        elif op == _RGB:
+            r, g, b = x, y, z
+        elif op == _RGBA:
+            r, g, b, a = x, y, z, w
+        else:
+            r, g, b = (r + x) & 0xFF, (g + y) & 0xFF, (b + z) & 0xFF
+        colour = (r, g, b, a)
+        entries[(r * 3 + g * 5 + b * 7 + a * 11) & 63] = colour
+        values.append(colour)
+    return np.array(values, dtype=np.uint8).reshape(-1, 4)
+
+
+def _weigh(rgb):
+    # 3 r + 5 g + 7 b, the colour part of the hash
+    return 3 * rgb[:, 0] + 5 * rgb[:, 1] + 7 * rgb[:, 2]
+
+
+def _segments(starts, delta=None):
+    # Segment of every op and its summed delta since the segment began (the
+    # start's own delta included: it is zero except for a leading delta op)
+    segment = np.cumsum(starts) - 1
+    if delta is None:
+        return segment, None
+    total = np.cumsum(delta, axis=0)
+    first = np.flatnonzero(starts)
+    return segment, total - (total[first] - delta[first])[segment]
+
+
+def _resolve(starts, roots, base, referent, virtual, segment=None, offset=None):
+    # Values along op chains: a segment begins at a root (value given) or at a
+    # link to an earlier op or virtual node, and adds offsets from there on.
+    # Pointer jumping runs over segments only, not over every op.
+    count = len(starts)
+    if segment is None:
+        segment, offset = _segments(starts)
+    first = np.flatnonzero(starts)
+    size = len(first)
+    nodes = size + len(virtual)
+    channels = base.shape[1]
+    seg_base = np.zeros((nodes, channels), dtype=np.int32)
+    seg_base[:size] = np.where(roots[first, None], base[first], 0)
+    seg_base[size:] = virtual
+    seg_parent = np.arange(nodes)
+    seg_offset = np.zeros((nodes, channels), dtype=np.int32)
+    linked = np.flatnonzero(~roots[first])
+    target = referent[first[linked]]
+    in_chunk = target < count
+    inside = np.minimum(target, count - 1)
+    seg_parent[linked] = np.where(in_chunk, segment[inside], size + target - count)
+    if offset is not None:
+        seg_offset[linked] = np.where(in_chunk[:, None], offset[inside], 0)
+    root, total = _follow(seg_parent, seg_offset)
+    values = seg_base[root] + total
+    values = values[segment]
+    return values if offset is None else values + offset
+
+
+def _follow(parent, delta):
+    # Pointer jumping to each node's root (a node that is its own parent),
+    # summing deltas on the way; only nodes not yet at a root keep jumping
+    parent = parent.copy()
+    total = delta.copy()
+    active = np.flatnonzero(parent[parent] != parent)
+    while len(active):
+        up = parent[active]
+        total[active] += total[up]
+        parent[active] = parent[up]
+        up = parent[active]
+        active = active[parent[up] != up]
+    return parent, total
+
+
+def decode(data):
+    """(h, w, channels) uint8 array from QOI bytes"""
+    width, height, channels, _ = read_header(data)
+    if bytes(data[-len(END_MARKER):]) != END_MARKER:
+        raise QOIError("missing end marker")
+    body = np.frombuffer(data, dtype=np.uint8, count=len(data) - HEADER_SIZE - len(END_MARKER), offset=HEADER_SIZE)
+    starts = _op_starts(body)
+    tags = body[starts]
+    pixel_count = width * height
+
+    # Runs repeat the colour before them and leave the table as it was, so
+    # they only add pixels to the op before them. A leading run repeats the
+    # start colour and does store it in the table.
+    is_run = ((tags & 0xC0) == OP_RUN) & (tags < OP_RGB)
+    run_pixels = np.cumsum(np.where(is_run, (tags & 0x3F).astype(np.int64) + 1, 0))
+    ops = np.flatnonzero(~is_run)
+    starts, tags = starts[ops], tags[ops]
+    runs_before = run_pixels[ops] if len(ops) else np.zeros(0, dtype=np.int64)
+    total_runs = int(run_pixels[-1]) if len(run_pixels) else 0
+    leading = int(runs_before[0]) if len(ops) else total_runs
+    counts = np.diff(np.append(runs_before, total_runs)) + 1
+    if leading + int(counts.sum()) < pixel_count:
+        raise QOIError("op stream ends before the last pixel")
+
+    two = tags & 0xC0
+    kind = np.full(len(ops), _INDEX, dtype=np.int8)
+    kind[two == OP_DIFF] = _DIFF
+    kind[two == OP_LUMA] = _LUMA
+    kind[tags == OP_RGB] = _RGB
+    kind[tags == OP_RGBA] = _RGBA
+
+    # Per op: table slot, rgb (absolute for RGB/RGBA, a delta otherwise) and alpha
+    slot = np.where(kind == _INDEX, tags & 0x3F, 0).astype(np.int32)
+    rgb = np.zeros((len(ops), 3), dtype=np.int32)
+    diff = kind == _DIFF
+    for channel, shift in enumerate((4, 2, 0)):
+        rgb[diff, channel] = ((tags[diff] >> shift) & 0x03).astype(np.int32) - 2
+    luma = np.flatnonzero(kind == _LUMA)
+    dg = (tags[luma] & 0x3F).astype(np.int32) - 32
+    second = body[np.minimum(starts[luma] + 1, len(body) - 1)].astype(np.int32)
+    rgb[luma, 0] = dg - 8 + (second >> 4)
+    rgb[luma, 1] = dg
+    rgb[luma, 2] = dg - 8 + (second & 0x0F)
+    explicit = np.flatnonzero((kind == _RGB) | (kind == _RGBA))
+    payload = np.minimum(starts[explicit, None] + np.arange(1, 5), len(body) - 1)
+    rgb[explicit] = body[payload[:, :3]]
+    alpha = np.zeros(len(ops), dtype=np.int32)
+    is_rgba = kind == _RGBA
+    alpha[is_rgba] = body[payload[is_rgba[explicit], 3]]
+
+    start = np.array([0, 0, 0, 255], dtype=np.uint8)
+    colours = np.empty((len(ops), 4), dtype=np.uint8)
+    prev = start
+    table = np.zeros((64, 4), dtype=np.uint8)
+    if leading:
+        table[_hash(start[None])[0]] = start
+    for first in range(0, len(ops), _DECODE_CHUNK):
+        stop = min(first + _DECODE_CHUNK, len(ops))
+        chunk = (kind[first:stop], slot[first:stop], rgb[first:stop], alpha[first:stop], prev, table)
+        values = _resolve_chunk(*chunk)
+        if values is None:
+            values = _decode_ops(*chunk)
+        colours[first:stop] = values
+        prev = values[-1]
+        # Every op stores its colour in the table; the last one per slot wins
+        slots, last = np.unique(_hash(values)[::-1], return_index=True)
+        table[slots] = values[len(values) - 1 - last]
+
+    pixels = np.empty((pixel_count, channels), dtype=np.uint8)
+    head = min(leading, pixel_count)
+    pixels[:head] = start[:channels]
+    if head < pixel_count:
+        pixels[head:] = np.repeat(colours[:, :channels], counts, axis=0)[:pixel_count - head]
+    return pixels.reshape(height, width, channels)
+
+
+def save(image, fp):
+    """Write a PIL image or uint8 array as QOI to a path or binary file; returns bytes written"""
+    data = encode(image)
+    if isinstance(fp, (str, os.PathLike)):
+        with open(fp, "wb") as f:
+            f.write(data)
+    else:
+        fp.write(data)
+    return len(data)
+
+
+def load(fp):
+    """PIL image (RGB or RGBA) from a QOI path or binary file"""
+    if isinstance(fp, (str, os.PathLike)):
+        with open(fp, "rb") as f:
+            data = f.read()
+    else:
+        data = fp.read()
+    pixels = decode(data)
+    return Image.fromarray(pixels, "RGBA" if pixels.shape[2] == 4 else "RGB")
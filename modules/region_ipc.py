@@ -0,0 +1,105 @@
+import json
+import struct
+import threading
+
+# Length-prefixed message protocol between ScreenshotEngine and region_worker
+#
+# Every frame is a fixed header followed by a UTF-8 JSON payload:
+#   uint32 little-endian payload length | uint8 message type | payload
+
+MSG_HELLO = 1      # worker -> engine: process initialized and idle
+MSG_SELECT = 2     # engine -> worker: open the overlay
+MSG_PROGRESS = 3   # worker -> engine: overlay_shown, selection_changed, confirmed, cancelled
+MSG_RESULT = 4     # worker -> engine: final selection outcome
+MSG_CANCEL = 5     # engine -> worker: abort the running selection
+MSG_SHUTDOWN = 6   # engine -> worker: exit without selecting
+MSG_RELEASE = 7    # engine -> worker: shared frame attached, creator may drop it
+
+MESSAGE_NAMES = {
+    MSG_HELLO: "hello",
+    MSG_SELECT: "select",
+    MSG_PROGRESS: "progress",
+    MSG_RESULT: "result",
+    MSG_CANCEL: "cancel",
+    MSG_SHUTDOWN: "shutdown",
+    MSG_RELEASE: "release",
+}
+
+HEADER = struct.Struct("<IB")
+MAX_PAYLOAD = 16 * 1024 * 1024
+
+
+class ProtocolError(Exception):
+    """Raised when a frame on the worker channel is malformed"""
+
+
+def encode_message(msg_type, payload=None):
+    """Encode one frame"""
+    body = json.dumps(payload or {}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if len(body) > MAX_PAYLOAD:
+        raise ProtocolError(f"Payload too large: {len(body)} bytes")
+    return HEADER.pack(len(body), msg_type) + body
+
+
+def _read_exact(stream, size):
+    # Pipes may return short reads; None signals a clean EOF before any byte
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = stream.read(remaining)
+        if not chunk:
+            if remaining == size:
+                return None
+            raise ProtocolError("Unexpected end of stream inside a frame")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def decode_message(stream):
+    """Read one frame; returns (msg_type, payload) or None at end of stream"""
+    header = _read_exact(stream, HEADER.size)
+    if header is None:
+        return None
+    length, msg_type = HEADER.unpack(header)
+    if length > MAX_PAYLOAD:
+        raise ProtocolError(f"Frame length {length} exceeds limit")
+    body = _read_exact(stream, length) if length else b""
+    if body is None:
+        raise ProtocolError("Missing frame payload")
+    try:
+        payload = json.loads(body.decode("utf-8")) if body else {}
+    except Exception as e:
+        raise ProtocolError(f"Invalid payload: {e}")
+    return msg_type, payload
+
+
+class MessageChannel:
+    """Bidirectional framed channel over a pair of binary streams"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self._write_lock = threading.Lock()
+        self.closed = False
+
+    def send(self, msg_type, payload=None):
+        data = encode_message(msg_type, payload)
+        with self._write_lock:
+            if self.closed:
+                raise ProtocolError("Channel is closed")
+            self.writer.write(data)
+            self.writer.flush()
+
+    def receive(self):
+        return decode_message(self.reader)
+
+    def close(self):
+        with self._write_lock:
+            if self.closed:
+                return
+            self.closed = True
+            try:
+                self.writer.close()
+            except Exception:
+                pass
@@ -0,0 +1,191 @@
+import threading
+import time
+
+import numpy as np
+
+from core.log_sys import get_logger
+from modules.window_index import WindowIndex, WindowInfo
+
+# Rectangular UI element proposals for one-click selection
+#
+# The frozen frame is reduced to blocks of a few pixels and every block is
+# classed as edge (busy) or flat. Connected components of each class are
+# labelled by hooking roots over adjacent pairs and pointer jumping, all in
+# numpy.
+# Components that fill most of their bounding box or trace its whole outline
+# (panels, buttons, dialog bodies with text, framed images) become
+# proposals. The
+# whole pass runs against a deadline and yields nothing when it overruns.
+
+DEFAULT_BUDGET_MS = 300
+TARGET_BLOCKS = 400_000  # downsampled frame size, keeps 4K within budget
+EDGE_THRESHOLD = 24
+MIN_SIZE = 16  # smallest proposal side, full-resolution pixels
+MIN_BUSY_SIZE = 48
+MIN_FILL = 0.6
+MIN_OUTLINE = 0.85  # or: share of the bounding box outline a component covers
+MAX_COVERAGE = 0.9  # of the frame; larger components are the background
+MAX_PROPOSALS = 500
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+def _check(deadline):
+    if deadline is not None and time.perf_counter() > deadline:
+        raise BudgetExceeded()
+
+
+def _reduce_blocks(gray, factor, combine, dtype=None):
+    # Combine strided slices; numpy reductions over a tiny trailing block axis are slow
+    columns = gray[:, 0::factor].astype(dtype or gray.dtype)
+    for offset in range(1, factor):
+        columns = combine(columns, gray[:, offset::factor])
+    blocks = columns[0::factor]
+    for offset in range(1, factor):
+        blocks = combine(blocks, columns[offset::factor])
+    return blocks
+
+
+def _classify(gray, factor, threshold):
+    """Busy mask of factor x factor blocks: contrast inside a block or against its neighbours"""
+    height, width = gray.shape[0] // factor * factor, gray.shape[1] // factor * factor
+    gray = gray[:height, :width]
+    busy = (_reduce_blocks(gray, factor, np.maximum) - _reduce_blocks(gray, factor, np.minimum)) >= threshold
+    mean = _reduce_blocks(gray, factor, np.add, np.int32) // (factor * factor)
+    step_x = np.abs(mean[:, 1:] - mean[:, :-1]) >= threshold
+    step_y = np.abs(mean[1:] - mean[:-1]) >= threshold
+    busy[:, 1:] |= step_x
+    busy[:, :-1] |= step_x
+    busy[1:] |= step_y
+    busy[:-1] |= step_y
+    return busy
+
+
+def label_components(classes, deadline=None):
+    """Label 4-connected components of equal class; each label is the smallest flat index in it"""
+    height, width = classes.shape
+    index = np.arange(height * width, dtype=np.int32).reshape(height, width)
+    same_x = classes[:, 1:] == classes[:, :-1]
+    same_y = classes[1:] == classes[:-1]
+    # Every adjacent same-class pair, as flat indices
+    first = np.concatenate([index[:, :-1][same_x], index[:-1][same_y]])
+    second = np.concatenate([index[:, 1:][same_x], index[1:][same_y]])
+    parent = index.reshape(-1).copy()
+    while True:
+        _check(deadline)
+        a, b = parent[first], parent[second]
+        pending = a != b
+        if not pending.any():
+            return parent.reshape(height, width)
+        # Pairs already in one component never split again
+        first, second, a, b = first[pending], second[pending], a[pending], b[pending]
+        # Hook the larger root under the smallest root it touches
+        np.minimum.at(parent, np.maximum(a, b), np.minimum(a, b))
+        # Pointer jumping until every pixel points at its root
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+
+
+def _bounding_boxes(labels):
+    height, width = labels.shape
+    roots, inverse, counts = np.unique(labels.reshape(-1), return_inverse=True, return_counts=True)
+    ys, xs = np.divmod(np.arange(height * width, dtype=np.int32), width)
+    x0 = np.full(roots.size, width, dtype=np.int32)
+    x1 = np.zeros(roots.size, dtype=np.int32)
+    y1 = np.zeros(roots.size, dtype=np.int32)
+    np.minimum.at(x0, inverse, xs)
+    np.maximum.at(x1, inverse, xs)
+    np.maximum.at(y1, inverse, ys)
+    # The root is the component's first pixel in scan order, so its row is the top
+    y0 = roots // width
+    # How much of its bounding box outline a component covers: rectangles cover all of it
+    on_outline = (xs == x0[inverse]) | (xs == x1[inverse]) | (ys == y0[inverse]) | (ys == y1[inverse])
+    outline = np.bincount(inverse, weights=on_outline, minlength=roots.size)
+    box_w, box_h = x1 - x0 + 1, y1 - y0 + 1
+    perimeter = np.where((box_w > 1) & (box_h > 1), 2 * (box_w + box_h) - 4, box_w * box_h)
+    return roots, x0, y0, x1 + 1, y1 + 1, counts, outline / perimeter
+
+
+def propose_regions(gray, budget_ms=DEFAULT_BUDGET_MS, started=None):
+    """Proposals as (x, y, width, height) in frame pixels, smallest first
+
+    Raises BudgetExceeded when budget_ms (counted from started) runs out.
+    """
+    started = time.perf_counter() if started is None else started
+    deadline = started + budget_ms / 1000 if budget_ms else None
+    height, width = gray.shape
+    factor = max(1, int(np.ceil(np.sqrt(height * width / TARGET_BLOCKS))))
+    busy = _classify(gray, factor, EDGE_THRESHOLD)
+    _check(deadline)
+    labels = label_components(busy, deadline)
+    _check(deadline)
+    roots, x0, y0, x1, y1, counts, outline = _bounding_boxes(labels)
+    _check(deadline)
+
+    is_busy = busy.reshape(-1)[roots]
+    box_w, box_h = x1 - x0, y1 - y0
+    fill = counts / (box_w * box_h)
+    rows, cols = busy.shape
+    keep = (box_w * box_h <= MAX_COVERAGE * rows * cols) & ~((box_w == cols) & (box_h == rows))
+    rectangular = (fill >= MIN_FILL) | (outline >= MIN_OUTLINE)
+    flat_keep = ~is_busy & (np.minimum(box_w, box_h) * factor >= MIN_SIZE) & rectangular
+    busy_keep = is_busy & (np.minimum(box_w, box_h) * factor >= MIN_BUSY_SIZE) & rectangular
+    keep &= flat_keep | busy_keep
+
+    boxes = np.stack([x0, y0, x1, y1], axis=1)[keep] * factor
+    # Snap the last partial block to the frame edge
+    boxes[:, 2] = np.where(boxes[:, 2] >= cols * factor, width, boxes[:, 2])
+    boxes[:, 3] = np.where(boxes[:, 3] >= rows * factor, height, boxes[:, 3])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    boxes = boxes[np.argsort(areas, kind="stable")]
+    # Identical boxes from a busy outline and the flat area inside it count once
+    _, first = np.unique(boxes, axis=0, return_index=True)
+    boxes = boxes[np.sort(first)][:MAX_PROPOSALS]
+    return [(int(a), int(b), int(c - a), int(d - b)) for a, b, c, d in boxes]
+
+
+class ProposalBuilder:
+    """Computes proposals on a daemon thread; .index stays None until they are ready"""
+
+    def __init__(self, load_gray, budget_ms=DEFAULT_BUDGET_MS):
+        self.logger = get_logger()
+        self.load_gray = load_gray
+        self.budget_ms = budget_ms
+        self.proposals = None
+        self.index = None
+        self.timed_out = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        started = time.perf_counter()
+        try:
+            gray = self.load_gray()
+            if gray is None:
+                return
+            proposals = propose_regions(gray, self.budget_ms, started)
+        except BudgetExceeded:
+            # Better no proposals than a late overlay update
+            self.timed_out = True
+            self.logger.debug(f"Region proposals ran past {self.budget_ms} ms, showing none")
+            return
+        except Exception as e:
+            self.logger.error(f"Region proposals failed: {e}")
+            return
+        # Smallest first, so a point lookup returns the innermost proposal
+        index = WindowIndex(WindowInfo(i, x, y, w, h) for i, (x, y, w, h) in enumerate(proposals))
+        self.proposals = proposals
+        self.index = index
+        self.logger.debug(f"{len(proposals)} region proposals in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    @property
+    def ready(self):
+        return self.index is not None
@@ -2,7 +2,7 @@ from PySide6.QtWidgets import QApplication, QWidget, QLabel, QPushButton, QHBoxL
 from PySide6.QtCore import Qt, QRect, QPoint, Signal, QTimer, QSize
 from PySide6.QtGui import QPainter, QPen, QBrush, QColor, QPixmap, QFont, QCursor, QFontDatabase
 import sys
-import pyautogui
+from modules import capture_backends
 from PIL import Image, ImageQt
 from core.font_manager.icon_manager import MaterialSymbolsTTFManager, RenderConfig, IconVariations
 
@@ -34,7 +34,7 @@ class RegionSelector(QWidget):
                 app = QApplication(sys.argv)
             
             # Take screenshot
-            screenshot = pyautogui.screenshot()
+            screenshot = capture_backends.grab()
             
             # Convert PIL image to QPixmap
             qt_image = ImageQt.ImageQt(screenshot)
@@ -2,7 +2,7 @@ from PySide6.QtWidgets import QApplication, QWidget, QLabel, QPushButton, QHBoxL
 from PySide6.QtCore import Qt, QRect, QPoint, Signal, QTimer, QSize
 from PySide6.QtGui import QPainter, QPen, QBrush, QColor, QPixmap, QFont, QCursor, QLinearGradient, QFontDatabase
 import sys
-import pyautogui
+from modules import capture_backends
 from PIL import Image, ImageQt
 import time
 from core.log_sys import get_logger
@@ -66,8 +66,8 @@ class ModernRegionSelector(QWidget):
             self.logger.debug(f"Screen geometry: {self.screen_rect}")
             
             # Capture screenshot
-            self.logger.debug("Taking screenshot with pyautogui")
-            screenshot = pyautogui.screenshot()
+            self.logger.debug("Taking screenshot with capture backend")
+            screenshot = capture_backends.grab()
             self.logger.debug(f"Screenshot size: {screenshot.size}")
             
             qt_image = ImageQt.ImageQt(screenshot)
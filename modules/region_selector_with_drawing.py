@@ -6,10 +6,16 @@ from PySide6.QtWidgets import (QApplication, QWidget, QLabel, QPushButton, QHBox
                                QColorDialog, QSlider, QFrame, QMenu, QDialog, QGridLayout, QLineEdit)
 from PySide6.QtCore import Qt, QRect, QPoint, Signal, QTimer, QSize, QPointF
 from PySide6.QtGui import (QPainter, QPen, QBrush, QColor, QPixmap, QFont, QCursor, 
-                          QLinearGradient, QFontDatabase, QPainterPath, QPolygonF, QIcon, QAction)
+                          QLinearGradient, QFontDatabase, QPainterPath, QPolygonF, QIcon, QAction, QImage)
 import sys
 import os
-import pyautogui
+from modules import capture_backends
+from modules.window_index import WindowIndex, enumerate_windows
+from modules.edge_snap import EdgeMapBuilder, gray_from_rgb
+from modules.region_proposals import ProposalBuilder
+from modules.png_encoder import save_scratch_png
+import threading
+import numpy as np
 from PIL import Image, ImageQt
 import time
 from core.log_sys import get_logger
@@ -329,6 +335,45 @@ class RegionSelectorWithDrawing(QWidget):
         self.size_btn = None
         self.size_menu = None
         
+        # Worker integration: progress events out, cancellation in
+        self.event_callback = None
+        self.cancel_requested = False
+        self.keep_result_image = False
+        self.result_image = None
+        # Desktop frame grabbed by the engine at hotkey time (QImage), if any
+        self.frozen_frame = None
+        # Scripted selection for headless runs: {"rect": [x, y, w, h], "action": ..., "delay_ms": ...}
+        self.selection_script = None
+        # Hover-to-snap: [x, y, w, h, title] rows from the engine (overlay coordinates, topmost first)
+        self.window_list = None
+        self.window_index = None
+        # Hover target: innermost region proposal or window under the pointer; the wheel steps outward
+        self.hover_rect = QRect()
+        self.hover_refine = False
+        self.hover_level = 0
+        self._hover_key = None
+        self._hover_stack = None
+        # Edge snapping and region proposals are computed in the background and switch on when ready
+        self.edge_snap_enabled = True
+        self.edge_builder = None
+        self.region_proposals_enabled = True
+        self.proposal_builder = None
+        self._proposals_painted = False
+        
+    def _emit_event(self, event, **data):
+        # Report overlay progress to whoever launched the selector
+        if not self.event_callback:
+            return
+        try:
+            self.event_callback(event, data)
+        except Exception as e:
+            self.logger.debug(f"Event callback failed for {event}: {e}")
+    
+    def _emit_selection_changed(self):
+        if not self.selection_rect.isEmpty():
+            r = self.selection_rect
+            self._emit_event("selection_changed", x=r.x(), y=r.y(), w=r.width(), h=r.height())
+    
     def select_region(self):
         # Show enhanced region selection overlay with integrated drawing tools
         self.logger.debug("Starting region selection with drawing tools")
@@ -337,27 +382,37 @@ class RegionSelectorWithDrawing(QWidget):
             app = get_qt_app()
             self.logger.debug("Got QApplication instance")
             
-            # Get screen geometry for boundary checks
+            # Overlay covers the virtual desktop: the union of every screen
+            self.screen_rect = QRect()
+            screen_count = 0
             try:
-                # Safer screen access with fallback
-                if hasattr(app, 'primaryScreen') and app.primaryScreen():
-                    self.screen_rect = app.primaryScreen().geometry()
-                else:
-                    # Fallback to default screen size
-                    self.screen_rect = QRect(0, 0, 1920, 1080)
-            except Exception:
-                # Final fallback
-                self.screen_rect = QRect(0, 0, 1920, 1080)
-            self.logger.debug(f"Screen geometry: {self.screen_rect}")
-            
-            # Capture screenshot
-            self.logger.debug("Taking screenshot with pyautogui")
-            screenshot = pyautogui.screenshot()
-            self.logger.debug(f"Screenshot size: {screenshot.size}")
-            
-            qt_image = ImageQt.ImageQt(screenshot)
-            self.screenshot_pixmap = QPixmap.fromImage(qt_image)
+                for screen in app.screens():
+                    self.screen_rect = self.screen_rect.united(screen.geometry())
+                    screen_count += 1
+            except Exception as e:
+                self.logger.error(f"Screen enumeration failed: {e}")
+            self.logger.debug(f"Virtual desktop geometry: {self.screen_rect} ({screen_count} screens)")
+            
+            if self.frozen_frame is not None:
+                # Reuse the engine's frame so the overlay and the final crop match
+                self.logger.debug(f"Using frozen frame: {self.frozen_frame.size()}")
+                self.screenshot_pixmap = QPixmap.fromImage(self.frozen_frame)
+                self._start_frame_analysis(self.frozen_frame)
+                self.frozen_frame = None
+            else:
+                # Capture screenshot
+                self.logger.debug("Taking screenshot with capture backend")
+                screenshot = capture_backends.grab()
+                self.logger.debug(f"Screenshot size: {screenshot.size}")
+                
+                qt_image = ImageQt.ImageQt(screenshot)
+                self.screenshot_pixmap = QPixmap.fromImage(qt_image)
+                self._start_frame_analysis(screenshot)
             self.logger.debug("Screenshot converted to QPixmap")
+            if self.screen_rect.isEmpty():
+                # No screen information, size the overlay after the captured desktop
+                self.screen_rect = QRect(0, 0, self.screenshot_pixmap.width(), self.screenshot_pixmap.height())
+            self._build_window_index()
             
             # Setup fullscreen overlay
             self.logger.debug("Setting up fullscreen overlay")
@@ -365,8 +420,13 @@ class RegionSelectorWithDrawing(QWidget):
             self.setGeometry(self.screen_rect)
             self.setCursor(QCursor(Qt.CursorShape.CrossCursor))
             
-            self.logger.debug("Calling showFullScreen()")
-            self.showFullScreen()
+            if screen_count > 1:
+                # showFullScreen() would pin the overlay to a single screen
+                self.logger.debug("Showing overlay across all screens")
+                self.show()
+            else:
+                self.logger.debug("Calling showFullScreen()")
+                self.showFullScreen()
             
             # Force process events to ensure window is shown
             self.logger.debug("Processing events to ensure window display")
@@ -375,6 +435,9 @@ class RegionSelectorWithDrawing(QWidget):
             # Verify window is visible
             if self.isVisible():
                 self.logger.debug("Overlay shown successfully")
+                self._emit_event("overlay_shown")
+                if self.selection_script:
+                    QTimer.singleShot(int(self.selection_script.get("delay_ms", 0)), self._run_selection_script)
             else:
                 self.logger.error("Window failed to show properly")
                 return None
@@ -405,6 +468,12 @@ class RegionSelectorWithDrawing(QWidget):
                     time.sleep(0.01)  # 10ms delay for smooth interaction
                     loop_count += 1
                     
+                    # Cancellation requested by the engine
+                    if self.cancel_requested:
+                        self.logger.debug("Cancellation requested, closing overlay")
+                        self._cancel_selection()
+                        break
+                    
                     # Check if window was closed
                     if not self.isVisible():
                         self.logger.debug("Window no longer visible, breaking loop")
@@ -428,6 +497,130 @@ class RegionSelectorWithDrawing(QWidget):
             self.logger.exception("Region selection exception:")
             return None
     
+    def _build_window_index(self):
+        # Enumerate window rectangles once per overlay for hover-to-snap
+        try:
+            if self.window_list is not None:
+                self.window_index = WindowIndex.from_list(self.window_list)
+            else:
+                origin = self.screen_rect.topLeft()
+                self.window_index = WindowIndex(w.moved(-origin.x(), -origin.y()) for w in enumerate_windows())
+            self.logger.debug(f"Window index built: {len(self.window_index)} windows")
+        except Exception as e:
+            self.logger.error(f"Failed to build window index: {e}")
+            self.window_index = None
+    
+    def _start_frame_analysis(self, source):
+        # source is the QImage or PIL image behind the overlay; conversion happens off the UI thread too
+        gray_lock = threading.Lock()
+        gray_cache = []
+        
+        def load_gray():
+            # Both builders share one grayscale copy
+            with gray_lock:
+                if not gray_cache:
+                    gray_cache.append(to_gray())
+                return gray_cache[0]
+        
+        def to_gray():
+            if isinstance(source, QImage):
+                image = source
+                if image.depth() not in (24, 32):
+                    image = image.convertToFormat(QImage.Format.Format_RGB32)
+                # Read the pixels in place; numpy lets the UI thread run meanwhile, Qt conversions would not
+                channels = image.depth() // 8
+                rows = np.frombuffer(image.constBits(), dtype=np.uint8).reshape(image.height(), image.bytesPerLine())
+                pixels = rows[:, :image.width() * channels].reshape(image.height(), image.width(), channels)
+                return gray_from_rgb(pixels)
+            return gray_from_rgb(np.asarray(source))
+        
+        if self.edge_snap_enabled:
+            self.edge_builder = EdgeMapBuilder(load_gray).start()
+        if self.region_proposals_enabled:
+            self.proposal_builder = ProposalBuilder(load_gray).start()
+    
+    def _snap_x(self, x, y, trailing=False):
+        # trailing edges (right) sit one pixel left of the boundary they snap to
+        edge_map = self.edge_builder.edge_map if self.edge_builder is not None else None
+        if edge_map is None:
+            return x
+        boundary = edge_map.snap_x(x + trailing, y)
+        return x if boundary is None else boundary - trailing
+    
+    def _snap_y(self, y, x, trailing=False):
+        edge_map = self.edge_builder.edge_map if self.edge_builder is not None else None
+        if edge_map is None:
+            return y
+        boundary = edge_map.snap_y(y + trailing, x)
+        return y if boundary is None else boundary - trailing
+    
+    def _proposal_index(self):
+        return self.proposal_builder.index if self.proposal_builder is not None else None
+    
+    def _update_hover_target(self, pos):
+        # Highlight the innermost region proposal, or else the window, under the pointer
+        inner = window = None
+        if self.selection_rect.isEmpty():
+            index = self._proposal_index()
+            if index is not None:
+                inner = index.window_at(pos.x(), pos.y())
+            if self.window_index is not None:
+                window = self.window_index.window_at(pos.x(), pos.y())
+        if (inner, window) != self._hover_key:
+            # Something else under the pointer: back to its innermost element
+            self._hover_key = (inner, window)
+            self._hover_stack = None
+            self.hover_level = 0
+        if self._hover_stack is not None:
+            rect, refine = self._hover_stack[self.hover_level]
+        else:
+            target = inner or window
+            rect = QRect(target.x, target.y, target.width, target.height).intersected(self.rect()) if target else QRect()
+            refine = inner is not None
+        self.hover_refine = refine
+        proposals_ready = self._proposal_index() is not None
+        if rect != self.hover_rect or proposals_ready != self._proposals_painted:
+            self.hover_rect = rect
+            self.update()
+    
+    def _hover_candidates(self, pos):
+        # Everything under the pointer, innermost first: proposals, then the window
+        candidates = []
+        if self._proposal_index() is not None:
+            for x, y, w, h in self.proposal_builder.proposals:
+                rect = QRect(x, y, w, h)
+                if rect.contains(pos):
+                    candidates.append((rect.intersected(self.rect()), True))
+        if self.window_index is not None:
+            window = self.window_index.window_at(pos.x(), pos.y())
+            if window is not None:
+                candidates.append((QRect(window.x, window.y, window.width, window.height).intersected(self.rect()), False))
+        unique = []
+        for rect, refine in candidates:
+            if all(rect != seen for seen, _ in unique):
+                unique.append((rect, refine))
+        return unique or [(self.hover_rect, self.hover_refine)]
+    
+    def _refine_to_edges(self, rect):
+        # Proposals come from a downsampled frame; pull their sides onto the exact edges
+        middle = rect.center()
+        return QRect(QPoint(self._snap_x(rect.left(), middle.y()), self._snap_y(rect.top(), middle.x())),
+                     QPoint(self._snap_x(rect.right(), middle.y(), True), self._snap_y(rect.bottom(), middle.x(), True)))
+    
+    def wheelEvent(self, event):
+        # With nothing selected the wheel steps from the innermost element out to the window
+        if not self.selection_rect.isEmpty() or self.selecting or self.hover_rect.isEmpty():
+            super().wheelEvent(event)
+            return
+        pos = event.position().toPoint()
+        if self._hover_stack is None:
+            self._hover_stack = self._hover_candidates(pos)
+        step = 1 if event.angleDelta().y() > 0 else -1
+        self.hover_level = max(0, min(self.hover_level + step, len(self._hover_stack) - 1))
+        self.hover_rect, self.hover_refine = self._hover_stack[self.hover_level]
+        self.update()
+        event.accept()
+    
     def paintEvent(self, event):
         # Highly optimized painting for smooth performance
         painter = QPainter(self)
@@ -447,6 +640,18 @@ class RegionSelectorWithDrawing(QWidget):
         # Draw overlay
         self._draw_overlay(painter)
         
+        if self.selection_rect.isEmpty() and self._proposal_index() is not None:
+            # Clickable region proposals
+            painter.setPen(QPen(QColor(255, 255, 255, 60), 1))
+            for x, y, w, h in self.proposal_builder.proposals:
+                painter.drawRect(x, y, w - 1, h - 1)
+            self._proposals_painted = True
+        
+        if self.selection_rect.isEmpty() and not self.hover_rect.isEmpty():
+            # Element under the pointer, click to snap the selection to it
+            painter.setPen(QPen(self.MD3_PRIMARY, 2))
+            painter.drawRect(self.hover_rect.adjusted(1, 1, -1, -1))
+        
         if not self.selection_rect.isEmpty():
             # Only draw if selection intersects with update region
             if self.selection_rect.intersects(update_rect):
@@ -469,33 +674,35 @@ class RegionSelectorWithDrawing(QWidget):
     def _draw_overlay(self, painter):
         # Draw overlay with selection cutout
         overlay_color = QColor(0, 0, 0, 120)
+        # Before anything is selected the hovered window is cut out instead
+        cutout = self.selection_rect if not self.selection_rect.isEmpty() else self.hover_rect
         
-        if self.selection_rect.isEmpty():
+        if cutout.isEmpty():
             # No selection - draw full overlay
             painter.fillRect(self.rect(), overlay_color)
         else:
             # Draw overlay around selection
             # Top area
-            if self.selection_rect.top() > 0:
-                top_rect = QRect(0, 0, self.width(), self.selection_rect.top())
+            if cutout.top() > 0:
+                top_rect = QRect(0, 0, self.width(), cutout.top())
                 painter.fillRect(top_rect, overlay_color)
             
             # Bottom area
-            if self.selection_rect.bottom() < self.height():
-                bottom_rect = QRect(0, self.selection_rect.bottom() + 1, 
-                                  self.width(), self.height() - self.selection_rect.bottom() - 1)
+            if cutout.bottom() < self.height():
+                bottom_rect = QRect(0, cutout.bottom() + 1, 
+                                  self.width(), self.height() - cutout.bottom() - 1)
                 painter.fillRect(bottom_rect, overlay_color)
             
             # Left area
-            if self.selection_rect.left() > 0:
-                left_rect = QRect(0, self.selection_rect.top(), 
-                                self.selection_rect.left(), self.selection_rect.height())
+            if cutout.left() > 0:
+                left_rect = QRect(0, cutout.top(), 
+                                cutout.left(), cutout.height())
                 painter.fillRect(left_rect, overlay_color)
             
             # Right area
-            if self.selection_rect.right() < self.width():
-                right_rect = QRect(self.selection_rect.right() + 1, self.selection_rect.top(),
-                                 self.width() - self.selection_rect.right() - 1, self.selection_rect.height())
+            if cutout.right() < self.width():
+                right_rect = QRect(cutout.right() + 1, cutout.top(),
+                                 self.width() - cutout.right() - 1, cutout.height())
                 painter.fillRect(right_rect, overlay_color)
     
     def _draw_selection_border(self, painter):
@@ -1014,11 +1221,19 @@ class RegionSelectorWithDrawing(QWidget):
             old_rect = self.selection_rect
             new_top_left = event.pos() - self.drag_offset
             new_rect = QRect(new_top_left, self.selection_rect.size())
+            # Shift by the smaller pull of the two opposite edges toward nearby borders
+            pos = event.pos()
+            dx = [d for d in (self._snap_x(new_rect.left(), pos.y()) - new_rect.left(),
+                              self._snap_x(new_rect.right(), pos.y(), True) - new_rect.right()) if d]
+            dy = [d for d in (self._snap_y(new_rect.top(), pos.x()) - new_rect.top(),
+                              self._snap_y(new_rect.bottom(), pos.x(), True) - new_rect.bottom()) if d]
+            new_rect.translate(min(dx, key=abs) if dx else 0, min(dy, key=abs) if dy else 0)
             self.selection_rect = self._constrain_to_screen(new_rect)
             if old_rect != self.selection_rect:
                 self.update()
         else:
             # Minimal hover updates
+            self._update_hover_target(event.pos())
             old_hover = self.hover_handle
             self._update_hover_state(event.pos())
             if old_hover != self.hover_handle:
@@ -1099,11 +1314,19 @@ class RegionSelectorWithDrawing(QWidget):
                 self.selecting = False
                 self.end_point = event.pos()
                 self._update_selection_rect()
+                if (not self.hover_rect.isEmpty()
+                        and (self.end_point - self.start_point).manhattanLength() < 5):
+                    # A click without dragging snaps to the highlighted element
+                    self.selection_rect = QRect(self.hover_rect)
+                    if self.hover_refine:
+                        self.selection_rect = self._constrain_to_screen(self._refine_to_edges(self.hover_rect))
+                self.hover_rect = QRect()
                 if not self.selection_rect.isEmpty():
                     # 选择完成后确保窗口保持焦点，可以接收键盘事件
                     self.setFocus()
                     self.activateWindow()
                     self._show_integrated_toolbar()
+                    self._emit_selection_changed()
             elif self.resizing:
                 self.resizing = False
                 self.resize_handle = None
@@ -1112,6 +1335,7 @@ class RegionSelectorWithDrawing(QWidget):
                     self.setFocus()
                     self.activateWindow()
                     self._show_integrated_toolbar()
+                    self._emit_selection_changed()
             elif self.dragging:
                 self.dragging = False
                 self.setCursor(Qt.CursorShape.ArrowCursor)
@@ -1120,6 +1344,7 @@ class RegionSelectorWithDrawing(QWidget):
                     self.setFocus()
                     self.activateWindow()
                     self._show_integrated_toolbar()
+                    self._emit_selection_changed()
             
             self.update()
     
@@ -1131,13 +1356,13 @@ class RegionSelectorWithDrawing(QWidget):
         rect = QRect(self.selection_rect)
         
         if 'left' in self.resize_handle:
-            rect.setLeft(pos.x())
+            rect.setLeft(self._snap_x(pos.x(), pos.y()))
         if 'right' in self.resize_handle:
-            rect.setRight(pos.x())
+            rect.setRight(self._snap_x(pos.x(), pos.y(), True))
         if 'top' in self.resize_handle:
-            rect.setTop(pos.y())
+            rect.setTop(self._snap_y(pos.y(), pos.x()))
         if 'bottom' in self.resize_handle:
-            rect.setBottom(pos.y())
+            rect.setBottom(self._snap_y(pos.y(), pos.x(), True))
         
         # Apply constraints
         self.selection_rect = self._constrain_to_screen(rect.normalized())
@@ -1200,8 +1425,11 @@ class RegionSelectorWithDrawing(QWidget):
                 self.setCursor(Qt.CursorShape.CrossCursor)
     
     def _update_selection_rect(self):
-        # Update selection with constraints
-        rect = QRect(self.start_point, self.end_point).normalized()
+        # Update selection with constraints, edges pulled toward nearby borders
+        start, end = self.start_point, self.end_point
+        right, down = end.x() >= start.x(), end.y() >= start.y()
+        rect = QRect(QPoint(self._snap_x(start.x(), start.y(), not right), self._snap_y(start.y(), start.x(), not down)),
+                     QPoint(self._snap_x(end.x(), end.y(), right), self._snap_y(end.y(), end.x(), down))).normalized()
         self.selection_rect = self._constrain_to_screen(rect)
     
     def _undo_drawing(self):
@@ -1951,32 +2179,50 @@ class RegionSelectorWithDrawing(QWidget):
                 height
             )
             self.logger.debug(f"Confirming selection with rect: {rect}")
-            png_path = None
+            composite_path = None
             try:
                 composite = self._create_composite_image()
                 if composite:
-                    import tempfile
-                    import os
-                    with tempfile.NamedTemporaryFile(prefix="zsnapr_sel_", suffix=".png", delete=False) as tf:
-                        png_path = tf.name
                     # Convert QPixmap to QImage for proper cropping
                     composite_image = composite.toImage()
                     cropped_image = composite_image.copy(self.selection_rect)
                     # Ensure image has proper format before saving
                     if cropped_image.format() == cropped_image.Format.Format_Invalid:
                         cropped_image = cropped_image.convertToFormat(cropped_image.Format.Format_ARGB32)
-                    # Save the cropped image with high quality
-                    success = cropped_image.save(png_path)
-                    self.logger.debug(f"Saved composite image: success={success}, size={cropped_image.size()}, format={cropped_image.format()}")
+                    if self.keep_result_image:
+                        # The caller hands the pixels over itself (shared memory)
+                        self.result_image = cropped_image
+                        self.logger.debug(f"Kept composite image in memory: size={cropped_image.size()}")
+                    else:
+                        composite_path = self._save_composite_file(cropped_image)
             except Exception as e:
                 self.logger.error(f"Composite save error: {e}")
-            self.result = (rect, "copy", png_path)
+            self.result = (rect, "copy", composite_path)
+            self._emit_event("confirmed", action="copy", x=rect[0], y=rect[1], w=rect[2], h=rect[3])
             self._close_app()
         else:
             self.logger.debug("Empty selection, cancelling")
             self.result = None
             self._close_app()
     
+    def _save_composite_file(self, image):
+        # Write the cropped composite to a temp PNG for the caller to pick up;
+        # it is read back once right away, so it is deflated as cheaply as possible
+        import tempfile
+        try:
+            rgba = image.convertToFormat(image.Format.Format_RGBA8888)
+            width, height, stride = rgba.width(), rgba.height(), rgba.bytesPerLine()
+            rows = np.frombuffer(rgba.constBits(), dtype=np.uint8, count=stride * height).reshape(height, stride)
+            pixels = rows[:, :width * 4].reshape(height, width, 4)
+            with tempfile.NamedTemporaryFile(prefix="zsnapr_sel_", suffix=".png", delete=False) as tf:
+                path = tf.name
+                written = save_scratch_png(pixels, tf)
+        except Exception as e:
+            self.logger.error(f"Failed to write composite image: {e}")
+            return None
+        self.logger.debug(f"Saved composite image: {written} bytes, size={image.size()}")
+        return path
+    
     def _save_selection(self):
         # Save selection to file with drawing overlay - 使用保存对话框
         self.logger.debug("Saving selection")
@@ -2001,6 +2247,7 @@ class RegionSelectorWithDrawing(QWidget):
             
             # 直接返回save操作，让上层处理保存对话框
             self.result = (rect, "save")
+            self._emit_event("confirmed", action="save", x=rect[0], y=rect[1], w=rect[2], h=rect[3])
             self._close_app()
         else:
             self.result = None
@@ -2032,10 +2279,32 @@ class RegionSelectorWithDrawing(QWidget):
         painter.end()
         return composite
     
+    def _run_selection_script(self):
+        # Complete the selection without user input
+        script = self.selection_script or {}
+        action = script.get("action", "copy")
+        self.logger.debug(f"Running selection script: {script}")
+        if action == "cancel":
+            self._cancel_selection()
+            return
+        try:
+            x, y, w, h = (int(v) for v in script["rect"])
+        except Exception as e:
+            self.logger.error(f"Invalid selection script: {e}")
+            self._cancel_selection()
+            return
+        self.selection_rect = QRect(x, y, w, h).intersected(self.screenshot_pixmap.rect())
+        self._emit_selection_changed()
+        if action == "save":
+            self._save_selection()
+        else:
+            self._confirm_selection()
+    
     def _cancel_selection(self):
         # Cancel selection - 修复：确保能正确取消截图
         self.logger.debug("Cancelling selection")
         self.result = (None, "cancel", None)  # 明确标记为取消操作
+        self._emit_event("cancelled")
         self._close_app()
     
     def _on_selection_completed(self, rect):
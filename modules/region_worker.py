@@ -1,6 +1,8 @@
 import sys
 import json
 import os
+import time
+import threading
 import traceback
 
 # Ensure we can import from the parent directory
@@ -14,8 +16,24 @@ utils_path = os.path.join(parent_dir, "utils")
 if utils_path not in sys.path:
     sys.path.insert(0, utils_path)
 
+def _claim_protocol_streams():
+    # Keep the original stdin/stdout for framed messages and send everything
+    # else printed to fd 1 (console logging, Qt warnings) to stderr instead
+    proto_in = os.fdopen(os.dup(0), "rb")
+    proto_out = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+    return proto_in, proto_out
+
+_PROTOCOL_STREAMS = _claim_protocol_streams() if "--serve" in sys.argv[1:] else None
+
 from PySide6.QtWidgets import QApplication
 from modules.region_selector_with_drawing import RegionSelectorWithDrawing
+from modules.region_ipc import (MessageChannel, MSG_HELLO, MSG_SELECT, MSG_PROGRESS,
+                                MSG_RESULT, MSG_CANCEL, MSG_SHUTDOWN, MSG_RELEASE)
+from modules import shared_frame
+
+# How long a published frame waits for the engine to attach before it is discarded
+FRAME_RELEASE_TIMEOUT = 10.0
 
 def _stdout_json(obj):
     try:
@@ -24,40 +42,22 @@ def _stdout_json(obj):
     except Exception:
         pass
 
-def _write_result(obj):
-    out_path = os.environ.get("ZSNAPR_REGION_OUT", "").strip()
-    data = json.dumps(obj, ensure_ascii=False)
-    if out_path:
-        try:
-            os.makedirs(os.path.dirname(out_path), exist_ok=True)
-            with open(out_path, "w", encoding="utf-8") as f:
-                f.write(data)
-                f.flush()
-                os.fsync(f.fileno())
-            return
-        except Exception as e:
-            try:
-                sys.stderr.write(f"[worker] failed to write file: {e}\n")
-                sys.stderr.flush()
-            except Exception:
-                pass
-    _stdout_json(obj)
-
-def main():
-    try:
-        os.environ.setdefault("QT_LOGGING_RULES", "*.debug=false;qt.*=false")
-        os.environ.setdefault("QT_LOGGING_TO_CONSOLE", "0")
+def _get_app():
+    os.environ.setdefault("QT_LOGGING_RULES", "*.debug=false;qt.*=false")
+    os.environ.setdefault("QT_LOGGING_TO_CONSOLE", "0")
 
-        app = QApplication.instance()
-        if app is None:
-            app = QApplication(sys.argv)
+    app = QApplication.instance()
+    if app is None:
+        app = QApplication(sys.argv)
+    return app
 
-        selector = RegionSelectorWithDrawing()
+def _run_selection(selector):
+    # Returns (exit_code, payload)
+    try:
         outcome = selector.select_region()
 
         if outcome is None:
-            _write_result({"ok": False, "reason": "cancel"})
-            return 0
+            return 0, {"ok": False, "reason": "cancel"}
 
         png_path = None
         if isinstance(outcome, tuple) and len(outcome) == 3 and isinstance(outcome[1], str) and isinstance(outcome[2], (str, type(None))):
@@ -67,28 +67,177 @@ def main():
         else:
             region, action = outcome, "copy"
 
+        if action == "cancel":
+            return 0, {"ok": False, "reason": "cancel"}
+
         # Enhanced validation to prevent unpacking errors
         if region is None or not isinstance(region, (tuple, list)) or len(region) != 4:
-            _write_result({"ok": False, "reason": "invalid_region_data"})
-            return 1
+            return 1, {"ok": False, "reason": "invalid_region_data"}
 
         x, y, w, h = region
-        
+
         if w <= 0 or h <= 0 or x < 0 or y < 0:
-            _write_result({"ok": False, "reason": "invalid_coordinates"})
-            return 1
+            return 1, {"ok": False, "reason": "invalid_coordinates"}
         payload = {"ok": True, "x": x, "y": y, "w": w, "h": h, "action": action}
         if isinstance(png_path, str) and png_path:
             payload["png"] = png_path
-        _write_result(payload)
-        return 0
+        return 0, payload
+    except Exception as e:
+        try:
+            traceback.print_exc(file=sys.stderr)
+        except Exception:
+            pass
+        return 1, {"ok": False, "reason": f"error:{e}"}
+
+def main():
+    # Standalone one-shot mode, prints the outcome as a JSON line
+    try:
+        _get_app()
+        selector = RegionSelectorWithDrawing()
     except Exception as e:
         try:
             traceback.print_exc(file=sys.stderr)
         except Exception:
             pass
-        _write_result({"ok": False, "reason": f"error:{e}"})
+        _stdout_json({"ok": False, "reason": f"error:{e}"})
         return 1
+    code, payload = _run_selection(selector)
+    _stdout_json(payload)
+    return code
+
+def _listen_for_commands(channel, selector, released):
+    # Runs beside the Qt loop; the selector polls cancel_requested
+    try:
+        while True:
+            message = channel.receive()
+            if message is None:
+                # Engine went away - nobody is waiting for the result
+                selector.cancel_requested = True
+                break
+            msg_type, _ = message
+            if msg_type in (MSG_CANCEL, MSG_SHUTDOWN):
+                selector.cancel_requested = True
+                if msg_type == MSG_SHUTDOWN:
+                    break
+            elif msg_type == MSG_RELEASE:
+                released.set()
+                break
+    except Exception:
+        selector.cancel_requested = True
+    finally:
+        released.set()
+
+def _publish_composite(image):
+    # Copy the composite into shared memory once; returns the segment or None
+    try:
+        rgba = image.convertToFormat(image.Format.Format_RGBA8888)
+        shm, view = shared_frame.create_frame(rgba.width(), rgba.height(), rgba.bytesPerLine(),
+                                              shared_frame.FORMAT_RGBA8888)
+        try:
+            view[:] = memoryview(rgba.constBits()).cast("B")[:len(view)]
+        finally:
+            view.release()
+        return shm
+    except Exception as e:
+        sys.stderr.write(f"[worker] shared frame unavailable, using PNG: {e}\n")
+        return None
+
+def _load_frozen_frame(frame):
+    # Build the overlay background from the engine's shared desktop frame
+    from PySide6.QtGui import QImage
+    formats = {
+        shared_frame.FORMAT_RGBA8888: QImage.Format.Format_RGBA8888,
+        shared_frame.FORMAT_RGB888: QImage.Format.Format_RGB888,
+    }
+    try:
+        shm, width, height, stride, pixel_format, view = shared_frame.attach_buffer(frame["name"])
+    except Exception as e:
+        sys.stderr.write(f"[worker] frozen frame unavailable, grabbing locally: {e}\n")
+        return None
+    try:
+        # Detach from the segment with a single copy
+        return QImage(view, width, height, stride, formats[pixel_format]).copy()
+    finally:
+        view.release()
+        shm.close()
+
+def serve():
+    # Warm mode: initialize Qt and the selector, then serve one select request
+    started = time.perf_counter()
+    proto_in, proto_out = _PROTOCOL_STREAMS
+    channel = MessageChannel(proto_in, proto_out)
+    try:
+        _get_app()
+        selector = RegionSelectorWithDrawing()
+    except Exception as e:
+        try:
+            traceback.print_exc(file=sys.stderr)
+        except Exception:
+            pass
+        try:
+            channel.send(MSG_RESULT, {"ok": False, "reason": f"error:{e}"})
+        except Exception:
+            pass
+        return 1
+
+    channel.send(MSG_HELLO, {
+        "pid": os.getpid(),
+        "startup_ms": round((time.perf_counter() - started) * 1000, 1),
+    })
+
+    try:
+        message = channel.receive()
+    except Exception as e:
+        sys.stderr.write(f"[worker] bad command frame: {e}\n")
+        return 1
+    if message is None or message[0] != MSG_SELECT:
+        # Channel closed or shutdown requested - pool teardown or parent exit
+        return 0
+    options = message[1] or {}
+    if options.get("frame"):
+        selector.frozen_frame = _load_frozen_frame(options["frame"])
+    selector.selection_script = options.get("script")
+    selector.window_list = options.get("windows")
+
+    def emit(event, data):
+        try:
+            channel.send(MSG_PROGRESS, dict(data, event=event))
+        except Exception:
+            pass
+
+    selector.event_callback = emit
+    selector.keep_result_image = True
+    released = threading.Event()
+    threading.Thread(target=_listen_for_commands, args=(channel, selector, released), daemon=True).start()
+
+    code, payload = _run_selection(selector)
+
+    frame = None
+    if payload.get("ok") and selector.result_image is not None:
+        frame = _publish_composite(selector.result_image)
+        if frame is not None:
+            payload["shm"] = shared_frame.describe(frame)
+        else:
+            composite_path = selector._save_composite_file(selector.result_image)
+            if composite_path:
+                payload["png"] = composite_path
+        selector.result_image = None
+
+    try:
+        channel.send(MSG_RESULT, payload)
+    except Exception as e:
+        sys.stderr.write(f"[worker] failed to send result: {e}\n")
+        if frame is not None:
+            shared_frame.release_owner(frame, unlink=True)
+        return 1
+
+    if frame is not None:
+        # Keep the segment alive until the engine has attached to it
+        acked = released.wait(timeout=FRAME_RELEASE_TIMEOUT)
+        shared_frame.release_owner(frame, unlink=not acked)
+    return code
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    if _PROTOCOL_STREAMS is not None:
+        sys.exit(serve())
+    sys.exit(main())
@@ -0,0 +1,427 @@
+import os
+import sys
+import time
+import queue
+import threading
+import subprocess
+from collections import deque
+
+from core.log_sys import get_logger, mark_stage
+from modules import shared_frame
+from modules.region_ipc import (MessageChannel, MESSAGE_NAMES, MSG_HELLO, MSG_SELECT,
+                                MSG_PROGRESS, MSG_RESULT, MSG_CANCEL, MSG_SHUTDOWN,
+                                MSG_RELEASE)
+
+# Add utils to path for resource management
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+utils_path = os.path.join(project_root, "utils")
+if utils_path not in sys.path:
+    sys.path.insert(0, utils_path)
+
+from utils import get_python_executable, get_module_path, is_packaged
+
+CANCEL_POLL = 0.05  # seconds between cancel checks while a selection runs
+
+
+class _WarmWorker:
+    """A region_worker process started in --serve mode"""
+
+    def __init__(self, proc):
+        self.proc = proc
+        self.channel = MessageChannel(proc.stdout, proc.stdin)
+        self.messages = queue.Queue()
+        self.spawned_at = time.perf_counter()
+        self.ready_at = None
+        self.startup_ms = None
+        self.ready_event = threading.Event()
+        self.failed = False
+        self.output = deque(maxlen=200)
+        self.reader = None
+        self.stderr_reader = None
+
+    @property
+    def pid(self):
+        return self.proc.pid
+
+    def is_alive(self):
+        return self.proc.poll() is None
+
+    def is_ready(self):
+        return self.ready_event.is_set() and not self.failed and self.is_alive()
+
+
+class RegionWorkerPool:
+    """Supervised pool of pre-initialized region selector worker processes
+
+    Each worker imports PySide6 and the selector module, creates the
+    QApplication and then idles on its command channel. A worker serves
+    exactly one selection and exits; the supervisor spawns a replacement
+    right away so the next hotkey press finds a warm process.
+    """
+
+    def __init__(self, size=1, ready_timeout=30.0):
+        self.logger = get_logger()
+        self.size = max(0, int(size))
+        self.ready_timeout = ready_timeout
+
+        self._workers = []
+        # Workers showing an overlay; several selections can run at once
+        self._active = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._supervisor = None
+        self._spawn_backoff = 0.0
+
+        self._stats = {
+            "spawned": 0,
+            "ready": 0,
+            "spawn_failures": 0,
+            "idle_crashes": 0,
+            "warm_hits": 0,
+            "cold_misses": 0,
+            "cancelled": 0,
+            "startup_ms_last": None,
+            "startup_ms_avg": None,
+            "acquire_ms_last": None,
+            "acquire_ms_avg": None,
+        }
+
+    def start(self):
+        # Start the supervisor thread that keeps the pool filled
+        if self.size <= 0 or (self._supervisor and self._supervisor.is_alive()):
+            return
+        self._stop_event.clear()
+        self._supervisor = threading.Thread(target=self._supervise, name="RegionWorkerPool", daemon=True)
+        self._supervisor.start()
+        self.logger.debug(f"RegionWorkerPool started with size={self.size}")
+
+    def shutdown(self):
+        # Stop supervising and terminate idle workers
+        self._stop_event.set()
+        self._wake.set()
+        with self._lock:
+            workers = list(self._workers)
+            self._workers = []
+        for worker in workers:
+            self._terminate(worker)
+        self.logger.debug("RegionWorkerPool shut down")
+
+    def _build_command(self):
+        worker_path = get_module_path("modules/region_worker.py")
+        if not os.path.exists(worker_path):
+            raise FileNotFoundError(f"Worker script not found at: {worker_path}")
+        return [get_python_executable(), worker_path, "--serve"]
+
+    def _spawn(self):
+        # Launch one worker in serve mode and start reading its channel
+        cmd = self._build_command()
+        env = os.environ.copy()
+        env.setdefault("QT_LOGGING_RULES", "*.debug=false;qt.*=false")
+        env.setdefault("QT_LOGGING_TO_CONSOLE", "0")
+        creation_flags = subprocess.CREATE_NEW_PROCESS_GROUP if (os.name == 'nt' and is_packaged()) else 0
+
+        proc = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+            creationflags=creation_flags
+        )
+        worker = _WarmWorker(proc)
+        worker.reader = threading.Thread(target=self._read_channel, args=(worker,), name=f"RegionWorker-{proc.pid}", daemon=True)
+        worker.stderr_reader = threading.Thread(target=self._drain_stderr, args=(worker,), daemon=True)
+        worker.reader.start()
+        worker.stderr_reader.start()
+        self._stats["spawned"] += 1
+        self.logger.debug(f"Spawned region worker pid={proc.pid}")
+        return worker
+
+    def _read_channel(self, worker):
+        # Decode frames until the worker closes its end
+        try:
+            while True:
+                message = worker.channel.receive()
+                if message is None:
+                    break
+                msg_type, payload = message
+                if msg_type == MSG_HELLO:
+                    self._mark_ready(worker, payload)
+                    continue
+                if msg_type == MSG_RESULT and not worker.ready_event.is_set():
+                    # Initialization failed before the worker could say hello
+                    worker.failed = True
+                    self.logger.warning(f"Region worker pid={worker.pid} failed to initialize: {payload.get('reason')}")
+                worker.messages.put(message)
+        except Exception as e:
+            self.logger.warning(f"Region worker pid={worker.pid} channel error: {e}")
+        finally:
+            if not worker.ready_event.is_set():
+                worker.failed = True
+                worker.ready_event.set()
+            worker.messages.put(None)
+            self._wake.set()
+
+    def _drain_stderr(self, worker):
+        try:
+            for raw in worker.proc.stderr:
+                line = raw.decode("utf-8", errors="replace").rstrip()
+                if line:
+                    worker.output.append(line)
+        except Exception:
+            pass
+
+    def _mark_ready(self, worker, message):
+        worker.ready_at = time.perf_counter()
+        worker.startup_ms = round((worker.ready_at - worker.spawned_at) * 1000, 1)
+        worker.ready_event.set()
+        self._stats["ready"] += 1
+        self._stats["startup_ms_last"] = worker.startup_ms
+        self._stats["startup_ms_avg"] = self._running_avg(self._stats["startup_ms_avg"], worker.startup_ms, self._stats["ready"])
+        self.logger.debug(f"Region worker pid={worker.pid} ready in {worker.startup_ms}ms (init {message.get('startup_ms')}ms)")
+
+    @staticmethod
+    def _running_avg(current, value, count):
+        if current is None or count <= 1:
+            return value
+        return round(current + (value - current) / count, 1)
+
+    def _terminate(self, worker):
+        try:
+            if worker.is_alive():
+                worker.channel.send(MSG_SHUTDOWN)
+        except Exception:
+            pass
+        worker.channel.close()
+        try:
+            worker.proc.wait(timeout=2)
+        except Exception:
+            try:
+                worker.proc.kill()
+            except Exception:
+                pass
+
+    def _supervise(self):
+        # Keep `size` workers alive, replacing used, crashed and failed ones
+        while not self._stop_event.is_set():
+            self._reap()
+            with self._lock:
+                missing = self.size - len(self._workers)
+            for _ in range(max(0, missing)):
+                if self._stop_event.is_set():
+                    break
+                try:
+                    worker = self._spawn()
+                    with self._lock:
+                        self._workers.append(worker)
+                except Exception as e:
+                    self._stats["spawn_failures"] += 1
+                    self._spawn_backoff = min(30.0, max(1.0, self._spawn_backoff * 2))
+                    self.logger.error(f"Failed to spawn region worker: {e}")
+                    break
+            self._wake.wait(timeout=self._spawn_backoff or 1.0)
+            self._wake.clear()
+
+    def _reap(self):
+        # Drop idle workers that died or never became ready
+        now = time.perf_counter()
+        dead = []
+        with self._lock:
+            for worker in list(self._workers):
+                timed_out = not worker.ready_event.is_set() and (now - worker.spawned_at) > self.ready_timeout
+                if worker.failed or not worker.is_alive() or timed_out:
+                    self._workers.remove(worker)
+                    dead.append(worker)
+        for worker in dead:
+            if worker.ready_at is not None:
+                self._stats["idle_crashes"] += 1
+            else:
+                self._stats["spawn_failures"] += 1
+                self._spawn_backoff = min(30.0, max(1.0, self._spawn_backoff * 2))
+            tail = " | ".join(list(worker.output)[-5:])
+            self.logger.warning(f"Discarding region worker pid={worker.pid} (returncode={worker.proc.poll()}) {tail}")
+            self._terminate(worker)
+        if not dead and any(w.ready_at is not None for w in self._workers):
+            self._spawn_backoff = 0.0
+
+    def acquire(self, wait=True):
+        # Take a ready worker out of the pool; None means the caller should cold-start
+        started = time.perf_counter()
+        worker = None
+        pending = None
+        with self._lock:
+            for candidate in self._workers:
+                if candidate.is_ready():
+                    worker = candidate
+                    break
+                if pending is None and not candidate.ready_event.is_set() and candidate.is_alive():
+                    pending = candidate
+            if worker is None and wait and pending is not None:
+                # A worker that is already booting is still ahead of a cold spawn
+                worker = pending
+            if worker is not None:
+                self._workers.remove(worker)
+
+        if worker is not None and not worker.ready_event.is_set():
+            remaining = self.ready_timeout - (time.perf_counter() - worker.spawned_at)
+            worker.ready_event.wait(timeout=max(0.0, remaining))
+
+        self._wake.set()
+        if worker is None or not worker.is_ready():
+            if worker is not None:
+                self._terminate(worker)
+            return None
+
+        acquire_ms = round((time.perf_counter() - started) * 1000, 1)
+        self._stats["warm_hits"] += 1
+        self._stats["acquire_ms_last"] = acquire_ms
+        self._stats["acquire_ms_avg"] = self._running_avg(self._stats["acquire_ms_avg"], acquire_ms, self._stats["warm_hits"])
+        return worker
+
+    def _cold_start(self):
+        # Spawn a dedicated worker and wait for its hello
+        self._stats["cold_misses"] += 1
+        try:
+            worker = self._spawn()
+        except Exception as e:
+            self.logger.error(f"Failed to cold-start region worker: {e}")
+            return None
+        worker.ready_event.wait(timeout=self.ready_timeout)
+        if not worker.is_ready():
+            tail = " | ".join(list(worker.output)[-5:])
+            self.logger.error(f"Cold region worker pid={worker.pid} did not become ready {tail}")
+            self._terminate(worker)
+            return None
+        return worker
+
+    def run_selection(self, timeout=120, on_progress=None, options=None, cancel_event=None):
+        """Run one selection and return the worker's result payload
+
+        on_progress(event, payload) is called from this thread for every
+        progress frame (overlay_shown, selection_changed, confirmed,
+        cancelled) before the result arrives. Setting cancel_event (a
+        threading.Event) cancels this selection only, also while a worker
+        is still being acquired: the overlay is then never shown.
+        """
+        worker = None
+        if self.size > 0 and not self._stop_event.is_set():
+            worker = self.acquire()
+        if worker is None:
+            worker = self._cold_start()
+        if worker is None:
+            return {"ok": False, "reason": "worker_unavailable"}
+        mark_stage("worker_acquired")
+
+        if cancel_event is not None and cancel_event.is_set():
+            # Cancelled while waiting for the worker; an idle worker exits on cancel
+            self.logger.debug(f"Region selection cancelled before dispatch to pid={worker.pid}")
+            self._send_cancel(worker)
+            threading.Thread(target=self._retire, args=(worker,), daemon=True).start()
+            return {"ok": False, "reason": "cancel"}
+
+        self.logger.debug(f"Dispatching region selection to worker pid={worker.pid}")
+        with self._lock:
+            self._active.add(worker)
+        try:
+            worker.channel.send(MSG_SELECT, options or {})
+            deadline = time.perf_counter() + timeout
+            cancel_sent = False
+            while True:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    raise subprocess.TimeoutExpired(worker.proc.args, timeout)
+                if cancel_event is not None and not cancel_sent:
+                    if cancel_event.is_set():
+                        # Keep reading: the worker answers with a cancelled result
+                        cancel_sent = self._send_cancel(worker)
+                    remaining = min(remaining, CANCEL_POLL)
+                try:
+                    message = worker.messages.get(timeout=remaining)
+                except queue.Empty:
+                    continue
+                if message is None:
+                    return {"ok": False, "reason": f"worker_exited:{worker.proc.poll()}"}
+                msg_type, payload = message
+                if msg_type == MSG_PROGRESS:
+                    if on_progress:
+                        try:
+                            on_progress(payload.get("event"), payload)
+                        except Exception as e:
+                            self.logger.error(f"Region progress callback failed: {e}")
+                    continue
+                if msg_type == MSG_RESULT:
+                    if payload.get("shm"):
+                        self._attach_frame(worker, payload)
+                    return payload
+                self.logger.debug(f"Ignoring unexpected {MESSAGE_NAMES.get(msg_type, msg_type)} frame")
+        except subprocess.TimeoutExpired:
+            self._send_cancel(worker)
+            raise
+        finally:
+            with self._lock:
+                self._active.discard(worker)
+            # The result is in hand; let the worker finish exiting in the background
+            threading.Thread(target=self._retire, args=(worker,), daemon=True).start()
+
+    def _attach_frame(self, worker, payload):
+        # Map the worker's composite in place; the worker holds it until released
+        frame = payload.pop("shm")
+        try:
+            payload["image"] = shared_frame.attach_image(frame["name"])
+        except Exception as e:
+            self.logger.error(f"Failed to attach shared frame {frame.get('name')}: {e}")
+        try:
+            worker.channel.send(MSG_RELEASE)
+        except Exception:
+            pass
+
+    def _retire(self, worker):
+        try:
+            worker.proc.wait(timeout=5)
+        except Exception:
+            try:
+                worker.proc.kill()
+            except Exception:
+                pass
+        worker.channel.close()
+        for line in worker.output:
+            self.logger.debug(f"region_worker[{worker.pid}] {line}")
+
+    def cancel_active(self):
+        """Ask every worker currently showing an overlay to cancel"""
+        with self._lock:
+            workers = list(self._active)
+        return sum(1 for worker in workers if self._send_cancel(worker)) > 0
+
+    def _send_cancel(self, worker):
+        try:
+            worker.channel.send(MSG_CANCEL)
+            self._stats["cancelled"] += 1
+            return True
+        except Exception as e:
+            self.logger.debug(f"Cancel request failed: {e}")
+            return False
+
+    def is_healthy(self):
+        # Healthy when at least one worker is ready or booting
+        with self._lock:
+            return any(w.is_alive() and not w.failed for w in self._workers)
+
+    def get_stats(self):
+        """Return a snapshot of pool health and latency counters"""
+        with self._lock:
+            workers = list(self._workers)
+            active = len(self._active)
+        stats = dict(self._stats)
+        stats.update({
+            "size": self.size,
+            "idle_ready": sum(1 for w in workers if w.is_ready()),
+            "booting": sum(1 for w in workers if not w.ready_event.is_set() and w.is_alive()),
+            "selection_active": active > 0,
+            "selections_active": active,
+            "healthy": any(w.is_alive() and not w.failed for w in workers),
+            "running": bool(self._supervisor and self._supervisor.is_alive()),
+        })
+        return stats
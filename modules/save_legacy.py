@@ -3,12 +3,56 @@ from datetime import datetime
 from tkinter import filedialog
 import tkinter as tk
 from PIL import Image
+from config import DEFAULT_SETTINGS, SUPPORTED_FORMATS, get_encoder_options
+from modules.png_encoder import save_png
+from modules import qoi
+from modules.content_store import ContentStore
+
+QUICK_SAVE_EXTENSIONS = {fmt["name"]: fmt["extension"] for fmt in SUPPORTED_FORMATS}
+# Save As picks the format from the extension; .webp is saved lossless
+EXTENSION_FORMATS = {
+    ".png": "PNG",
+    ".jpg": "JPEG",
+    ".jpeg": "JPEG",
+    ".bmp": "BMP",
+    ".tif": "TIFF",
+    ".tiff": "TIFF",
+    ".webp": "WEBP",
+    ".qoi": "QOI"
+}
+_PIL_FORMATS = {fmt["name"]: fmt.get("pil_format", fmt["name"]) for fmt in SUPPORTED_FORMATS}
+
+
+def encode_image(image, fp, format_name="PNG", preset=None):
+    """Write image to a path or binary file object in format_name, with the encoder preset's parameters"""
+    options = get_encoder_options(format_name, preset)
+    if format_name == "PNG":
+        save_png(image, fp, **options)
+        return
+    if format_name == "QOI":
+        qoi.save(image, fp)
+        return
+    pil_format = _PIL_FORMATS.get(format_name, format_name)
+    if pil_format == "JPEG":
+        # Convert RGBA to RGB for JPEG
+        if image.mode == "RGBA":
+            rgb_image = Image.new("RGB", image.size, (255, 255, 255))
+            rgb_image.paste(image, mask=image.split()[-1])
+            image = rgb_image
+        elif image.mode not in ("RGB", "L", "CMYK"):
+            image = image.convert("RGB")
+    image.save(fp, pil_format, **options)
+
 
 class SaveManager:
     """File save operations for screenshots"""
     
-    def __init__(self, default_directory):
+    def __init__(self, default_directory, pipeline=None):
         self.default_directory = default_directory
+        self.encoder_preset = DEFAULT_SETTINGS.get("encoder_preset", "balanced")
+        # modules.save_pipeline.SavePipeline used by queue_save
+        self.pipeline = pipeline
+        self._stores = {}  # save directory -> ContentStore
         
     def save_as_dialog(self, image, initial_filename=None):
         """Show save as dialog and save image"""
@@ -31,6 +75,8 @@ class SaveManager:
                     ("JPEG files", "*.jpg"),
                     ("BMP files", "*.bmp"),
                     ("TIFF files", "*.tiff"),
+                    ("WebP files", "*.webp"),
+                    ("QOI files", "*.qoi"),
                     ("All files", "*.*")
                 ]
             )
@@ -39,14 +85,9 @@ class SaveManager:
             
             if filepath:
                 # Determine format from extension
-                ext = os.path.splitext(filepath)[1].lower()
-                if ext == '.jpg' or ext == '.jpeg':
-                    # Convert RGBA to RGB for JPEG
-                    if image.mode == "RGBA":
-                        rgb_image = Image.new("RGB", image.size, (255, 255, 255))
-                        rgb_image.paste(image, mask=image.split()[-1])
-                        image = rgb_image
-                    image.save(filepath, "JPEG", quality=95)
+                format_name = EXTENSION_FORMATS.get(os.path.splitext(filepath)[1].lower())
+                if format_name:
+                    encode_image(image, filepath, format_name, self.encoder_preset)
                 else:
                     image.save(filepath)
                 
@@ -58,38 +99,53 @@ class SaveManager:
             print(f"Save as error: {e}")
             return None
     
-    def quick_save(self, image, directory, format_name="PNG"):
-        """Quick save with auto-generated filename"""
+    def quick_save(self, image, directory, format_name="PNG", preset=None):
+        """Quick save with auto-generated filename; preset defaults to self.encoder_preset"""
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            
-            # Get extension based on format
-            extensions = {
-                "PNG": ".png",
-                "JPEG": ".jpg", 
-                "BMP": ".bmp",
-                "TIFF": ".tiff"
-            }
-            
-            ext = extensions.get(format_name, ".png")
-            filename = f"screenshot_{timestamp}{ext}"
-            filepath = os.path.join(directory, filename)
+            filepath = self._quick_save_path(directory, format_name)
             
             # Ensure directory exists
             os.makedirs(directory, exist_ok=True)
             
             # Save image
-            if format_name == "JPEG":
-                if image.mode == "RGBA":
-                    rgb_image = Image.new("RGB", image.size, (255, 255, 255))
-                    rgb_image.paste(image, mask=image.split()[-1])
-                    image = rgb_image
-                image.save(filepath, "JPEG", quality=95)
-            else:
-                image.save(filepath, format_name)
+            encode_image(image, filepath, format_name, preset or self.encoder_preset)
             
             return filepath
             
         except Exception as e:
             print(f"Quick save error: {e}")
-            return None
\ No newline at end of file
+            return None
+    
+    def queue_save(self, image, directory, format_name="PNG", on_done=None, preset=None, dedupe=False,
+                   hash_pixels=False):
+        """Quick save on the background pipeline; returns the SaveTicket (None if refused)
+        
+        on_done(ticket) runs on a save worker once the file is durable or
+        the save failed. dedupe links pixel-identical captures to one stored
+        file instead of encoding them again (ticket.dedupe, ticket.bytes_saved).
+        Either that or hash_pixels sets ticket.pixel_hash.
+        """
+        if self.pipeline is None:
+            from modules.save_pipeline import SavePipeline
+            self.pipeline = SavePipeline()
+        preset = preset or self.encoder_preset
+        store = self.content_store(directory) if dedupe else None
+        variant = f"{format_name}:{sorted(get_encoder_options(format_name, preset).items())}"
+        return self.pipeline.submit(image, self._quick_save_path(directory, format_name),
+                                    lambda img, f: encode_image(img, f, format_name, preset), on_done, unique=True,
+                                    store=store, variant=variant, hash_pixels=hash_pixels)
+    
+    def content_store(self, directory):
+        """The ContentStore of a save directory"""
+        key = os.path.normcase(os.path.abspath(directory))
+        store = self._stores.get(key)
+        if store is None:
+            # setdefault is atomic, so concurrent captures still share one store
+            store = self._stores.setdefault(key, ContentStore(directory))
+        return store
+    
+    @staticmethod
+    def _quick_save_path(directory, format_name):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        ext = QUICK_SAVE_EXTENSIONS.get(format_name, ".png")
+        return os.path.join(directory, f"screenshot_{timestamp}{ext}")
\ No newline at end of file
@@ -0,0 +1,263 @@
+import os
+import time
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from core.log_sys import get_logger
+from modules.content_store import pixel_digest
+
+# Write-behind saving
+#
+# Captures hand finished images to a bounded queue and return right away;
+# encoding and disk I/O happen on the pipeline's own workers. Submitting
+# blocks (or is refused) once max_pending saves are in flight, so a slow
+# disk holds back new captures instead of piling up full-screen images in
+# memory. Workers encode in parallel into a temp file next to the target,
+# but files appear (rename + directory fsync) and callbacks run strictly in
+# submission order. A completed save is durable: data and rename are
+# fsynced before on_done is called.
+#
+# With a modules.content_store.ContentStore a save whose pixels were saved
+# before is linked to the stored file instead of being encoded again, and
+# every freshly encoded file is adopted into the store.
+
+QUEUED = "queued"
+SAVED = "saved"
+FAILED = "failed"
+
+
+class SaveTicket:
+    """One queued save and its outcome"""
+
+    def __init__(self, seq, image, path, encode, on_done, store=None, variant="", hash_pixels=False):
+        self.seq = seq
+        self.image = image
+        self.path = path
+        self.encode = encode
+        self.on_done = on_done
+        self.store = store
+        self.variant = variant
+        self.hash_pixels = hash_pixels or store is not None
+        self.pixel_hash = None  # content_store.pixel_digest() of the image, when hashed
+        self.content_key = None
+        self.dedupe = None  # how a duplicate was materialized: hardlink, symlink or copy
+        self.bytes_saved = 0
+        self.state = QUEUED
+        self.error = None
+        self.submitted_at = time.perf_counter()
+        self.encode_ms = None
+        self.total_ms = None
+        self.done_event = threading.Event()
+
+    @property
+    def ok(self):
+        return self.state == SAVED
+
+    def wait(self, timeout=None):
+        return self.done_event.wait(timeout)
+
+    def __repr__(self):
+        return f"SaveTicket(seq={self.seq}, path={self.path!r}, state={self.state})"
+
+
+def _fsync_directory(directory):
+    # Makes the rename itself durable; directories cannot be opened on Windows
+    if os.name == "nt":
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class SavePipeline:
+    """Bounded, ordered, durable background saves
+
+    encode(image, file) writes the encoded image to a binary file object.
+    The image must not be modified after it is submitted.
+    """
+
+    def __init__(self, workers=1, max_pending=4, fsync=True):
+        self.logger = get_logger()
+        self.max_pending = max(1, max_pending)
+        self.fsync = fsync
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="zsnapr-save")
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._seq = itertools.count()
+        self._turn = threading.Condition()
+        self._next_commit = 0
+        self._pending = []
+        self._reserved = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {"queued": 0, "saved": 0, "failed": 0, "rejected": 0, "deduplicated": 0,
+                      "bytes_saved": 0, "waited_ms": 0.0}
+
+    def submit(self, image, path, encode, on_done=None, block=True, timeout=None, unique=False,
+               store=None, variant="", hash_pixels=False):
+        """Queue a save; returns its SaveTicket, or None when the queue stayed full
+
+        Blocks while max_pending saves are in flight unless block is False
+        (or until timeout). unique picks a free name like unique_path().
+        on_done(ticket) runs on a save worker once the file is durable or
+        the save failed. store (a ContentStore) deduplicates by pixels;
+        variant names the encoding, so other formats or settings never match.
+        hash_pixels sets ticket.pixel_hash even without a store.
+        """
+        started = time.perf_counter()
+        if self._closed:
+            self.logger.warning(f"Save pipeline is shut down, not saving {os.path.basename(path)}")
+            return None
+        if not self._slots.acquire(blocking=block, timeout=timeout if block else None):
+            with self._lock:
+                self.stats["rejected"] += 1
+            self.logger.warning(f"Save queue full, not saving {os.path.basename(path)}")
+            return None
+        waited_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            if self._closed:
+                self._slots.release()
+                self.stats["rejected"] += 1
+                return None
+            if unique:
+                path = self._unique_path(path)
+            # Sequence numbers are taken under the lock so commit order is submission order
+            ticket = SaveTicket(next(self._seq), image, path, encode, on_done, store, variant, hash_pixels)
+            self._pending.append(ticket)
+            self._reserved.add(os.path.normcase(os.path.abspath(path)))
+            self.stats["queued"] += 1
+            self.stats["waited_ms"] += waited_ms
+            self._executor.submit(self._run, ticket)
+        if waited_ms > 1:
+            self.logger.debug(f"Save back-pressure: waited {waited_ms:.1f} ms for a queue slot")
+        return ticket
+
+    def unique_path(self, path):
+        """path, or path with _2, _3... when that file exists or a queued save targets it"""
+        with self._lock:
+            return self._unique_path(path)
+
+    def _unique_path(self, path):
+        # Caller holds the lock
+        root, extension = os.path.splitext(path)
+        candidate, n = path, 1
+        while os.path.exists(candidate) or os.path.normcase(os.path.abspath(candidate)) in self._reserved:
+            n += 1
+            candidate = f"{root}_{n}{extension}"
+        return candidate
+
+    def _run(self, ticket):
+        temp_path = f"{ticket.path}.{ticket.seq}.part"
+        try:
+            started = time.perf_counter()
+            os.makedirs(os.path.dirname(os.path.abspath(ticket.path)), exist_ok=True)
+            reused = None
+            if ticket.hash_pixels:
+                ticket.pixel_hash = pixel_digest(ticket.image)
+            if ticket.store is not None:
+                ticket.content_key = ticket.store.key(ticket.pixel_hash, ticket.variant)
+                reused = ticket.store.materialize(ticket.content_key, temp_path)
+            if reused is not None:
+                # The stored file is already durable; only the rename is left
+                ticket.dedupe, ticket.bytes_saved = reused
+            else:
+                with open(temp_path, "wb") as f:
+                    ticket.encode(ticket.image, f)
+                    f.flush()
+                    if self.fsync:
+                        os.fsync(f.fileno())
+            ticket.encode_ms = (time.perf_counter() - started) * 1000
+        except Exception as e:
+            ticket.error = e
+            self._remove(temp_path)
+        self._commit(ticket, temp_path)
+
+    def _commit(self, ticket, temp_path):
+        # Wait for every earlier save, so files and callbacks follow submission order
+        with self._turn:
+            while self._next_commit != ticket.seq:
+                self._turn.wait()
+        try:
+            if ticket.error is None:
+                try:
+                    os.replace(temp_path, ticket.path)
+                    if self.fsync:
+                        _fsync_directory(os.path.dirname(os.path.abspath(ticket.path)))
+                    if ticket.content_key is not None and ticket.dedupe is None:
+                        ticket.store.adopt(ticket.content_key, ticket.path)
+                except Exception as e:
+                    ticket.error = e
+                    self._remove(temp_path)
+            ticket.state = SAVED if ticket.error is None else FAILED
+            ticket.total_ms = (time.perf_counter() - ticket.submitted_at) * 1000
+            if ticket.error is not None:
+                self.logger.error(f"Saving {ticket.path} failed: {ticket.error}")
+            # Drop the pixels before the callback; only the outcome is kept
+            ticket.image = None
+            with self._lock:
+                self.stats["saved" if ticket.ok else "failed"] += 1
+                if ticket.ok and ticket.dedupe is not None:
+                    self.stats["deduplicated"] += 1
+                    self.stats["bytes_saved"] += ticket.bytes_saved
+                self._pending.remove(ticket)
+                self._reserved.discard(os.path.normcase(os.path.abspath(ticket.path)))
+            if ticket.on_done is not None:
+                try:
+                    ticket.on_done(ticket)
+                except Exception as e:
+                    self.logger.error(f"Save callback failed: {e}")
+        finally:
+            ticket.done_event.set()
+            self._slots.release()
+            with self._turn:
+                self._next_commit += 1
+                self._turn.notify_all()
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far is on disk; False on timeout"""
+        with self._lock:
+            tickets = list(self._pending)
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        for ticket in tickets:
+            remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            if not ticket.wait(remaining):
+                return False
+        return True
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["pending"] = len(self._pending)
+        stats["max_pending"] = self.max_pending
+        return stats
+
+    def shutdown(self, flush=True, timeout=None):
+        """Refuse new saves; by default finish the queued ones first
+
+        Returns False when queued saves were still running at the timeout.
+        """
+        with self._lock:
+            self._closed = True
+        flushed = self.flush(timeout) if flush else self.pending() == 0
+        if not flushed:
+            self.logger.warning(f"{self.pending()} save(s) still running at shutdown")
+        self._executor.shutdown(wait=flushed)
+        return flushed
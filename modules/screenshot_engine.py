@@ -4,19 +4,36 @@ os.environ['QT_SCALE_FACTOR'] = '1'
 os.environ['QT_SCREEN_SCALE_FACTORS'] = '1'
 os.environ['QT_DEVICE_PIXEL_RATIO'] = '1'
 
-import pyautogui
-import time
+try:
+    import pyautogui
+except ImportError:
+    # Headless hosts grab through a capture backend (e.g. the synthetic desktop)
+    pyautogui = None
+import threading
+import itertools
+import numpy as np
 from PIL import Image
 from datetime import datetime
-from config import DEFAULT_SAVE_DIR, SUPPORTED_FORMATS
+from config import DEFAULT_SAVE_DIR, DEFAULT_SETTINGS, ENCODER_PRESETS, SUPPORTED_FORMATS
 from modules.window_capture_legacy import WindowCapture
-from core.log_sys import get_logger
+from modules.region_worker_pool import RegionWorkerPool
+from modules import shared_frame
+from modules import capture_backends
+from modules.burst_capture import BurstCapture, FrameRing
+from modules.timelapse import TimelapseRecorder
+from modules.scroll_capture import RowHasher, ScrollStitcher, StreamingPNGWriter
+from modules.frame_cache import FrameCache
+from modules.save_pipeline import SavePipeline
+from modules.save_legacy import encode_image
+from modules.content_store import pixel_digest
+from modules import window_index
+from modules import monitors
+from core.log_sys import get_logger, mark_stage
+from core.timer_wheel import get_timer_wheel
 import subprocess
 import sys
-import json
 import os
 import re
-import tempfile
 
 # Add utils to path for resource management
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -28,22 +45,56 @@ if utils_path not in sys.path:
 from utils import get_python_executable, get_module_path, is_packaged
 
 class ScreenshotEngine:
-    def __init__(self):
+    def __init__(self, worker_pool_size=None):
         self.logger = get_logger()
         self.logger.debug("ScreenshotEngine.__init__")
         
         # Disable pyautogui failsafe
-        pyautogui.FAILSAFE = False
+        if pyautogui is not None:
+            pyautogui.FAILSAFE = False
         self.save_directory = DEFAULT_SAVE_DIR
         self.image_format = "PNG"
+        self.encoder_preset = DEFAULT_SETTINGS.get("encoder_preset", "balanced")
         self.auto_save = True
         self.show_cursor = False
         self.delay_seconds = 0
+        self._delay_cancel = threading.Event()
+        # Captures armed on the timer wheel by capture_later, by key
+        self._delayed = {}
+        self._delayed_ids = itertools.count(1)
+        self._delayed_lock = threading.Lock()
+        # Used when capture_region gets no selection_script (headless benchmark runs)
+        self.selection_script = None
+        self._burst_ring = None
+        self._timelapse = None
+        # ScreenshotLibrary the app hands in; burst and scrolling captures are recorded in it
+        self.library = None
+        # Near-simultaneous requests (double-pressed hotkey, tray + hotkey) share one grab
+        self.frame_cache = FrameCache(DEFAULT_SETTINGS.get("frame_cache_ms", 50))
+        # Write-behind saves; shared with the app's SaveManager
+        self.save_pipeline = SavePipeline(workers=DEFAULT_SETTINGS.get("save_workers", 1),
+                                          max_pending=DEFAULT_SETTINGS.get("save_queue_size", 4))
         
         # Ensure save directory exists
         os.makedirs(self.save_directory, exist_ok=True)
+        
+        # Keep pre-initialized region workers ready to cut hotkey-to-overlay latency
+        if worker_pool_size is None:
+            worker_pool_size = DEFAULT_SETTINGS.get("region_worker_pool_size", 1)
+        self.worker_pool = RegionWorkerPool(size=worker_pool_size)
+        self.worker_pool.start()
+        
+        # Pick the fastest grab backend once per machine; the app caches the choice in settings
+        self.benchmarked_backend = None
+        if not capture_backends.has_cached_choice() and not os.environ.get("ZSNAPR_SYNTHETIC_DESKTOP"):
+            threading.Thread(target=self.benchmark_capture_backends, daemon=True).start()
         self.logger.debug("ScreenshotEngine initialized")
     
+    @property
+    def capture_backend(self):
+        """Backend all grabs go through"""
+        return capture_backends.get_default_backend()
+    
     def set_save_directory(self, directory):
         """Set the directory where screenshots will be saved"""
         self.save_directory = directory
@@ -54,14 +105,76 @@ class ScreenshotEngine:
         if format_name in [fmt["name"] for fmt in SUPPORTED_FORMATS]:
             self.image_format = format_name
     
+    def set_encoder_preset(self, preset):
+        """Set the encoder preset (see config.ENCODER_PRESETS) used when saving"""
+        if preset in ENCODER_PRESETS:
+            self.encoder_preset = preset
+    
     def set_delay(self, seconds):
         """Set delay before taking screenshot"""
         self.delay_seconds = max(0, seconds)
     
     def _apply_delay(self):
-        """Apply delay if set"""
+        """Apply delay if set; cancel_delay() ends it early
+        
+        The capture_* methods return the image, so with a delay set they hold
+        the calling thread for it. Callers that must not block use
+        capture_later, the app's ScheduleManager or AsyncScreenshotEngine.
+        """
         if self.delay_seconds > 0:
-            time.sleep(self.delay_seconds)
+            self._delay_cancel.clear()
+            self._delay_cancel.wait(self.delay_seconds)
+    
+    def capture_later(self, capture, callback, *args, delay=None, **kwargs):
+        """Run capture_<capture>(*args, **kwargs) after a delay; returns a key at once
+        
+        The delay (the configured one by default) is armed on the shared timer
+        wheel, so no thread waits it out. When due the capture runs on a
+        short-lived thread, which then calls callback(result, error).
+        """
+        method = getattr(self, f"capture_{capture}")
+        seconds = self.delay_seconds if delay is None else max(0, delay)
+        with self._delayed_lock:
+            key = next(self._delayed_ids)
+            self._delayed[key] = get_timer_wheel().call_later(seconds, self._on_delay_due, key, method,
+                                                              callback, args, kwargs)
+        return key
+    
+    def _on_delay_due(self, key, method, callback, args, kwargs):
+        # Wheel thread: callbacks there must return quickly, so hand the capture off
+        with self._delayed_lock:
+            if self._delayed.pop(key, None) is None:
+                # Cancelled after the wheel had already collected it
+                return
+        threading.Thread(target=self._run_delayed, args=(method, callback, args, kwargs),
+                         name="zsnapr-delayed-capture", daemon=True).start()
+    
+    def _run_delayed(self, method, callback, args, kwargs):
+        try:
+            result = method(*args, apply_delay=False, **kwargs)
+        except Exception as e:
+            self.logger.error(f"Delayed capture failed: {e}")
+            callback(None, e)
+            return
+        callback(result, None)
+    
+    def cancel_delay(self, key=None):
+        """Cut a running capture delay short and disarm pending capture_later calls
+        
+        With a key from capture_later only that capture is disarmed; returns
+        how many were.
+        """
+        with self._delayed_lock:
+            if key is None:
+                self._delay_cancel.set()
+                timers = list(self._delayed.values())
+                self._delayed.clear()
+            else:
+                timer = self._delayed.pop(key, None)
+                timers = [timer] if timer is not None else []
+        for timer in timers:
+            timer.cancel()
+        return len(timers)
     
     def _get_file_extension(self):
         """Get file extension based on current format"""
@@ -76,137 +189,358 @@ class ScreenshotEngine:
         extension = self._get_file_extension()
         return f"screenshot_{timestamp}{extension}"
     
-    def capture_fullscreen(self):
+    def capture_fullscreen(self, apply_delay=True):
         """Capture full screen screenshot"""
-        self._apply_delay()
-        screenshot = pyautogui.screenshot()
-        return screenshot
+        if apply_delay:
+            self._apply_delay()
+        return self.grab_fullscreen()
+    
+    def grab_fullscreen(self):
+        """Grab the full screen right away, without the configured delay"""
+        backend = self.capture_backend
+        return self.frame_cache.get(backend, "screen", backend.grab)
+    
+    def get_monitors(self):
+        """Monitors in virtual desktop coordinates, primary first"""
+        return monitors.enumerate_monitors(self.capture_backend)
+    
+    def capture_monitor(self, index, apply_delay=True):
+        """Capture one monitor only, without grabbing the whole desktop"""
+        if apply_delay:
+            self._apply_delay()
+        available = self.get_monitors()
+        if not 0 <= index < len(available):
+            raise IndexError(f"Monitor {index} does not exist ({len(available)} connected)")
+        backend = self.capture_backend
+        monitor = available[index]
+        return self.frame_cache.get(backend, index, lambda: monitors.capture_monitor(backend, monitor),
+                                    (monitor.x, monitor.y))
+    
+    def capture_all_monitors(self, apply_delay=True):
+        """Capture every monitor in parallel, stitched into one virtual desktop image"""
+        if apply_delay:
+            self._apply_delay()
+        return self.grab_virtual_desktop()
     
-    def capture_region(self, x=None, y=None, width=None, height=None):
-        """Capture specific region of screen"""
+    def grab_virtual_desktop(self):
+        """Stitched grab of all monitors without the configured delay"""
+        backend = self.capture_backend
+        available = self.get_monitors()
+        if len(available) == 1 and available[0].region == (0, 0) + tuple(backend.screen_size()):
+            return self.frame_cache.get(backend, "screen", backend.grab)
+        left, top, _, _ = monitors.virtual_bounds(available)
+        return self.frame_cache.get(backend, "virtual",
+                                    lambda: monitors.capture_virtual_desktop(backend, available), (left, top))
+    
+    def capture_region(self, x=None, y=None, width=None, height=None, on_progress=None, selection_script=None,
+                       apply_delay=True, cancel_event=None):
+        """Capture specific region of screen
+
+        on_progress(event, payload) receives overlay_shown, selection_changed,
+        confirmed and cancelled events from the selector while it is open.
+        selection_script ({"rect": [x, y, w, h], "action": "copy"}) makes the
+        selector complete on its own, for headless benchmark runs.
+        apply_delay=False skips the configured delay (callers that wait themselves).
+        Setting cancel_event (a threading.Event) cancels this call's selection,
+        including before its overlay has opened.
+        """
         self.logger.debug(f"capture_region called with x={x}, y={y}, width={width}, height={height}")
         
         action = "copy"
+        composite = None
+        png_path = None
         if x is None or y is None or width is None or height is None:
-            # Launch selector in a separate process to avoid Qt main-thread conflicts
-            try:
-                self.logger.debug("Spawning region_worker subprocess with temp json")
-                
-                # Get the correct worker script path
-                worker_path = get_module_path("modules/region_worker.py")
-                if not os.path.exists(worker_path):
-                    self.logger.error(f"Worker script not found at: {worker_path}")
-                    return None
-                
-                # Setup environment
-                env = os.environ.copy()
-                env.setdefault("QT_LOGGING_RULES", "*.debug=false;qt.*=false")
-                env.setdefault("QT_LOGGING_TO_CONSOLE", "0")
-                
-                # Create temporary file for communication
-                with tempfile.NamedTemporaryFile(prefix="zsnapr_region_", suffix=".json", delete=False) as tf:
-                    out_path = tf.name
-                env["ZSNAPR_REGION_OUT"] = out_path
-                
-                # Get the correct Python executable
-                python_exe = get_python_executable()
-                
-                self.logger.debug(f"tmp json path={out_path}")
-                self.logger.debug(f"Using Python executable: {python_exe}")
-                self.logger.debug(f"Worker script path: {worker_path}")
-                
-                # Prepare subprocess arguments with proper shell handling for packaged environment
-                if is_packaged():
-                    # In packaged environment, we need to handle paths carefully
-                    cmd = [python_exe, worker_path]
-                    # Use CREATE_NEW_PROCESS_GROUP to avoid inheriting parent's console
-                    creation_flags = subprocess.CREATE_NEW_PROCESS_GROUP if os.name == 'nt' else 0
-                else:
-                    cmd = [python_exe, worker_path]
-                    creation_flags = 0
-                
-                # Run the subprocess with proper error handling
-                proc = subprocess.run(
-                    cmd, 
-                    capture_output=True, 
-                    text=True, 
-                    timeout=120, 
-                    env=env,
-                    creationflags=creation_flags
-                )
-                
-                self.logger.debug(f"region_worker returncode={proc.returncode}")
-                stdout = (proc.stdout or "").strip()
-                stderr = (proc.stderr or "").strip()
-                if stdout:
-                    self.logger.debug(f"region_worker stdout(raw)={stdout}")
-                if stderr:
-                    self.logger.debug(f"region_worker stderr={stderr}")
-                    
-                # Read result from temporary file
-                data = None
-                try:
-                    exists = os.path.exists(out_path)
-                    self.logger.debug(f"tmp json exists={exists}")
-                    if exists:
-                        with open(out_path, "r", encoding="utf-8") as f:
-                            txt = f.read().strip()
-                        self.logger.debug(f"tmp json content={txt}")
-                        if txt:
-                            data = json.loads(txt)
-                finally:
-                    try:
-                        if os.path.exists(out_path):
-                            os.remove(out_path)
-                    except Exception:
-                        pass
-                        
-                if not data or not data.get("ok"):
-                    reason = data.get("reason") if isinstance(data, dict) else "unknown"
-                    self.logger.info(f"Region selection not ok: {reason}")
-                    return None
-                    
-                x = int(data["x"]); y = int(data["y"]); width = int(data["w"]); height = int(data["h"])
-                action = data.get("action", "copy")
-                png_path = data.get("png")
-                self.logger.debug(f"Worker provided region: ({x},{y},{width},{height}), action={action}, png={png_path}")
-                
-            except subprocess.TimeoutExpired:
-                self.logger.error("region_worker timed out")
+            # Freeze the desktop once: the overlay, the composite and the final
+            # crop all come from this frame
+            if apply_delay:
+                self.logger.debug("Applying delay before screenshot")
+                self._apply_delay()
+            frame = self._grab_frozen_frame()
+            if frame is None:
                 return None
-            except Exception as e:
-                self.logger.error(f"region_worker failed: {e}")
-                self.logger.exception("region_worker exception:")
+            mark_stage("frame_frozen")
+            
+            data = self._run_region_selection(frame, on_progress, selection_script or self.selection_script,
+                                              cancel_event)
+            if data is None:
                 return None
+            mark_stage("selection_returned")
+            x = int(data["x"]); y = int(data["y"]); width = int(data["w"]); height = int(data["h"])
+            action = data.get("action", "copy")
+            png_path = data.get("png")
+            composite = data.get("image")
+            self.logger.debug(f"Worker provided region: ({x},{y},{width},{height}), action={action}, "
+                              f"shared={composite is not None}, png={png_path}")
+        else:
+            if apply_delay:
+                self.logger.debug("Applying delay before screenshot")
+                self._apply_delay()
+            frame = None
         
-        self.logger.debug("Applying delay before screenshot")
-        self._apply_delay()
-        
-        if 'png_path' in locals() and png_path and os.path.exists(png_path):
-            self.logger.debug("Using composite PNG provided by worker")
+        if composite is not None:
+            # Pixels mapped straight from the worker's shared memory, no decode
+            self.logger.debug("Using shared-memory composite provided by worker")
+            screenshot = composite
+        elif png_path and os.path.exists(png_path):
+            self.logger.debug("Using composite file provided by worker")
             try:
                 screenshot = Image.open(png_path)
+                screenshot.load()
                 # Keep original format, don't force RGBA conversion which can cause white background
                 if screenshot.mode not in ('RGB', 'RGBA'):
                     screenshot = screenshot.convert('RGB')
                 self.logger.debug(f"Loaded composite image: mode={screenshot.mode}, size={screenshot.size}")
             except Exception as e:
-                self.logger.error(f"Failed to load composite PNG: {e}")
-                # Fallback to regular screenshot
-                screenshot = pyautogui.screenshot(region=(x, y, width, height))
+                self.logger.error(f"Failed to load composite image: {e}")
+                # Fallback to the frame the user made the selection on
+                screenshot = self._crop_frame(frame, x, y, width, height)
             try:
                 os.remove(png_path)
             except Exception:
                 pass
         else:
             self.logger.debug(f"Taking screenshot with region: ({x}, {y}, {width}, {height})")
-            screenshot = pyautogui.screenshot(region=(x, y, width, height))
+            screenshot = self._crop_frame(frame, x, y, width, height)
         self.logger.debug(f"Screenshot prepared, size: {screenshot.size}")
         return (screenshot, action)
     
-    def capture_window(self):
+    def _run_region_selection(self, frame, on_progress=None, selection_script=None, cancel_event=None):
+        """Let the user select a region on the frozen frame; returns the worker's result or None"""
+        # Launch selector in a separate process to avoid Qt main-thread conflicts
+        shm = None
+        try:
+            options = {}
+            if selection_script:
+                options["script"] = selection_script
+            try:
+                shm = shared_frame.publish_image(frame)
+                options["frame"] = shared_frame.describe(shm)
+            except Exception as e:
+                self.logger.error(f"Failed to share frozen frame, selector grabs its own: {e}")
+            windows = self._overlay_windows()
+            if windows is not None:
+                options["windows"] = windows
+            
+            self.logger.debug("Requesting region selection from worker")
+            
+            # Prefer a warm, pre-initialized worker; the pool cold-starts one when none is ready
+            data = self.worker_pool.run_selection(timeout=120, on_progress=on_progress, options=options,
+                                                  cancel_event=cancel_event)
+            self.logger.debug(f"region_worker result={data}")
+                    
+            if not data or not data.get("ok"):
+                reason = data.get("reason") if isinstance(data, dict) else "unknown"
+                self.logger.info(f"Region selection not ok: {reason}")
+                return None
+            return data
+            
+        except subprocess.TimeoutExpired:
+            self.logger.error("region_worker timed out")
+            return None
+        except Exception as e:
+            self.logger.error(f"region_worker failed: {e}")
+            self.logger.exception("region_worker exception:")
+            return None
+        finally:
+            if shm is not None:
+                shared_frame.release_owner(shm, unlink=True)
+    
+    def _overlay_windows(self):
+        """Top-level windows in frozen-frame coordinates for hover-to-snap, topmost first"""
+        try:
+            left, top, _, _ = monitors.virtual_bounds(self.get_monitors())
+            return [[w.x - left, w.y - top, w.width, w.height, w.title]
+                    for w in window_index.enumerate_windows()]
+        except Exception as e:
+            self.logger.error(f"Failed to enumerate windows for the overlay: {e}")
+            return None
+    
+    def _grab_frozen_frame(self):
+        """Grab the whole desktop once for an interactive selection"""
+        try:
+            # All monitors, so the overlay can span the whole virtual desktop
+            frame = self.grab_virtual_desktop()
+            self.logger.debug(f"Frozen frame captured: {frame.size}")
+            return frame
+        except Exception as e:
+            self.logger.error(f"Failed to capture frozen frame: {e}")
+            return None
+    
+    def _crop_frame(self, frame, x, y, width, height):
+        """Crop a region from the frozen frame, or grab it live without one"""
+        if frame is None:
+            backend = self.capture_backend
+            cached = self.frame_cache.crop(backend, (x, y, width, height))
+            if cached is not None:
+                return cached
+            return backend.grab((x, y, width, height))
+        return frame.crop((x, y, x + width, y + height))
+    
+    def capture_burst(self, n, interval_ms, region=None, save=True, wait=True, apply_delay=True):
+        """Capture n frames interval_ms apart into a reusable ring of buffers
+
+        Frames are saved on a background thread so encoding does not slow the
+        cadence. Returns stats with captured/dropped counts, jitter and the
+        saved file paths (when wait is set).
+        """
+        if apply_delay:
+            self._apply_delay()
+        backend = self.capture_backend
+        if region is None:
+            width, height = backend.screen_size()
+        else:
+            width, height = int(region[2]), int(region[3])
+        
+        slots = max(1, min(n, DEFAULT_SETTINGS.get("burst_ring_slots", 8)))
+        if self._burst_ring is None or not self._burst_ring.fits(slots, width, height):
+            self.logger.debug(f"Allocating burst ring: {slots} x {width}x{height}")
+            self._burst_ring = FrameRing(slots, width, height)
+        
+        save_frame = None
+        if save:
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            extension = self._get_file_extension()
+            
+            def save_burst_frame(image, index):
+                filepath = self.save_screenshot(image, f"burst_{stamp}_{index:04d}{extension}")
+                if self.library is not None:
+                    # Hashed before the ring slot behind image is released
+                    self.library.record(filepath, "burst", width, height, content_hash=pixel_digest(image))
+                return filepath
+            
+            save_frame = save_burst_frame
+        
+        burst = BurstCapture(backend, self._burst_ring, save_frame)
+        return burst.run(n, interval_ms, region=region, wait=wait)
+    
+    def start_timelapse(self, interval_seconds, path=None, region=None):
+        """Start recording every interval_seconds; only changed tiles hit the disk"""
+        if self._timelapse is not None and self._timelapse.running:
+            self.logger.warning("Time-lapse already running")
+            return self._timelapse
+        if path is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            path = os.path.join(self.save_directory, f"timelapse_{timestamp}.zsl")
+        self._timelapse = TimelapseRecorder(self.capture_backend, path, interval_seconds, region=region).start()
+        return self._timelapse
+    
+    def stop_timelapse(self):
+        """Stop the running time-lapse and return its stats"""
+        if self._timelapse is None:
+            return {}
+        self._timelapse.stop()
+        stats = self._timelapse.get_stats()
+        self._timelapse = None
+        return stats
+    
+    def capture_scrolling(self, region=None, path=None, scroll=None, scroll_clicks=5, interval_ms=150,
+                          max_frames=200, max_still=3, stop_event=None, ignore_right=24):
+        """Long screenshot of a region whose content scrolls
+
+        The region is grabbed repeatedly into two reused buffers while it
+        scrolls (pyautogui wheel clicks, or the scroll callable, or the user
+        scrolling by hand when neither is available). Only newly revealed rows
+        are appended to a streaming PNG, so memory does not grow with the page.
+        Stops after max_frames, after max_still grabs without movement, or
+        when stop_event is set. Returns (path, height, stats) or None.
+        """
+        if region is None:
+            frame = self._grab_frozen_frame()
+            if frame is None:
+                return None
+            data = self._run_region_selection(frame)
+            if data is None:
+                return None
+            # Selection coordinates are relative to the virtual desktop's top-left corner
+            left, top, _, _ = monitors.virtual_bounds(self.get_monitors())
+            region = (int(data["x"]) + left, int(data["y"]) + top, int(data["w"]), int(data["h"]))
+        x, y, width, height = (int(v) for v in region)
+        if width <= 0 or height <= 0:
+            return None
+        if scroll is None and pyautogui is not None:
+            # Wheel over the middle of the region
+            scroll = lambda: pyautogui.scroll(-scroll_clicks, x + width // 2, y + height // 2)
+        if path is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            path = os.path.join(self.save_directory, f"scroll_{timestamp}.png")
+        
+        backend = self.capture_backend
+        buffers = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(2)]
+        stitcher = ScrollStitcher(StreamingPNGWriter(path, width), RowHasher(ignore_right=min(ignore_right, width // 4)))
+        stop_event = stop_event or threading.Event()
+        still = 0
+        try:
+            for index in range(max_frames):
+                # The stitcher keeps the previous frame as reference, so alternate buffers
+                buffer = buffers[index % 2]
+                backend.grab_into(buffer, (x, y, width, height))
+                shift = stitcher.add(buffer)
+                still = still + 1 if shift == 0 else 0
+                if still >= max_still or stop_event.is_set():
+                    break
+                if scroll is not None:
+                    scroll()
+                stop_event.wait(interval_ms / 1000)
+            path, total_height = stitcher.finish()
+        except Exception as e:
+            self.logger.error(f"Scrolling capture failed: {e}")
+            stitcher.writer.abort()
+            return None
+        self.logger.info(f"Scrolling capture saved: {path} ({width}x{total_height}, {stitcher.stats})")
+        if self.library is not None:
+            # The stitched page only ever exists on disk, so there is no pixel hash to record
+            self.library.record(path, "scroll", width, total_height, image_format="PNG")
+        return path, total_height, dict(stitcher.stats)
+    
+    def cancel_region_selection(self):
+        """Cancel the region overlay that is currently open, if any"""
+        return self.worker_pool.cancel_active()
+    
+    def get_frame_cache_stats(self):
+        """Hit/miss counters of the short-window frame cache"""
+        return self.frame_cache.get_stats()
+    
+    def get_worker_pool_stats(self):
+        """Get health and latency stats of the warm region worker pool"""
+        return self.worker_pool.get_stats()
+    
+    def benchmark_capture_backends(self, rounds=3):
+        """Benchmark grab backends and switch to the fastest one
+
+        The choice is kept in benchmarked_backend for the app to save from
+        the main thread (capture_backends.save_backend_choice).
+        """
+        try:
+            best, results = capture_backends.select_fastest_backend(rounds=rounds)
+            if best:
+                self.benchmarked_backend = best
+            return results
+        except Exception as e:
+            self.logger.error(f"Capture backend benchmark failed: {e}")
+            return {}
+    
+    def shutdown(self, save_timeout=10.0):
+        """Release background resources held by the engine; queued saves are finished first"""
+        self.cancel_delay()
+        self.stop_timelapse()
+        self.worker_pool.shutdown()
+        self.save_pipeline.shutdown(flush=True, timeout=save_timeout)
+    
+    def capture_window(self, apply_delay=True):
         """Capture active window"""
-        self._apply_delay()
+        if apply_delay:
+            self._apply_delay()
+        return self.grab_window()
+    
+    def grab_window(self):
+        """Grab the active window right away, without the configured delay"""
+        rect = WindowCapture.get_active_window_rect()
+        if rect is not None:
+            left, top, right, bottom = rect
+            if right > left and bottom > top:
+                cached = self.frame_cache.crop(self.capture_backend, (left, top, right - left, bottom - top))
+                if cached is not None:
+                    return cached
         return WindowCapture.capture_active_window()
     
     def save_screenshot(self, screenshot, filename=None):
@@ -216,17 +550,26 @@ class ScreenshotEngine:
         
         filepath = os.path.join(self.save_directory, filename)
         
-        # Convert format if needed
-        if self.image_format == "JPEG":
-            # Convert RGBA to RGB for JPEG
-            if screenshot.mode == "RGBA":
-                rgb_screenshot = Image.new("RGB", screenshot.size, (255, 255, 255))
-                rgb_screenshot.paste(screenshot, mask=screenshot.split()[-1])
-                screenshot = rgb_screenshot
-        
-        screenshot.save(filepath, format=self.image_format)
+        # Format conversion (RGBA -> RGB for JPEG) and encoder parameters come from the preset
+        encode_image(screenshot, filepath, self.image_format, self.encoder_preset)
         return filepath
     
+    def save_screenshot_async(self, screenshot, filename=None, on_done=None, block=True):
+        """Queue a save on the write-behind pipeline; returns its SaveTicket (None if the queue is full)
+        
+        on_done(ticket) runs on a save thread once the file is durable
+        (ticket.ok) or the save failed (ticket.error).
+        """
+        if filename is None:
+            filename = self._generate_filename()
+        image_format, preset = self.image_format, self.encoder_preset
+        
+        def encode(image, f):
+            encode_image(image, f, image_format, preset)
+        
+        return self.save_pipeline.submit(screenshot, os.path.join(self.save_directory, filename), encode,
+                                         on_done, block=block, unique=True)
+    
     def get_screen_size(self):
         """Get screen dimensions"""
-        return pyautogui.size()
\ No newline at end of file
+        return self.capture_backend.screen_size()
\ No newline at end of file
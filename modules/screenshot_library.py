@@ -0,0 +1,269 @@
+import os
+import re
+import time
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from core.log_sys import get_logger
+from modules import qoi
+
+# Screenshot library
+#
+# Every saved capture is recorded in a SQLite database: path, file size,
+# dimensions, format, capture type, capture time, window title and a hash
+# of the pixels. Callers only enqueue records; one writer thread owns the
+# connection and commits them in batches (one transaction per batch, WAL
+# journal), so a burst of captures costs one fsync, not one each. Reads
+# open their own connection, which WAL lets run alongside the writer.
+#
+# Existing folders are imported by probing headers only (PIL reads the
+# first few hundred bytes to learn the size; QOI's 14-byte header is parsed
+# directly) on a thread pool, since the work is almost all file I/O.
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp", ".qoi")
+BATCH_SIZE = 256  # records per transaction
+FLUSH_INTERVAL = 0.5  # seconds a record may wait for more to batch with
+PROBE_WORKERS = 8
+# screenshot_20250101_120000.png, scroll_20250101_120000.png, ...
+_TIMESTAMP_NAME = re.compile(r"(\d{8}_\d{6})")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    format TEXT,
+    capture_type TEXT,
+    captured_at REAL NOT NULL,
+    window_title TEXT,
+    content_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_captures_time ON captures (captured_at);
+CREATE INDEX IF NOT EXISTS idx_captures_type_time ON captures (capture_type, captured_at);
+CREATE INDEX IF NOT EXISTS idx_captures_size ON captures (size);
+CREATE INDEX IF NOT EXISTS idx_captures_hash ON captures (content_hash);
+"""
+
+COLUMNS = ("path", "size", "width", "height", "format", "capture_type", "captured_at", "window_title",
+           "content_hash")
+_INSERT = f"INSERT INTO captures ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))}) ON CONFLICT(path) "
+# A new save replaces the record of a file that had the same path
+_UPSERT = _INSERT + "DO UPDATE SET " + ", ".join(f"{column} = excluded.{column}" for column in COLUMNS[1:])
+# An import only refreshes what the header tells; type, title and hash stay
+_REFRESH = _INSERT + "DO UPDATE SET " + ", ".join(f"{column} = excluded.{column}" for column in COLUMNS[1:5])
+
+
+def probe(path):
+    """Record fields of an image file from its header, or None when it is not a readable image"""
+    try:
+        stat = os.stat(path)
+        if path.lower().endswith(qoi.EXTENSION):
+            with open(path, "rb") as f:
+                width, height, _, _ = qoi.read_header(f.read(qoi.HEADER_SIZE))
+            image_format = "QOI"
+        else:
+            # open() only parses the header; pixels are never decoded
+            with Image.open(path) as image:
+                (width, height), image_format = image.size, image.format
+    except Exception:
+        return None
+    match = _TIMESTAMP_NAME.search(os.path.basename(path))
+    captured_at = stat.st_mtime
+    if match:
+        try:
+            captured_at = datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").timestamp()
+        except ValueError:
+            pass
+    return {"path": os.path.abspath(path), "size": stat.st_size, "width": width, "height": height,
+            "format": image_format, "captured_at": captured_at}
+
+
+class ScreenshotLibrary:
+    """SQLite index of saved captures with a batching background writer"""
+
+    def __init__(self, db_path):
+        self.logger = get_logger()
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        connection = self._connect()
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+        self._queue = queue.Queue()
+        self._closed = False
+        self.stats = {"recorded": 0, "batches": 0, "failed": 0}
+        self._writer = threading.Thread(target=self._write_loop, name="zsnapr-library", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.db_path, timeout=10)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def record(self, path, capture_type=None, width=None, height=None, window_title=None, content_hash=None,
+               captured_at=None, image_format=None):
+        """Queue a saved capture for the index; the file size is read on the writer thread"""
+        if self._closed:
+            return
+        self._queue.put({"path": os.path.abspath(path), "capture_type": capture_type, "width": width,
+                         "height": height, "window_title": window_title, "content_hash": content_hash,
+                         "captured_at": captured_at if captured_at is not None else time.time(),
+                         "format": image_format or os.path.splitext(path)[1].lstrip(".").upper() or None})
+
+    def _write_loop(self):
+        connection = self._connect()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                deadline = time.monotonic() + FLUSH_INTERVAL
+                stop = False
+                # Gather what arrives within the flush interval, up to one batch;
+                # a flush() marker (an Event) ends the batch right away
+                while len(batch) < BATCH_SIZE and not isinstance(item, threading.Event):
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+                self._write_batch(connection, batch)
+                if stop:
+                    break
+        finally:
+            connection.close()
+
+    def _write_batch(self, connection, batch):
+        saved, imported, waiters = [], [], []
+        for item in batch:
+            if isinstance(item, threading.Event):
+                waiters.append(item)
+                continue
+            if "size" not in item:
+                try:
+                    item["size"] = os.path.getsize(item["path"])
+                except OSError:
+                    # Deleted (or never written) before it could be indexed
+                    continue
+            target = imported if item.pop("imported", False) else saved
+            target.append(tuple(item.get(column) for column in COLUMNS))
+        rows = len(saved) + len(imported)
+        try:
+            if rows:
+                with connection:
+                    connection.executemany(_UPSERT, saved)
+                    connection.executemany(_REFRESH, imported)
+                self.stats["recorded"] += rows
+                self.stats["batches"] += 1
+        except sqlite3.Error as e:
+            self.stats["failed"] += rows
+            self.logger.error(f"Library write failed for {rows} capture(s): {e}")
+        finally:
+            # flush() markers ride along with the records queued before them
+            for waiter in waiters:
+                waiter.set()
+
+    def flush(self, timeout=None):
+        """Wait until everything recorded so far is committed; False on timeout"""
+        if self._closed or not self._writer.is_alive():
+            return self._queue.empty()
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def import_folder(self, directory, recursive=True, workers=PROBE_WORKERS, capture_type="imported"):
+        """Index the images already in a folder; returns how many were queued
+
+        Files are probed header-only on a thread pool and recorded in
+        batches. Paths already in the library keep their capture type,
+        window title and hash.
+        """
+        paths = []
+        for root, dirs, files in os.walk(directory):
+            # The content store's copies are not captures of their own
+            dirs[:] = [name for name in dirs if not name.startswith(".")]
+            paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(IMAGE_EXTENSIONS))
+            if not recursive:
+                break
+        started = time.perf_counter()
+        queued = 0
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="zsnapr-probe") as executor:
+            for fields in executor.map(probe, paths):
+                if fields is None:
+                    continue
+                fields["capture_type"] = capture_type
+                fields["imported"] = True
+                self._queue.put(fields)
+                queued += 1
+        self.logger.info(f"Library import: {queued} of {len(paths)} file(s) probed in "
+                         f"{(time.perf_counter() - started) * 1000:.0f} ms from {directory}")
+        return queued
+
+    def query(self, since=None, until=None, capture_type=None, min_size=None, max_size=None,
+              content_hash=None, newest_first=True, limit=100):
+        """Captures as dicts, filtered by time range (epoch seconds), type, file size and hash"""
+        clauses, params = [], []
+        for clause, value in (("captured_at >= ?", since), ("captured_at < ?", until),
+                              ("capture_type = ?", capture_type), ("size >= ?", min_size),
+                              ("size <= ?", max_size), ("content_hash = ?", content_hash)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        sql = "SELECT * FROM captures"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY captured_at {'DESC' if newest_first else 'ASC'}"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        connection = self._connect()
+        try:
+            return [dict(row) for row in connection.execute(sql, params)]
+        finally:
+            connection.close()
+
+    def count(self):
+        connection = self._connect()
+        try:
+            return connection.execute("SELECT COUNT(*) FROM captures").fetchone()[0]
+        finally:
+            connection.close()
+
+    def remove_missing(self):
+        """Drop records whose file no longer exists; returns how many"""
+        connection = self._connect()
+        try:
+            missing = [(row[0],) for row in connection.execute("SELECT path FROM captures")
+                       if not os.path.exists(row[0])]
+            with connection:
+                connection.executemany("DELETE FROM captures WHERE path = ?", missing)
+            return len(missing)
+        finally:
+            connection.close()
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["pending"] = self._queue.qsize()
+        return stats
+
+    def close(self, timeout=5.0):
+        """Commit what is queued and stop the writer"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join(timeout)
@@ -0,0 +1,211 @@
+import os
+import zlib
+import struct
+import tempfile
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from core.log_sys import get_logger
+
+# Scrolling (long) screenshots
+#
+# A fixed region is grabbed repeatedly while its content scrolls. Every
+# frame is reduced to one 64-bit hash per row; the scroll distance between
+# two frames is the shift that lines the row hashes up. Only the rows that
+# scrolled into view are appended to a streaming PNG writer, so memory stays
+# at two frames plus the compressor state however tall the result gets.
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+class StreamingPNGWriter:
+    """RGB PNG writer that accepts rows before the final height is known
+
+    Rows are Sub-filtered with numpy and deflated as they arrive; only the
+    compressed stream is spooled (in memory, then on disk past spool_limit).
+    The file is assembled on close once the height is known.
+    """
+
+    def __init__(self, path, width, level=6, spool_limit=32 * 1024 * 1024):
+        self.path = path
+        self.width = width
+        self.height = 0
+        self._compressor = zlib.compressobj(level)
+        self._spool = tempfile.SpooledTemporaryFile(max_size=spool_limit)
+        self._closed = False
+
+    def write_rows(self, rows):
+        """Append an (n, width, 3) uint8 block of rows"""
+        n = rows.shape[0]
+        if n == 0:
+            return
+        if rows.shape[1] != self.width:
+            raise ValueError(f"Row width {rows.shape[1]} does not match {self.width}")
+        flat = np.ascontiguousarray(rows).reshape(n, -1)
+        filtered = np.empty((n, flat.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 0] = 1  # Sub filter
+        filtered[:, 1:4] = flat[:, :3]
+        np.subtract(flat[:, 3:], flat[:, :-3], out=filtered[:, 4:])
+        self._spool.write(self._compressor.compress(filtered.tobytes()))
+        self.height += n
+
+    def close(self, chunk_size=1024 * 1024):
+        """Write the PNG file; returns (path, height)"""
+        if self._closed:
+            return self.path, self.height
+        self._closed = True
+        self._spool.write(self._compressor.flush())
+        self._spool.seek(0)
+        temp_path = self.path + ".part"
+        with open(temp_path, "wb") as f:
+            f.write(PNG_SIGNATURE)
+            f.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0)))
+            while True:
+                data = self._spool.read(chunk_size)
+                if not data:
+                    break
+                f.write(_png_chunk(b"IDAT", data))
+            f.write(_png_chunk(b"IEND", b""))
+        self._spool.close()
+        os.replace(temp_path, self.path)
+        return self.path, self.height
+
+    def abort(self):
+        self._closed = True
+        self._spool.close()
+
+
+class RowHasher:
+    """One 64-bit hash per frame row"""
+
+    def __init__(self, ignore_left=0, ignore_right=0):
+        # Scrollbars and other moving chrome at the sides would break row matches
+        self.ignore_left = ignore_left
+        self.ignore_right = ignore_right
+        self._weights = None
+
+    def hash(self, frame):
+        height, width = frame.shape[:2]
+        usable = frame[:, self.ignore_left:width - self.ignore_right]
+        rows = np.ascontiguousarray(usable).reshape(height, -1)
+        words = rows.shape[1] // 8
+        if self._weights is None or self._weights.shape[0] != words + rows.shape[1] % 8:
+            rng = np.random.default_rng(0x5C0)
+            self._weights = rng.integers(1, 2 ** 63, size=words + rows.shape[1] % 8, dtype=np.uint64) | np.uint64(1)
+        packed = rows[:, :words * 8].view(np.uint64)
+        mixed = packed ^ (packed >> np.uint64(29))
+        hashes = (mixed * self._weights[:words]).sum(axis=1, dtype=np.uint64)
+        if rows.shape[1] % 8:
+            tail = rows[:, words * 8:].astype(np.uint64)
+            hashes ^= (tail * self._weights[words:]).sum(axis=1, dtype=np.uint64)
+        return hashes
+
+
+def find_scroll_offset(previous, current, anchor_rows=32, min_match=0.9):
+    """Scroll distance between two frames from their row hashes
+
+    Returns (shift, header_rows, footer_rows). shift is 0 when nothing moved
+    and None when no overlap could be found. Header/footer are rows that
+    stayed in place (sticky toolbars, status bars) and are excluded.
+    """
+    height = len(previous)
+    same = previous == current
+    if same.all():
+        return 0, height, 0
+    header = int(np.argmin(same))
+    footer = int(np.argmin(same[::-1]))
+    prev_band = previous[header:height - footer]
+    cur_band = current[header:height - footer]
+    band = len(prev_band)
+    k = max(1, min(anchor_rows, band // 4))
+    if band <= k:
+        return None, header, footer
+
+    # Anchor on distinctive blocks of the new frame (blank rows match anywhere);
+    # a block that just scrolled into view has no match, so try the next one
+    starts = np.arange(0, band - k + 1, k)
+    distinct = np.array([len(np.unique(cur_band[a:a + k])) for a in starts])
+    windows = sliding_window_view(prev_band, k)
+    candidates = np.empty(0, dtype=np.int64)
+    for anchor in starts[np.argsort(-distinct, kind="stable")]:
+        matches = np.flatnonzero((windows == cur_band[anchor:anchor + k]).all(axis=1)) - anchor
+        candidates = matches[matches > 0]
+        if candidates.size:
+            break
+
+    best_shift, best_ratio = None, 0.0
+    for shift in candidates:
+        ratio = float(np.mean(cur_band[:band - shift] == prev_band[shift:]))
+        if ratio > best_ratio + 1e-9:
+            best_shift, best_ratio = int(shift), ratio
+    if best_shift is None or best_ratio < min_match:
+        return None, header, footer
+    return best_shift, header, footer
+
+
+class ScrollStitcher:
+    """Feed frames in order; new rows are streamed to the writer"""
+
+    def __init__(self, writer, hasher=None, min_match=0.9):
+        self.logger = get_logger()
+        self.writer = writer
+        self.hasher = hasher or RowHasher()
+        self.min_match = min_match
+        self._previous = None
+        self._previous_hashes = None
+        self._footer = 0
+        self._started = False
+        self.stats = {"frames": 0, "still": 0, "gaps": 0, "rows": 0}
+
+    def add(self, frame):
+        """Add a frame; returns the scroll shift (0 when nothing moved)
+
+        The frame must stay unchanged until the next call, it is kept as the
+        reference for the following one.
+        """
+        hashes = self.hasher.hash(frame)
+        self.stats["frames"] += 1
+        if self._previous is None:
+            self._previous, self._previous_hashes = frame, hashes
+            return None
+
+        shift, header, footer = find_scroll_offset(self._previous_hashes, hashes, min_match=self.min_match)
+        height = frame.shape[0]
+        if shift == 0:
+            # Identical content; the new frame becomes the reference so callers can reuse buffers
+            self.stats["still"] += 1
+            self._previous, self._previous_hashes = frame, hashes
+            return 0
+
+        if not self._started:
+            # First frame goes out whole, minus the footer that repeats at the end
+            self.writer.write_rows(self._previous[:height - footer])
+            self._footer = footer
+            self._started = True
+        if shift is None:
+            # Scrolled past the visible area; keep going with a visible seam
+            self.stats["gaps"] += 1
+            self.logger.warning("Scroll capture lost overlap, appending whole frame")
+            rows = frame[header:height - footer]
+        else:
+            # Continue exactly where the previous frame's written rows ended
+            rows = frame[max(0, height - self._footer - shift):height - footer]
+        self.writer.write_rows(rows)
+        self.stats["rows"] += rows.shape[0]
+        self._footer = footer
+        self._previous, self._previous_hashes = frame, hashes
+        return shift
+
+    def finish(self):
+        """Write the remaining rows and close the writer; returns (path, height)"""
+        if self._previous is not None:
+            height = self._previous.shape[0]
+            if not self._started:
+                self.writer.write_rows(self._previous)
+            elif self._footer:
+                self.writer.write_rows(self._previous[height - self._footer:])
+        return self.writer.close()
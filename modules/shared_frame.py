@@ -0,0 +1,155 @@
+import os
+import struct
+from multiprocessing import shared_memory, resource_tracker
+from PIL import Image
+
+# Raw pixel handoff between processes through a named shared memory segment
+#
+# Layout: header | pixel rows
+#   header = magic(4s) width(u32) height(u32) stride(u32) format(u32)
+
+MAGIC = b"ZSF1"
+HEADER = struct.Struct("<4sIIII")
+
+FORMAT_RGBA8888 = 1
+FORMAT_RGB888 = 2
+
+_FORMAT_MODES = {
+    FORMAT_RGBA8888: ("RGBA", 4),
+    FORMAT_RGB888: ("RGB", 3),
+}
+
+
+class SharedFrameError(Exception):
+    """Raised when a shared frame cannot be created or attached"""
+
+
+def create_frame(width, height, stride, pixel_format=FORMAT_RGBA8888):
+    """Create a segment for one frame; returns (shm, writable pixel view)"""
+    if pixel_format not in _FORMAT_MODES:
+        raise SharedFrameError(f"Unsupported pixel format: {pixel_format}")
+    _, bpp = _FORMAT_MODES[pixel_format]
+    if width <= 0 or height <= 0 or stride < width * bpp:
+        raise SharedFrameError(f"Invalid frame geometry {width}x{height} stride={stride}")
+    size = HEADER.size + stride * height
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    HEADER.pack_into(shm.buf, 0, MAGIC, width, height, stride, pixel_format)
+    return shm, shm.buf[HEADER.size:size]
+
+
+def describe(shm):
+    """Payload describing a frame for the IPC channel"""
+    return {"name": shm.name, "size": shm.size}
+
+
+def release_owner(shm, unlink):
+    """Drop the creating process's handle
+
+    When the reader has already attached (and on POSIX unlinked) the
+    segment, the creator only closes it and stops its resource tracker from
+    unlinking it a second time at exit.
+    """
+    try:
+        shm.close()
+    except Exception:
+        pass
+    if unlink:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+        except Exception:
+            pass
+    elif os.name != "nt":
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+
+
+def publish_image(image):
+    """Copy a PIL image into a new segment; returns the segment"""
+    if image.mode == "RGBA":
+        pixel_format, bpp = FORMAT_RGBA8888, 4
+    else:
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        pixel_format, bpp = FORMAT_RGB888, 3
+    width, height = image.size
+    shm, view = create_frame(width, height, width * bpp, pixel_format)
+    try:
+        view[:] = image.tobytes()
+    except Exception:
+        view.release()
+        release_owner(shm, unlink=True)
+        raise
+    view.release()
+    return shm
+
+
+def attach_buffer(name):
+    """Attach read access to a frame owned by another process
+
+    Returns (shm, width, height, stride, pixel_format, pixel view). The
+    caller copies what it needs, releases the view and closes the segment;
+    the owner stays responsible for unlinking it.
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    if os.name != "nt":
+        # Only the owner unlinks, don't let this process's tracker do it at exit
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+    try:
+        magic, width, height, stride, pixel_format = HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC:
+            raise SharedFrameError("Bad shared frame magic")
+        if pixel_format not in _FORMAT_MODES:
+            raise SharedFrameError(f"Unsupported pixel format: {pixel_format}")
+        end = HEADER.size + stride * height
+        if end > shm.size:
+            raise SharedFrameError("Shared frame is truncated")
+    except Exception:
+        shm.close()
+        raise
+    return shm, width, height, stride, pixel_format, shm.buf[HEADER.size:end]
+
+
+def attach_image(name):
+    """Attach to a frame and wrap it as a PIL image without copying pixels
+
+    The segment is unlinked right away on POSIX; the mapping stays valid for
+    as long as the returned image is alive.
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        magic, width, height, stride, pixel_format = HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC:
+            raise SharedFrameError("Bad shared frame magic")
+        if pixel_format not in _FORMAT_MODES:
+            raise SharedFrameError(f"Unsupported pixel format: {pixel_format}")
+        end = HEADER.size + stride * height
+        if end > shm.size:
+            raise SharedFrameError("Shared frame is truncated")
+        mode, _ = _FORMAT_MODES[pixel_format]
+        pixels = shm.buf[HEADER.size:end]
+        if mode == "RGBA":
+            image = Image.frombuffer(mode, (width, height), pixels, "raw", mode, stride, 1)
+        else:
+            # RGB has no zero-copy mapping in Pillow, decode it once
+            image = Image.frombytes(mode, (width, height), bytes(pixels), "raw", mode, stride, 1)
+            pixels.release()
+    except Exception:
+        try:
+            shm.close()
+        finally:
+            if os.name != "nt":
+                shm.unlink()
+        raise
+
+    if os.name != "nt":
+        shm.unlink()
+    # Keep the mapping alive alongside the image that points into it
+    image._zsnapr_shm = shm
+    return image
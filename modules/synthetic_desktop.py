@@ -0,0 +1,331 @@
+import os
+import numpy as np
+from PIL import Image
+
+from modules.capture_backends import CaptureBackend, register_backend, set_default_backend
+
+# Reproducible fake desktops for headless benchmarks
+#
+# A desktop is rendered once from a seed: per-monitor gradient wallpapers,
+# overlapping windows with title bars and text-like glyph noise. Monitors
+# are laid out left to right on one virtual canvas, like a real desktop.
+#
+# Setting ZSNAPR_SYNTHETIC_DESKTOP (e.g. "seed=7;monitors=3840x2160,1920x1080;windows=8")
+# makes every process, including region workers, grab from the same desktop.
+
+ENV_VAR = "ZSNAPR_SYNTHETIC_DESKTOP"
+
+RESOLUTIONS = {
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "4k": (3840, 2160),
+    "5k": (5120, 2880),
+    "8k": (7680, 4320),
+}
+
+TITLE_BAR_HEIGHT = 28
+LINE_HEIGHT = 18
+GLYPH_HEIGHT = 11
+
+
+def parse_resolution(value):
+    """Resolve '4k' or '2560x1440' to (width, height)"""
+    if isinstance(value, (tuple, list)):
+        return int(value[0]), int(value[1])
+    key = str(value).strip().lower()
+    if key in RESOLUTIONS:
+        return RESOLUTIONS[key]
+    width, height = key.split("x")
+    return int(width), int(height)
+
+
+class FakeWindow:
+    """A window on the synthetic desktop"""
+
+    def __init__(self, hwnd, title, rect, monitor):
+        self.hwnd = hwnd
+        self.title = title
+        self.rect = rect  # (left, top, right, bottom) in virtual desktop pixels
+        self.monitor = monitor
+        self.visible = True
+
+
+class SyntheticDesktop:
+    """Seeded virtual desktop rendered with numpy"""
+
+    def __init__(self, seed=0, monitors=("1080p",), windows_per_monitor=6):
+        self.seed = int(seed)
+        self.monitors = []
+        x = 0
+        for spec in monitors:
+            width, height = parse_resolution(spec)
+            self.monitors.append((x, 0, width, height))
+            x += width
+        self.width = x
+        self.height = max(m[3] for m in self.monitors)
+        self.windows_per_monitor = int(windows_per_monitor)
+        self.windows = []
+        self.tick = 0
+        self._pixels = None
+
+    @classmethod
+    def from_spec(cls, spec):
+        """Build a desktop from 'seed=7;monitors=4k,1080p;windows=8'"""
+        options = {}
+        for part in (spec or "").split(";"):
+            if "=" in part:
+                key, value = part.split("=", 1)
+                options[key.strip().lower()] = value.strip()
+        monitors = [m for m in options.get("monitors", "1080p").split(",") if m.strip()]
+        return cls(seed=int(options.get("seed", 0)), monitors=monitors,
+                   windows_per_monitor=int(options.get("windows", 6)))
+
+    def spec(self):
+        """Inverse of from_spec, used to hand the desktop to child processes"""
+        monitors = ",".join(f"{w}x{h}" for _, _, w, h in self.monitors)
+        return f"seed={self.seed};monitors={monitors};windows={self.windows_per_monitor}"
+
+    @property
+    def pixels(self):
+        """Rendered desktop as an HxWx3 uint8 array"""
+        if self._pixels is None:
+            self._pixels = self._render()
+        return self._pixels
+
+    def _render(self):
+        rng = np.random.default_rng(self.seed)
+        canvas = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        self.windows = []
+        hwnd = 0x1000
+        for index, (mx, my, mw, mh) in enumerate(self.monitors):
+            self._fill_gradient(canvas[my:my + mh, mx:mx + mw], rng)
+            for _ in range(self.windows_per_monitor):
+                w = int(rng.integers(mw // 5, mw * 3 // 5))
+                h = int(rng.integers(mh // 5, mh * 3 // 5))
+                left = mx + int(rng.integers(0, mw - w))
+                top = my + int(rng.integers(0, mh - h))
+                self._draw_window(canvas, rng, left, top, w, h)
+                self.windows.append(FakeWindow(hwnd, f"Synthetic Window {hwnd:#x}",
+                                               (left, top, left + w, top + h), index))
+                hwnd += 1
+        # Later windows are drawn on top, the last one has focus
+        self.windows.reverse()
+        return canvas
+
+    @staticmethod
+    def _fill_gradient(view, rng):
+        height = view.shape[0]
+        top = rng.integers(0, 256, 3).astype(np.float32)
+        bottom = rng.integers(0, 256, 3).astype(np.float32)
+        t = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None]
+        rows = (top * (1.0 - t) + bottom * t).astype(np.uint8)
+        view[:] = rows[:, None, :]
+
+    @staticmethod
+    def _draw_window(canvas, rng, left, top, w, h):
+        frame = canvas[top:top + h, left:left + w]
+        accent = rng.integers(40, 200, 3).astype(np.uint8)
+        background = rng.integers(225, 256, 3).astype(np.uint8)
+        frame[:] = background
+        frame[:TITLE_BAR_HEIGHT] = accent
+        # 1px border
+        frame[[0, -1], :] = accent // 2
+        frame[:, [0, -1]] = accent // 2
+
+        body = frame[TITLE_BAR_HEIGHT + 8:h - 8, 12:w - 12]
+        bh, bw = body.shape[:2]
+        if bh <= 0 or bw <= 0:
+            return
+        SyntheticDesktop._draw_text(body, rng, np.zeros(3, dtype=np.uint8) + 30)
+
+    @staticmethod
+    def _draw_text(body, rng, ink):
+        # Text-like noise: glyph rows split into words of random length
+        bh, bw = body.shape[:2]
+        lines = bh // LINE_HEIGHT
+        if lines == 0:
+            return
+        # Word runs per line: alternating word/space lengths, cumulative positions
+        runs = rng.integers(2, 12, size=(lines, bw // 3 + 2)) * 7
+        edges = np.cumsum(runs, axis=1)
+        columns = np.arange(bw)
+        word_index = np.empty((lines, bw), dtype=np.int64)
+        for line in range(lines):
+            word_index[line] = np.searchsorted(edges[line], columns, side="right")
+        in_word = (word_index % 2) == 0
+        # Ragged right edge like real paragraphs
+        line_ends = rng.integers(bw // 2, bw + 1, size=lines)
+        in_word &= columns[None, :] < line_ends[:, None]
+
+        glyphs = rng.integers(0, 256, size=(lines, GLYPH_HEIGHT, bw), dtype=np.uint8) < 96
+        mask = glyphs & in_word[:, None, :]
+        text_rows = body[:lines * LINE_HEIGHT].reshape(lines, LINE_HEIGHT, bw, 3)
+        text_rows[:, 3:3 + GLYPH_HEIGHT][mask] = ink
+
+    def advance(self, steps=1):
+        """Move time forward; repaints a small clock-like patch in the focused window"""
+        pixels = self.pixels
+        self.tick += steps
+        if not self.windows:
+            return
+        left, top, right, bottom = self.windows[0].rect
+        width = min(160, right - left - 24)
+        height = min(LINE_HEIGHT * 2, bottom - top - TITLE_BAR_HEIGHT - 16)
+        if width <= 0 or height <= 0:
+            return
+        patch = pixels[top + TITLE_BAR_HEIGHT + 8:top + TITLE_BAR_HEIGHT + 8 + height,
+                       left + 12:left + 12 + width]
+        patch[:] = 245
+        rng = np.random.default_rng((self.seed, self.tick))
+        self._draw_text(patch, rng, np.array([30, 30, 30], dtype=np.uint8))
+
+    def grab(self, region=None):
+        """Region of the desktop as a PIL image"""
+        if region is None:
+            return Image.fromarray(self.pixels.copy(), "RGB")
+        _, _, w, h = (int(v) for v in region)
+        return Image.fromarray(self.grab_into(np.empty((h, w, 3), dtype=np.uint8), region), "RGB")
+
+    def grab_into(self, out, region=None):
+        """Copy a region of the desktop into a preallocated array"""
+        pixels = self.pixels
+        if region is None:
+            region = (0, 0, self.width, self.height)
+        x, y, w, h = (int(v) for v in region)
+        sx0, sy0 = max(x, 0), max(y, 0)
+        sx1, sy1 = min(x + w, self.width), min(y + h, self.height)
+        if sx0 != x or sy0 != y or sx1 != x + w or sy1 != y + h:
+            # Areas outside the virtual desktop are black, like on a real screen
+            out[...] = 0
+        if sx1 > sx0 and sy1 > sy0:
+            out[sy0 - y:sy1 - y, sx0 - x:sx1 - x] = pixels[sy0:sy1, sx0:sx1]
+        return out
+
+
+@register_backend
+class SyntheticBackend(CaptureBackend):
+    """Capture backend reading from a SyntheticDesktop"""
+
+    name = "synthetic"
+    priority = 90
+
+    def __init__(self, desktop=None):
+        self.desktop = desktop
+
+    def is_available(self):
+        # Never picked up by benchmarks on a real machine unless requested
+        if self.desktop is None and os.environ.get(ENV_VAR):
+            self.desktop = SyntheticDesktop.from_spec(os.environ[ENV_VAR])
+        return self.desktop is not None
+
+    def grab(self, region=None):
+        return self.desktop.grab(region)
+
+    def grab_into(self, out, region=None):
+        return self.desktop.grab_into(out, region)
+
+    def screen_size(self):
+        return self.desktop.width, self.desktop.height
+
+
+class FakeWindowManager:
+    """The subset of win32gui used by WindowCapture, backed by a synthetic desktop"""
+
+    def __init__(self, desktop):
+        self.desktop = desktop
+        self.desktop.pixels  # windows exist once rendered
+        self.foreground = desktop.windows[0].hwnd if desktop.windows else 0
+
+    def _window(self, hwnd):
+        for window in self.desktop.windows:
+            if window.hwnd == hwnd:
+                return window
+        raise ValueError(f"Invalid window handle: {hwnd}")
+
+    def GetForegroundWindow(self):
+        return self.foreground
+
+    def SetForegroundWindow(self, hwnd):
+        self._window(hwnd)
+        self.foreground = hwnd
+
+    def GetWindowRect(self, hwnd):
+        return self._window(hwnd).rect
+
+    def GetWindowText(self, hwnd):
+        return self._window(hwnd).title
+
+    def IsWindowVisible(self, hwnd):
+        return self._window(hwnd).visible
+
+    def EnumWindows(self, callback, extra):
+        # Top-level windows in z-order, topmost first
+        for window in list(self.desktop.windows):
+            if callback(window.hwnd, extra) is False:
+                break
+
+
+class FakeClipboard:
+    """The subset of win32clipboard used by ClipboardManager, kept in memory"""
+
+    CF_TEXT = 1
+    CF_DIB = 8
+    CF_UNICODETEXT = 13
+
+    def __init__(self):
+        self.data = {}
+        self.is_open = False
+        self.writes = 0
+
+    def OpenClipboard(self, hwnd=None):
+        if self.is_open:
+            raise RuntimeError("Clipboard is already open")
+        self.is_open = True
+
+    def CloseClipboard(self):
+        self.is_open = False
+
+    def EmptyClipboard(self):
+        self.data.clear()
+
+    def SetClipboardData(self, fmt, data):
+        self.data[fmt] = data
+        self.writes += 1
+
+    def SetClipboardText(self, text, fmt=CF_UNICODETEXT):
+        self.SetClipboardData(fmt, text)
+
+    def GetClipboardData(self, fmt=CF_UNICODETEXT):
+        return self.data[fmt]
+
+
+class SyntheticEnvironment:
+    """Handles to the fakes installed by install_synthetic_environment"""
+
+    def __init__(self, desktop, backend, window_manager, clipboard):
+        self.desktop = desktop
+        self.backend = backend
+        self.window_manager = window_manager
+        self.clipboard = clipboard
+
+
+def install_synthetic_environment(desktop=None, seed=0, monitors=("1080p",)):
+    """Route capture, window lookup and clipboard to a synthetic desktop
+
+    Also exports the desktop spec so region workers started afterwards grab
+    the same pixels.
+    """
+    from modules.window_capture_legacy import WindowCapture
+    from modules.copy_legacy import ClipboardManager
+
+    if desktop is None:
+        desktop = SyntheticDesktop(seed=seed, monitors=monitors)
+    os.environ[ENV_VAR] = desktop.spec()
+    backend = SyntheticBackend(desktop)
+    set_default_backend(backend)
+    window_manager = FakeWindowManager(desktop)
+    clipboard = FakeClipboard()
+    WindowCapture.window_manager = window_manager
+    ClipboardManager.clipboard = clipboard
+    return SyntheticEnvironment(desktop, backend, window_manager, clipboard)
@@ -0,0 +1,274 @@
+import os
+import time
+import zlib
+import struct
+import threading
+import numpy as np
+from PIL import Image
+
+from core.log_sys import get_logger
+
+# Interval recorder that only stores what changed
+#
+# Each frame is split into square tiles and every tile is hashed in one
+# vectorized pass. Unchanged frames write nothing; changed frames store
+# either the changed tiles (delta) or, periodically and after large
+# changes, the whole frame (keyframe).
+#
+# Container (<name>.zsl): header | records
+#   header  = magic(5s) version(u8) width(u32) height(u32) tile(u16)
+#   keyframe record = zlib(raw RGB rows of the padded frame)
+#   delta record    = count(u32) | tile ids(u32 * count) | zlib(tile pixels)
+# Index (<name>.zsl.idx): fixed-size records, one per stored frame
+#   timestamp(f64) offset(u64) length(u32) keyframe(u32) kind(u8)
+
+MAGIC = b"ZSTL1"
+VERSION = 1
+HEADER = struct.Struct("<5sBIIH")
+INDEX_RECORD = struct.Struct("<dQIIB")
+INDEX_DTYPE = np.dtype([("timestamp", "<f8"), ("offset", "<u8"), ("length", "<u4"),
+                        ("keyframe", "<u4"), ("kind", "u1")])
+
+KIND_KEYFRAME = 1
+KIND_DELTA = 2
+
+DEFAULT_TILE = 64
+
+
+class TileHasher:
+    """64-bit hashes of every tile of a padded frame in one numpy pass"""
+
+    def __init__(self, padded_width, padded_height, tile):
+        self.tile = tile
+        self.rows = padded_height // tile
+        self.cols = padded_width // tile
+        self.words_per_row = tile * 3 // 8
+        # Per-position odd multipliers make the sum order-sensitive
+        rng = np.random.default_rng(0x5A5A)
+        weights = rng.integers(1, 2 ** 63, size=(tile, self.words_per_row), dtype=np.uint64) | np.uint64(1)
+        self._weights = weights.reshape(1, tile, 1, self.words_per_row)
+        self._scratch = np.empty((self.rows, tile, self.cols, self.words_per_row), dtype=np.uint64)
+
+    def hash(self, padded):
+        words = padded.reshape(padded.shape[0], -1).view(np.uint64)
+        words = words.reshape(self.rows, self.tile, self.cols, self.words_per_row)
+        scratch = self._scratch
+        np.right_shift(words, np.uint64(29), out=scratch)
+        np.bitwise_xor(scratch, words, out=scratch)
+        np.multiply(scratch, self._weights, out=scratch)
+        return scratch.sum(axis=(1, 3), dtype=np.uint64)
+
+
+class TimelapseWriter:
+    """Append frames to a container, storing only changed tiles"""
+
+    def __init__(self, path, width, height, tile=DEFAULT_TILE, keyframe_every=300, keyframe_ratio=0.5,
+                 level=6):
+        if tile % 8:
+            raise ValueError("Tile size must be a multiple of 8")
+        self.path = path
+        self.width = width
+        self.height = height
+        self.tile = tile
+        self.keyframe_every = keyframe_every
+        self.keyframe_ratio = keyframe_ratio
+        self.level = level
+        self.padded_width = -(-width // tile) * tile
+        self.padded_height = -(-height // tile) * tile
+        self.hasher = TileHasher(self.padded_width, self.padded_height, tile)
+        self.frame = np.zeros((self.padded_height, self.padded_width, 3), dtype=np.uint8)
+        self._hashes = None
+        self._last_keyframe = None
+        self._stored_since_keyframe = 0
+        self._records = 0
+
+        self.stats = {"frames": 0, "stored": 0, "keyframes": 0, "deltas": 0, "tiles": 0,
+                      "bytes": HEADER.size, "hash_ms": 0.0, "encode_ms": 0.0}
+
+        self._data = open(path, "wb")
+        self._index = open(path + ".idx", "wb")
+        self._data.write(HEADER.pack(MAGIC, VERSION, width, height, tile))
+        self._data.flush()
+
+    @property
+    def view(self):
+        """Writable HxWx3 area of the frame buffer to grab into"""
+        return self.frame[:self.height, :self.width]
+
+    def add(self, timestamp=None):
+        """Store the frame currently in the buffer; returns the record kind or None"""
+        timestamp = time.time() if timestamp is None else timestamp
+        self.stats["frames"] += 1
+
+        started = time.perf_counter()
+        hashes = self.hasher.hash(self.frame)
+        self.stats["hash_ms"] += (time.perf_counter() - started) * 1000
+
+        if self._hashes is None:
+            changed = None
+        else:
+            changed = np.flatnonzero(hashes != self._hashes)
+            if changed.size == 0:
+                return None
+        self._hashes = hashes
+
+        started = time.perf_counter()
+        keyframe = (changed is None
+                    or self._stored_since_keyframe >= self.keyframe_every
+                    or changed.size >= self.keyframe_ratio * hashes.size)
+        if keyframe:
+            payload = zlib.compress(self.frame.tobytes(), self.level)
+            kind = KIND_KEYFRAME
+        else:
+            payload = self._encode_delta(changed)
+            kind = KIND_DELTA
+        self.stats["encode_ms"] += (time.perf_counter() - started) * 1000
+
+        offset = self._data.tell()
+        self._data.write(payload)
+        self._data.flush()
+        if keyframe:
+            self._last_keyframe = self._records
+            self._stored_since_keyframe = 0
+            self.stats["keyframes"] += 1
+        else:
+            self._stored_since_keyframe += 1
+            self.stats["deltas"] += 1
+            self.stats["tiles"] += int(changed.size)
+        self._index.write(INDEX_RECORD.pack(timestamp, offset, len(payload), self._last_keyframe, kind))
+        self._index.flush()
+        self._records += 1
+        self.stats["stored"] += 1
+        self.stats["bytes"] += len(payload) + INDEX_RECORD.size
+        return kind
+
+    def _encode_delta(self, changed):
+        tile = self.tile
+        cols = self.hasher.cols
+        # Gather only the changed tiles, (count, tile, tile, 3)
+        tiles = self.frame.reshape(self.hasher.rows, tile, cols, tile, 3)[changed // cols, :, changed % cols]
+        ids = changed.astype("<u4")
+        return struct.pack("<I", ids.size) + ids.tobytes() + zlib.compress(tiles.tobytes(), self.level)
+
+    def close(self):
+        for handle in (self._data, self._index):
+            try:
+                handle.close()
+            except Exception:
+                pass
+
+
+class TimelapseReader:
+    """Reconstruct frames of a container at any timestamp"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, width, height, tile = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"Not a time-lapse container: {path}")
+        self.width = width
+        self.height = height
+        self.tile = tile
+        self.padded_width = -(-width // tile) * tile
+        self.padded_height = -(-height // tile) * tile
+        self.index = np.fromfile(path + ".idx", dtype=INDEX_DTYPE)
+        # A record cut short by a crash is ignored
+        self.index = self.index[self.index["offset"] + self.index["length"] <= os.path.getsize(path)]
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def timestamps(self):
+        return self.index["timestamp"]
+
+    def frame_at(self, timestamp):
+        """The frame that was on screen at timestamp, as a PIL image"""
+        position = int(np.searchsorted(self.index["timestamp"], timestamp, side="right")) - 1
+        if position < 0:
+            raise ValueError("Timestamp is before the first recorded frame")
+        return self.frame(position)
+
+    def frame(self, position):
+        """Frame of index record position: its keyframe plus the deltas after it"""
+        record = self.index[position]
+        first = int(record["keyframe"])
+        tile = self.tile
+        rows, cols = self.padded_height // tile, self.padded_width // tile
+        with open(self.path, "rb") as f:
+            f.seek(int(self.index[first]["offset"]))
+            raw = zlib.decompress(f.read(int(self.index[first]["length"])))
+            frame = np.frombuffer(raw, dtype=np.uint8).reshape(self.padded_height, self.padded_width, 3).copy()
+            # Tiles are scattered back through a tiled view of the frame
+            tiled = frame.reshape(rows, tile, cols, tile, 3)
+            for entry in self.index[first + 1:position + 1]:
+                f.seek(int(entry["offset"]))
+                payload = f.read(int(entry["length"]))
+                count = struct.unpack_from("<I", payload, 0)[0]
+                ids = np.frombuffer(payload, dtype="<u4", count=count, offset=4)
+                pixels = np.frombuffer(zlib.decompress(payload[4 + 4 * count:]), dtype=np.uint8)
+                tiled[ids // cols, :, ids % cols] = pixels.reshape(count, tile, tile, 3)
+        return Image.fromarray(frame[:self.height, :self.width], "RGB")
+
+
+class TimelapseRecorder:
+    """Capture every interval seconds on a background thread"""
+
+    def __init__(self, backend, path, interval_seconds, region=None, tile=DEFAULT_TILE, keyframe_every=300):
+        self.logger = get_logger()
+        self.backend = backend
+        self.path = path
+        self.interval = max(0.05, float(interval_seconds))
+        self.region = region
+        self.tile = tile
+        self.keyframe_every = keyframe_every
+        self.writer = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.region is None:
+            width, height = self.backend.screen_size()
+        else:
+            width, height = int(self.region[2]), int(self.region[3])
+        self.writer = TimelapseWriter(self.path, width, height, tile=self.tile,
+                                      keyframe_every=self.keyframe_every)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self.logger.info(f"Time-lapse started: {self.path} every {self.interval}s")
+        return self
+
+    def _run(self):
+        started = time.perf_counter()
+        tick = 0
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    self.backend.grab_into(self.writer.view, self.region)
+                    self.writer.add()
+                except Exception as e:
+                    self.logger.error(f"Time-lapse frame failed: {e}")
+                tick += 1
+                # Fixed schedule; skip ticks we are already past instead of bunching up
+                next_tick = started + tick * self.interval
+                now = time.perf_counter()
+                if now > next_tick:
+                    tick = int((now - started) / self.interval) + 1
+                    next_tick = started + tick * self.interval
+                self._stop_event.wait(next_tick - now)
+        finally:
+            self.writer.close()
+
+    def stop(self, timeout=10):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.logger.info(f"Time-lapse stopped: {self.get_stats()}")
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def get_stats(self):
+        return dict(self.writer.stats) if self.writer else {}
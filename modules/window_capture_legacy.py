@@ -1,23 +1,30 @@
-import win32gui
-import win32ui
-import win32con
+try:
+    import win32gui
+except ImportError:
+    # Not on Windows; window lookups fall back to full screen unless a shim is installed
+    win32gui = None
 from PIL import Image
-import pyautogui
+from modules.capture_backends import grab
 
 class WindowCapture:
     """Active window capture functionality"""
     
+    # win32gui or a compatible shim (see synthetic_desktop.FakeWindowManager)
+    window_manager = win32gui
+    
     @staticmethod
     def get_active_window_rect():
         """Get the rectangle of the active window"""
         try:
+            if WindowCapture.window_manager is None:
+                return None
             # Get the active window handle
-            hwnd = win32gui.GetForegroundWindow()
+            hwnd = WindowCapture.window_manager.GetForegroundWindow()
             if hwnd == 0:
                 return None
             
             # Get window rectangle
-            rect = win32gui.GetWindowRect(hwnd)
+            rect = WindowCapture.window_manager.GetWindowRect(hwnd)
             return rect
         except Exception as e:
             print(f"Error getting active window: {e}")
@@ -30,7 +37,7 @@ class WindowCapture:
             rect = WindowCapture.get_active_window_rect()
             if rect is None:
                 # Fallback to full screen
-                return pyautogui.screenshot()
+                return grab()
             
             left, top, right, bottom = rect
             width = right - left
@@ -38,26 +45,28 @@ class WindowCapture:
             
             # Ensure valid dimensions
             if width <= 0 or height <= 0:
-                return pyautogui.screenshot()
+                return grab()
             
             # Capture the window region
-            screenshot = pyautogui.screenshot(region=(left, top, width, height))
+            screenshot = grab((left, top, width, height))
             return screenshot
             
         except Exception as e:
             print(f"Window capture error: {e}")
             # Fallback to full screen
-            return pyautogui.screenshot()
+            return grab()
     
     @staticmethod
     def get_window_title():
         """Get the title of the active window"""
         try:
-            hwnd = win32gui.GetForegroundWindow()
+            if WindowCapture.window_manager is None:
+                return "Unknown Window"
+            hwnd = WindowCapture.window_manager.GetForegroundWindow()
             if hwnd == 0:
                 return "Unknown Window"
             
-            title = win32gui.GetWindowText(hwnd)
+            title = WindowCapture.window_manager.GetWindowText(hwnd)
             return title if title else "Untitled Window"
         except Exception as e:
             return "Unknown Window"
\ No newline at end of file
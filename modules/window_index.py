@@ -0,0 +1,121 @@
+import sys
+from bisect import bisect_right
+from dataclasses import dataclass
+
+import numpy as np
+
+from core.log_sys import get_logger
+
+# Top-level windows under the pointer
+#
+# Window rectangles are enumerated once through a win32gui-compatible
+# manager (win32gui itself, or synthetic_desktop.FakeWindowManager off
+# Windows) and stored in a grid over the compressed x/y edge coordinates.
+# Each cell holds the topmost window covering it, so the window at a point
+# is two bisects and one array read however many windows are open.
+
+MIN_WINDOW_SIZE = 16
+
+
+@dataclass(frozen=True)
+class WindowInfo:
+    handle: int
+    x: int
+    y: int
+    width: int
+    height: int
+    title: str = ""
+
+    @property
+    def rect(self):
+        return (self.x, self.y, self.width, self.height)
+
+    def moved(self, dx, dy):
+        return WindowInfo(self.handle, self.x + dx, self.y + dy, self.width, self.height, self.title)
+
+
+def _dwm_frame_bounds(handle):
+    # GetWindowRect includes the invisible resize borders on Windows 10+
+    try:
+        import ctypes
+        from ctypes import wintypes
+        rect = wintypes.RECT()
+        DWMWA_EXTENDED_FRAME_BOUNDS = 9
+        result = ctypes.windll.dwmapi.DwmGetWindowAttribute(
+            wintypes.HWND(handle), DWMWA_EXTENDED_FRAME_BOUNDS, ctypes.byref(rect), ctypes.sizeof(rect))
+        if result == 0:
+            return rect.left, rect.top, rect.right, rect.bottom
+    except Exception:
+        pass
+    return None
+
+
+def enumerate_windows(manager=None):
+    """Visible top-level windows, topmost first
+
+    manager defaults to the one WindowCapture uses; returns an empty list
+    when no window manager is available on this platform.
+    """
+    if manager is None:
+        from modules.window_capture_legacy import WindowCapture
+        manager = WindowCapture.window_manager
+    if manager is None:
+        return []
+    logger = get_logger()
+    is_iconic = getattr(manager, "IsIconic", None)
+    use_dwm = sys.platform == "win32" and getattr(manager, "__name__", "") == "win32gui"
+    windows = []
+
+    def collect(handle, _):
+        try:
+            if not manager.IsWindowVisible(handle) or (is_iconic and is_iconic(handle)):
+                return True
+            bounds = (_dwm_frame_bounds(handle) if use_dwm else None) or manager.GetWindowRect(handle)
+            left, top, right, bottom = bounds
+            if right - left < MIN_WINDOW_SIZE or bottom - top < MIN_WINDOW_SIZE:
+                return True
+            windows.append(WindowInfo(handle, left, top, right - left, bottom - top,
+                                      manager.GetWindowText(handle) or ""))
+        except Exception as e:
+            logger.debug(f"Skipping window {handle}: {e}")
+        return True
+
+    try:
+        manager.EnumWindows(collect, None)
+    except Exception as e:
+        logger.error(f"Window enumeration failed: {e}")
+    return windows
+
+
+class WindowIndex:
+    """Topmost window at a point in O(log n)"""
+
+    def __init__(self, windows):
+        # windows are topmost first, as EnumWindows reports them
+        self.windows = list(windows)
+        self._xs = sorted({edge for w in self.windows for edge in (w.x, w.x + w.width)})
+        self._ys = sorted({edge for w in self.windows for edge in (w.y, w.y + w.height)})
+        column = {x: i for i, x in enumerate(self._xs)}
+        row = {y: i for i, y in enumerate(self._ys)}
+        self._grid = np.full((max(len(self._ys) - 1, 0), max(len(self._xs) - 1, 0)), -1, dtype=np.int32)
+        # Paint bottom-most first so windows above overwrite the ones they cover
+        for i in range(len(self.windows) - 1, -1, -1):
+            w = self.windows[i]
+            self._grid[row[w.y]:row[w.y + w.height], column[w.x]:column[w.x + w.width]] = i
+
+    def __len__(self):
+        return len(self.windows)
+
+    def window_at(self, x, y):
+        """The topmost window containing (x, y), or None"""
+        col = bisect_right(self._xs, x) - 1
+        row = bisect_right(self._ys, y) - 1
+        if not (0 <= row < self._grid.shape[0] and 0 <= col < self._grid.shape[1]):
+            return None
+        i = self._grid[row, col]
+        return self.windows[i] if i >= 0 else None
+
+    @classmethod
+    def from_list(cls, rows):
+        """Index of plain [x, y, w, h, title] rows, topmost first (as sent to a selector process)"""
+        return cls(WindowInfo(i, int(x), int(y), int(w), int(h), title) for i, (x, y, w, h, title) in enumerate(rows))
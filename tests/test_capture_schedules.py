@@ -0,0 +1,74 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.capture_schedules import CronExpression, ScheduleManager
+from core.timer_wheel import TimerWheel
+
+
+@pytest.mark.parametrize("expression, moment, expected", [
+    ("30 9 * * *", datetime(2025, 3, 4, 8, 0), datetime(2025, 3, 4, 9, 30)),
+    ("30 9 * * *", datetime(2025, 3, 4, 9, 30), datetime(2025, 3, 5, 9, 30)),
+    ("@hourly", datetime(2025, 3, 4, 10, 7), datetime(2025, 3, 4, 11, 0)),
+    ("@monthly", datetime(2025, 12, 15, 0, 0), datetime(2026, 1, 1, 0, 0)),
+    ("0 12 * * 0", datetime(2025, 3, 4, 12, 0), datetime(2025, 3, 9, 12, 0)),
+    ("0 12 * * 7", datetime(2025, 3, 4, 12, 0), datetime(2025, 3, 9, 12, 0)),
+    ("0 0 29 2 *", datetime(2025, 3, 1, 0, 0), datetime(2028, 2, 29, 0, 0)),
+])
+def test_next_after(expression, moment, expected):
+    assert CronExpression(expression).next_after(moment) == expected
+
+
+@pytest.mark.parametrize("expression, moment, expected", [
+    ("*/15 * * * *", datetime(2025, 3, 4, 10, 7), datetime(2025, 3, 4, 10, 15)),
+    ("*/15 * * * *", datetime(2025, 3, 4, 10, 15), datetime(2025, 3, 4, 10, 30)),
+    ("*/15 * * * *", datetime(2025, 3, 4, 10, 52), datetime(2025, 3, 4, 11, 0)),
+    ("5/20 * * * *", datetime(2025, 3, 4, 10, 6), datetime(2025, 3, 4, 10, 25)),
+    ("45,5,30 * * * *", datetime(2025, 3, 4, 10, 6), datetime(2025, 3, 4, 10, 30)),
+    ("0 */6 * * *", datetime(2025, 3, 4, 7, 30), datetime(2025, 3, 4, 12, 0)),
+    ("30 9 */10 * *", datetime(2025, 3, 4, 12, 0), datetime(2025, 3, 11, 9, 30)),
+    ("0 0 1 */4 *", datetime(2025, 2, 10, 0, 0), datetime(2025, 5, 1, 0, 0)),
+    ("0 12 * * 5,1", datetime(2025, 3, 4, 12, 0), datetime(2025, 3, 7, 12, 0)),
+])
+def test_next_after_mid_interval(expression, moment, expected):
+    assert CronExpression(expression).next_after(moment) == expected
+
+
+def test_next_after_matches_minute_by_minute_scan():
+    cron = CronExpression("*/7 1-23/5 * * *")
+    moment = datetime(2025, 3, 4, 0, 0)
+    for _ in range(50):
+        found = cron.next_after(moment)
+        scan = moment + timedelta(minutes=1)
+        while scan.minute not in cron.minutes or scan.hour not in cron.hours:
+            scan += timedelta(minutes=1)
+        assert found == scan
+        moment = found
+
+
+def test_invalid_expressions():
+    for text in ("* * * *", "60 * * * *", "*/0 * * * *"):
+        with pytest.raises(ValueError):
+            CronExpression(text)
+
+
+def test_delay_fires_once_and_persists_nothing(tmp_path):
+    wheel = TimerWheel(tick_ms=10)
+    fired = []
+    done = threading.Event()
+
+    def on_fire(schedule, payload):
+        fired.append((schedule.kind, payload))
+        done.set()
+
+    path = tmp_path / "schedules.json"
+    manager = ScheduleManager(on_fire, wheel=wheel, path=str(path))
+    try:
+        manager.delay(0.05, payload="job")
+        assert done.wait(2)
+        assert fired == [("once", "job")]
+        assert manager.schedules() == []
+    finally:
+        manager.shutdown()
+        wheel.stop()
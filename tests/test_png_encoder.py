@@ -0,0 +1,81 @@
+import io
+import threading
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from modules import png_encoder
+from modules.png_encoder import FILTERS, encode_png
+
+
+def _round_trip(image, **options):
+    buffer = io.BytesIO()
+    encode_png(image, buffer, **options)
+    buffer.seek(0)
+    return Image.open(buffer)
+
+
+@pytest.mark.parametrize("channels", [1, 2, 3, 4])
+def test_round_trip_modes(channels):
+    rng = np.random.default_rng(channels)
+    pixels = rng.integers(0, 256, (31, 47, channels), dtype=np.uint8)
+    decoded = np.asarray(_round_trip(pixels))
+    assert np.array_equal(decoded.reshape(pixels.shape), pixels)
+
+
+@pytest.mark.parametrize("filter", ["adaptive", *FILTERS])
+def test_filters(filter):
+    rng = np.random.default_rng(0)
+    pixels = np.clip(np.cumsum(rng.integers(-5, 6, (40, 60, 3)), axis=1) + 128, 0, 255).astype(np.uint8)
+    assert np.array_equal(np.asarray(_round_trip(pixels, filter=filter)), pixels)
+
+
+def test_parallel_chunks_match_single_job():
+    rng = np.random.default_rng(3)
+    pixels = rng.integers(0, 256, (1000, 1000, 3), dtype=np.uint8)
+    single = np.asarray(_round_trip(pixels, workers=1))
+    chunked = np.asarray(_round_trip(pixels, workers=None, chunk_bytes=64 * 1024))
+    assert np.array_equal(single, pixels)
+    assert np.array_equal(chunked, pixels)
+
+
+def test_workers_caps_chunks_in_flight(monkeypatch):
+    deflate = png_encoder._deflate_rows
+    lock = threading.Lock()
+    running = [0, 0]  # now, most seen
+
+    def tracked(*args):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.005)
+        try:
+            return deflate(*args)
+        finally:
+            with lock:
+                running[0] -= 1
+
+    monkeypatch.setattr(png_encoder, "_deflate_rows", tracked)
+    rng = np.random.default_rng(4)
+    pixels = rng.integers(0, 256, (1000, 1000, 3), dtype=np.uint8)
+    decoded = np.asarray(_round_trip(pixels, workers=2, chunk_bytes=64 * 1024))
+    assert np.array_equal(decoded, pixels)
+    assert running[1] <= 2
+
+
+def test_palette_transparency_index():
+    image = Image.new("P", (4, 1))
+    image.putpalette([0, 0, 0, 255, 0, 0, 0, 255, 0, 0, 0, 255])
+    image.putdata([0, 1, 2, 3])
+    image.info["transparency"] = 2
+    decoded = _round_trip(image)
+    assert decoded.info.get("transparency") == 2
+    assert [decoded.convert("RGBA").getpixel((x, 0))[3] for x in range(4)] == [255, 255, 0, 255]
+
+
+@pytest.mark.parametrize("shape", [(0, 5, 3), (5, 0, 4)])
+def test_empty_image_is_rejected(shape):
+    with pytest.raises(ValueError):
+        encode_png(np.zeros(shape, dtype=np.uint8), io.BytesIO())
@@ -0,0 +1,64 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from modules import qoi
+
+
+def _palette_image(height, width, colours=40, seed=1):
+    # Few RGBA colours at random: nearly every op is a table lookup or an
+    # alpha change, the case where the vectorized resolution cannot settle
+    rng = np.random.default_rng(seed)
+    palette = rng.integers(0, 256, (colours, 4), dtype=np.uint8)
+    return palette[rng.integers(0, colours, (height, width))]
+
+
+def test_round_trip_rgb_and_rgba():
+    rng = np.random.default_rng(0)
+    for pixels in (rng.integers(0, 256, (37, 53, 3), dtype=np.uint8),
+                   rng.integers(0, 256, (41, 29, 4), dtype=np.uint8),
+                   np.zeros((10, 300, 4), dtype=np.uint8)):
+        assert np.array_equal(qoi.decode(qoi.encode(pixels)), pixels)
+
+
+def test_runs_deltas_and_lookups():
+    rng = np.random.default_rng(1)
+    smooth = np.clip(np.cumsum(rng.integers(-3, 4, (50, 80, 4)), axis=1) + 128, 0, 255).astype(np.uint8)
+    few = rng.integers(0, 3, (64, 64, 4), dtype=np.uint8) * 120
+    for pixels in (smooth, few, np.tile(np.array([0, 0, 0, 255], np.uint8), (5, 200, 1))):
+        assert np.array_equal(qoi.decode(qoi.encode(pixels)), pixels)
+
+
+def test_matches_pillow():
+    rng = np.random.default_rng(2)
+    pixels = np.clip(np.cumsum(rng.integers(-4, 5, (40, 60, 4)), axis=1) + 128, 0, 255).astype(np.uint8)
+    data = qoi.encode(pixels)
+    assert np.array_equal(np.asarray(Image.open(io.BytesIO(data))), pixels)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, "QOI")
+    assert np.array_equal(qoi.decode(buffer.getvalue()), pixels)
+
+
+def test_header_and_corrupt_data():
+    data = qoi.encode(np.zeros((3, 5, 3), dtype=np.uint8))
+    assert qoi.read_header(data) == (5, 3, 3, 0)
+    for bad in (b"nope", data[:-1]):
+        try:
+            qoi.decode(bad)
+        except qoi.QOIError:
+            continue
+        raise AssertionError("corrupt data decoded")
+
+
+def test_full_screen_rgba_with_varying_alpha():
+    pixels = _palette_image(1080, 1920)
+    assert np.array_equal(qoi.decode(qoi.encode(pixels)), pixels)
+
+
+def test_sequential_fallback_matches_vectorized(monkeypatch):
+    pixels = _palette_image(120, 160)
+    data = qoi.encode(pixels)
+    # No refinement passes: every chunk goes through the op-by-op decoder
+    monkeypatch.setattr(qoi, "_MAX_PASSES", 0)
+    assert np.array_equal(qoi.decode(data), pixels)
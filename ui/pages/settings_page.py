@@ -1,6 +1,6 @@
 import os
 import flet as ft
-from config import DEFAULT_SETTINGS, SUPPORTED_FORMATS, HOTKEYS, get_available_locales, get_current_language, set_language
+from config import DEFAULT_SETTINGS, SUPPORTED_FORMATS, ENCODER_PRESETS, HOTKEYS, get_available_locales, get_current_language, set_language
 
 # 使用健壮的翻译助手
 try:
@@ -76,6 +76,17 @@ def build(app):
         bgcolor=ft.Colors.GREY_50
     )
 
+    # Per-format encoder parameters, see config.ENCODER_PRESETS
+    app.encoder_preset_dropdown = ft.Dropdown(
+        label=t("settings.encoder_preset"),
+        value=getattr(getattr(app, "engine", None), "encoder_preset", None) or DEFAULT_SETTINGS["encoder_preset"],
+        options=[ft.dropdown.Option(name, name.title()) for name in ENCODER_PRESETS],
+        width=140,
+        border_radius=8,
+        filled=True,
+        bgcolor=ft.Colors.GREY_50
+    )
+
     app.delay_field = ft.TextField(
         label=t("settings.delay"),
         value=str(DEFAULT_SETTINGS["delay_seconds"]),
@@ -93,6 +104,13 @@ def build(app):
         fill_color=ft.Colors.GREEN_600
     )
     
+    app.dedupe_checkbox = ft.Checkbox(
+        label=t("settings.dedupe_saves"),
+        value=DEFAULT_SETTINGS["dedupe_saves"],
+        check_color=ft.Colors.WHITE,
+        fill_color=ft.Colors.GREEN_600
+    )
+    
     app.auto_copy_fullscreen_checkbox = ft.Checkbox(
         label=t("settings.auto_copy_fullscreen"),
         value=DEFAULT_SETTINGS["auto_copy_fullscreen"],
@@ -196,6 +214,14 @@ def build(app):
                                 expand=1
                             ),
                             ft.Container(width=20),
+                            ft.Container(
+                                content=ft.Column([
+                                    ft.Text(t("settings.encoder_preset"), size=12, weight=ft.FontWeight.W_500, color=ft.Colors.GREY_700),
+                                    app.encoder_preset_dropdown
+                                ], spacing=5),
+                                expand=1
+                            ),
+                            ft.Container(width=20),
                             ft.Container(
                                 content=ft.Column([
                                     ft.Text(t("settings.delay"), size=12, weight=ft.FontWeight.W_500, color=ft.Colors.GREY_700),
@@ -212,6 +238,7 @@ def build(app):
                             ft.Container(
                                 content=ft.Column([
                                     app.auto_save_checkbox,
+                                    app.dedupe_checkbox,
                                     ft.Divider(height=1, color=ft.Colors.GREY_200),
                                     app.auto_copy_fullscreen_checkbox,
                                     app.auto_copy_window_checkbox,